@@ -0,0 +1,75 @@
+# synthetic SubRip content for benchmarks
+import pathlib
+import random
+import sys
+import typing
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / "plugins"))
+
+from core import subrip  # noqa: E402
+
+words: typing.Final[typing.List[str]] = (
+    "the owls are not what they seem coffee black as midnight on "
+    "a moonless night damn fine cherry pie log lady fire walk with me "
+    "she is full of secrets where we are from the birds sing pretty song"
+).split()
+
+
+class CorpusOptions(typing.NamedTuple):
+    # fraction of titles with HTML tags in them
+    htmlDensity: float = 0.1
+    # fraction of titles with lines longer than the limit
+    longLinesDensity: float = 0.05
+    # fraction of titles with validation problems
+    faultsDensity: float = 0.0
+
+
+def makeLine(rnd: random.Random, wordsCount: int) -> str:
+    return " ".join(rnd.choice(words) for _ in range(wordsCount))
+
+
+def generateSubRip(
+    titlesCount: int,
+    seed: int = 42,
+    options: CorpusOptions = CorpusOptions()
+) -> str:
+    rnd: random.Random = random.Random(seed)
+    titles: typing.List[str] = []
+    timeCode: int = 1000
+    for ordinal in range(1, titlesCount + 1):
+        timeStart: int = timeCode
+        timeEnd: int = timeStart + rnd.randint(800, 5000)
+        timeCode = timeEnd + rnd.randint(1, 1000)
+
+        textLines: typing.List[str] = [
+            makeLine(rnd, rnd.randint(2, 6))
+            for _ in range(rnd.randint(1, 2))
+        ]
+        if rnd.random() < options.htmlDensity:
+            tag: str = rnd.choice(("i", "b", "u"))
+            textLines[0] = f"<{tag}>{textLines[0]}</{tag}>"
+        if rnd.random() < options.longLinesDensity:
+            textLines[-1] = makeLine(rnd, 12)
+        if rnd.random() < options.faultsDensity:
+            fault: int = rnd.randint(0, 4)
+            if fault == 0:
+                textLines[0] += " "
+            elif fault == 1:
+                textLines[0] = f"<i>{textLines[0]}"
+            elif fault == 2:
+                timeEnd = timeStart + 100
+            elif fault == 3:
+                textLines = textLines * 3
+            else:
+                timeStart, timeEnd = timeEnd, timeStart
+
+        titles.append(
+            "\n".join([
+                str(ordinal),
+                " --> ".join((
+                    subrip.millisecondsToTimeCode(timeStart),
+                    subrip.millisecondsToTimeCode(timeEnd)
+                ))
+            ] + textLines)
+        )
+    return "\n\n".join(titles) + "\n"
@@ -0,0 +1,325 @@
+# runs plugin commands on synthetic SubRip files of different sizes
+# with a stand-in for Sublime Text API (./stubs), and reports
+# operations per second and peak memory of every operation.
+#
+# Usage:
+#
+#   python ./benchmarks/run.py --output ./before.json
+#   # ...make changes...
+#   python ./benchmarks/run.py --output ./after.json --compare ./before.json
+#
+# with --compare the exit code is 1 if some operation got slower
+# than the --threshold (10% by default).
+#
+# Every operation runs on a freshly opened view, so it includes
+# parsing of the buffer, the same as the first command after opening
+# a file in Sublime Text, and validation has no cached results (except
+# for "revalidate" and "revalidate_line", which run after an edit within
+# a line and after adding a line). Peak memory is measured in a separate
+# run, as tracing allocations slows everything down.
+
+import argparse
+import datetime
+import gc
+import importlib
+import json
+import pathlib
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+import typing
+
+benchmarksPath: pathlib.Path = pathlib.Path(__file__).parent
+sys.path.insert(0, str(benchmarksPath / "stubs"))
+
+import sublime  # noqa: E402
+
+import corpus  # noqa: E402
+
+# the plugin is loaded as a package, the same way Sublime Text does it
+packageName: typing.Final[str] = "MarLant"
+package = types.ModuleType(packageName)
+package.__path__ = [str(benchmarksPath.parent)]  # type: ignore
+sys.modules[packageName] = package
+plugin = importlib.import_module(f"{packageName}.plugin")
+plugin.plugin_loaded()
+common = importlib.import_module(f"{packageName}.plugins._common")
+timecodes = importlib.import_module(f"{packageName}.plugins.core.timecodes")
+validation = importlib.import_module(
+    f"{packageName}.plugins.core.validation"
+)
+
+
+class Result(typing.NamedTuple):
+    operation: str
+    titles: int
+    seconds: float
+    opsPerSecond: float
+    peakMemory: int
+
+
+def openFile(
+    content: str,
+    fileName: str
+) -> typing.Tuple[sublime.Window, sublime.View]:
+    common.documentsCache.clear()
+    validation.clearValidationCache()
+    window: sublime.Window = sublime.Window()
+    view: sublime.View = window.add_view(sublime.View(content, fileName))
+    listener = common.DocumentChangeListener()
+    listener.attach(view.buffer())
+    return (window, view)
+
+
+def putCaretInTheMiddle(view: sublime.View) -> None:
+    document = common.getDocument(view)
+    view.sel().clear()
+    view.sel().add(
+        sublime.Region(document.titles[len(document.titles) // 2].offset)
+    )
+
+
+def validate(window: sublime.Window, view: sublime.View) -> None:
+    window.run_command("marlant_validate_all_titles", {"collect_all": True})
+
+
+# validates the file once and then edits a title in the middle of it,
+# so the next validation is the one after an edit
+def validateAndEditInTheMiddle(view: sublime.View) -> None:
+    validate(typing.cast(sublime.Window, view.window()), view)
+    document = common.getDocument(view)
+    title = document.titles[len(document.titles) // 2]
+    view.insert(sublime.Edit(), title.lineRegion(2)[1], " edited")
+
+
+# the same, but the edit adds a text line to a title in the beginning,
+# so almost all the titles are on other lines in the next validation
+def validateAndAddLineInTheBeginning(view: sublime.View) -> None:
+    validate(typing.cast(sublime.Window, view.window()), view)
+    document = common.getDocument(view)
+    title = document.titles[min(10, len(document.titles) - 1)]
+    view.insert(sublime.Edit(), title.lineRegion(2)[1], "\nadded line")
+
+
+def parse(window: sublime.Window, view: sublime.View) -> None:
+    common.getDocument(view)
+
+
+def renumber(window: sublime.Window, view: sublime.View) -> None:
+    view.run_command("marlant_renumber_titles")
+
+
+def shift(window: sublime.Window, view: sublime.View) -> None:
+    view.run_command("marlant_shift_timings", {"milliseconds": 1500})
+
+
+def translation(window: sublime.Window, view: sublime.View) -> None:
+    window.run_command("marlant_create_translation_file", {"language": "xx"})
+
+
+def split(window: sublime.Window, view: sublime.View) -> None:
+    view.run_command("marlant_split_title")
+
+
+def join(window: sublime.Window, view: sublime.View) -> None:
+    view.run_command("marlant_join_titles", {"after_current_title": True})
+
+
+class Operation(typing.NamedTuple):
+    run: typing.Callable[[sublime.Window, sublime.View], None]
+    # not measured
+    setup: typing.Optional[typing.Callable[[sublime.View], None]] = None
+
+
+operations: typing.Final[typing.Dict[str, Operation]] = {
+    "parse": Operation(parse),
+    "validate": Operation(validate),
+    "revalidate": Operation(validate, validateAndEditInTheMiddle),
+    "revalidate_line": Operation(validate, validateAndAddLineInTheBeginning),
+    "renumber": Operation(renumber),
+    "shift": Operation(shift),
+    "translation": Operation(translation),
+    "split": Operation(split, putCaretInTheMiddle),
+    "join": Operation(join, putCaretInTheMiddle)
+}
+
+
+def measure(
+    operation: Operation,
+    content: str,
+    fileName: str,
+    traceMemory: bool
+) -> typing.Tuple[float, int]:
+    window, view = openFile(content, fileName)
+    if operation.setup is not None:
+        operation.setup(view)
+        # the setup might have parsed the buffer already
+        common.documentsCache.clear()
+    gc.collect()
+    if traceMemory:
+        tracemalloc.start()
+    started: float = time.perf_counter()
+    operation.run(window, view)
+    # edits are applied lazily, the next command would need them
+    view.substr(0)
+    seconds: float = time.perf_counter() - started
+    peakMemory: int = 0
+    if traceMemory:
+        peakMemory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return (seconds, peakMemory)
+
+
+def compareResults(
+    results: typing.List[Result],
+    previousResults: typing.List[dict],
+    threshold: float
+) -> bool:
+    previous: typing.Dict[typing.Tuple[str, int], dict] = {
+        (r["operation"], r["titles"]): r for r in previousResults
+    }
+    regressed: bool = False
+    print()
+    print(
+        "".join((
+            f"{'operation':<16}{'titles':>8}",
+            f"{'before, s':>12}{'after, s':>12}{'change':>10}"
+        ))
+    )
+    for result in results:
+        before: typing.Optional[dict] = previous.get(
+            (result.operation, result.titles)
+        )
+        if before is None:
+            continue
+        change: float = result.seconds / before["seconds"] - 1
+        mark: str = ""
+        if change > threshold:
+            mark = "  <-- slower"
+            regressed = True
+        print(
+            "".join((
+                f"{result.operation:<16}{result.titles:>8}",
+                f"{before['seconds']:>12.4f}{result.seconds:>12.4f}",
+                f"{change:>+10.1%}{mark}"
+            ))
+        )
+    return not regressed
+
+
+def main() -> int:
+    argParser = argparse.ArgumentParser(
+        description="Benchmarks of MarLant commands on synthetic SubRip files"
+    )
+    argParser.add_argument(
+        "--titles",
+        type=int,
+        nargs="+",
+        default=[1000, 10000, 100000],
+        help="sizes of generated files, in titles (default: %(default)s)"
+    )
+    argParser.add_argument(
+        "--operations",
+        nargs="+",
+        choices=operations.keys(),
+        default=list(operations.keys())
+    )
+    argParser.add_argument("--repeat", type=int, default=3)
+    argParser.add_argument(
+        "--html-density",
+        type=float,
+        default=corpus.CorpusOptions().htmlDensity
+    )
+    argParser.add_argument(
+        "--long-lines-density",
+        type=float,
+        default=corpus.CorpusOptions().longLinesDensity
+    )
+    argParser.add_argument(
+        "--faults-density",
+        type=float,
+        default=corpus.CorpusOptions().faultsDensity
+    )
+    argParser.add_argument("--output", metavar="PATH")
+    argParser.add_argument("--compare", metavar="PATH")
+    argParser.add_argument("--threshold", type=float, default=0.1)
+    cliArgs = argParser.parse_args()
+
+    corpusOptions: corpus.CorpusOptions = corpus.CorpusOptions(
+        cliArgs.html_density,
+        cliArgs.long_lines_density,
+        cliArgs.faults_density
+    )
+    results: typing.List[Result] = []
+    print(
+        "".join((
+            f"{'operation':<16}{'titles':>8}",
+            f"{'best, s':>12}{'ops/s':>12}{'peak, MB':>12}"
+        ))
+    )
+    with tempfile.TemporaryDirectory() as tempDir:
+        fileName: str = str(pathlib.Path(tempDir) / "benchmark.srt")
+        for titlesCount in cliArgs.titles:
+            content: str = corpus.generateSubRip(
+                titlesCount,
+                options=corpusOptions
+            )
+            for operationName in cliArgs.operations:
+                operation: Operation = operations[operationName]
+                seconds: float = min(
+                    measure(operation, content, fileName, False)[0]
+                    for _ in range(cliArgs.repeat)
+                )
+                peakMemory: int = measure(
+                    operation,
+                    content,
+                    fileName,
+                    True
+                )[1]
+                result: Result = Result(
+                    operationName,
+                    titlesCount,
+                    seconds,
+                    1 / seconds,
+                    peakMemory
+                )
+                results.append(result)
+                print(
+                    "".join((
+                        f"{operationName:<16}{titlesCount:>8}",
+                        f"{seconds:>12.4f}{result.opsPerSecond:>12.2f}",
+                        f"{peakMemory / 1024 / 1024:>12.1f}"
+                    ))
+                )
+
+    if cliArgs.output:
+        pathlib.Path(cliArgs.output).write_text(
+            json.dumps(
+                {
+                    "date": datetime.datetime.now().isoformat(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "numpy": timecodes.numpy is not None,
+                    "corpus": corpusOptions._asdict(),
+                    "repeat": cliArgs.repeat,
+                    "results": [r._asdict() for r in results]
+                },
+                indent=4
+            ),
+            encoding="utf-8"
+        )
+
+    if cliArgs.compare:
+        previousResults: typing.List[dict] = json.loads(
+            pathlib.Path(cliArgs.compare).read_text(encoding="utf-8")
+        )["results"]
+        if not compareResults(results, previousResults, cliArgs.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+# compares two ways of shifting all the timings in a SubRip file:
+#
+# - per title: every timing is parsed, shifted and formatted on its own,
+#   and then put into the buffer with its own replace (how it used to be);
+# - single replace: all the timings are parsed and formatted in one go,
+#   and the whole span of timings is put into the buffer with one replace.
+#
+# The buffer here is just a string, so this measures only the work
+# done on the plugin side. In Sublime Text every replace also adds
+# an undo record and triggers re-highlighting, so the difference
+# there is even bigger than the edits count suggests.
+#
+# Usage: python ./benchmarks/shift_timings.py [--titles 5000] [--repeat 5]
+
+from array import array
+import argparse
+import pathlib
+import sys
+import time
+import typing
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / "plugins"))
+
+from core import subrip, timecodes  # noqa: E402
+
+import corpus  # noqa: E402
+
+
+def shiftTiming(timing: str, milliseconds: int) -> str:
+    timingMatches = subrip.regexSrtTiming.match(timing)
+    if timingMatches is None:
+        raise ValueError("The title timing has a wrong format.")
+    return " ".join((
+        subrip.millisecondsToTimeCode(
+            subrip.timeCodeToMilliseconds(timingMatches.group(1))
+            + milliseconds
+        ),
+        timingMatches.group(2),
+        subrip.millisecondsToTimeCode(
+            subrip.timeCodeToMilliseconds(timingMatches.group(3))
+            + milliseconds
+        )
+    ))
+
+
+def shiftPerTitle(content: str, milliseconds: int) -> typing.Tuple[str, int]:
+    document: subrip.SubRipDocument = subrip.parseSubRip(content)
+    edits: int = 0
+    for title in reversed(document.titles):
+        if title.timing is None:
+            continue
+        begin, end = title.lineRegion(1)
+        content = "".join((
+            content[:begin],
+            shiftTiming(title.timing, milliseconds),
+            content[end:]
+        ))
+        edits += 1
+    return (content, edits)
+
+
+def shiftSingleReplace(
+    content: str,
+    milliseconds: int
+) -> typing.Tuple[str, int]:
+    document: subrip.SubRipDocument = subrip.parseSubRip(content)
+    timedTitles: typing.List[subrip.SubRipTitle] = [
+        t for t in document.titles if t.timing is not None
+    ]
+    starts, ends = timecodes.timingsToMilliseconds(
+        [typing.cast(str, t.timing) for t in timedTitles]
+    )
+    shiftedTimings: typing.List[str] = timecodes.millisecondsToTimings(
+        array("q", [t + milliseconds for t in starts]),
+        array("q", [t + milliseconds for t in ends])
+    )
+    begin: int = timedTitles[0].lineRegion(1)[0]
+    end: int = timedTitles[-1].lineRegion(1)[1]
+    content = "".join((
+        content[:begin],
+        timecodes.replaceTimings(
+            content[begin:end],
+            begin,
+            timedTitles,
+            shiftedTimings
+        ),
+        content[end:]
+    ))
+    return (content, 1)
+
+
+def measure(
+    shift: typing.Callable[[str, int], typing.Tuple[str, int]],
+    content: str,
+    repeat: int
+) -> typing.Tuple[float, int, str]:
+    best: float = float("inf")
+    result: str = ""
+    edits: int = 0
+    for _ in range(repeat):
+        started: float = time.perf_counter()
+        result, edits = shift(content, 1234)
+        best = min(best, time.perf_counter() - started)
+    return (best, edits, result)
+
+
+def main() -> None:
+    argParser = argparse.ArgumentParser(
+        description="Benchmark of shifting all timings in a SubRip file"
+    )
+    argParser.add_argument("--titles", type=int, default=5000)
+    argParser.add_argument("--repeat", type=int, default=5)
+    cliArgs = argParser.parse_args()
+
+    content: str = corpus.generateSubRip(cliArgs.titles)
+    print(
+        f"{cliArgs.titles} titles, {len(content)} characters,",
+        f"NumPy: {'yes' if timecodes.numpy is not None else 'no'}"
+    )
+
+    perTitleTime, perTitleEdits, perTitleResult = measure(
+        shiftPerTitle,
+        content,
+        cliArgs.repeat
+    )
+    singleTime, singleEdits, singleResult = measure(
+        shiftSingleReplace,
+        content,
+        cliArgs.repeat
+    )
+    if perTitleResult != singleResult:
+        raise SystemExit("[ERROR] The approaches produced different results")
+
+    print(f"{'approach':<16}{'best, ms':>12}{'edits':>10}")
+    print(f"{'per title':<16}{perTitleTime * 1000:>12.2f}{perTitleEdits:>10}")
+    print(f"{'single replace':<16}{singleTime * 1000:>12.2f}{singleEdits:>10}")
+    print(f"speedup: {perTitleTime / singleTime:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,384 @@
+# a stand-in for Sublime Text API, just enough to run the plugin
+# commands outside of the editor for benchmarking.
+#
+# Buffer edits are not applied right away: they are collected and
+# applied in one go on the next read, the same way they'd be cheap
+# in Sublime Text itself (which doesn't copy the whole buffer on every
+# replace), so the measurements are about the plugin code
+import bisect
+import typing
+
+ADD_TO_SELECTION: int = 2
+COMPLETION_FORMAT_TEXT: int = 0
+DRAW_NO_FILL: int = 32
+DRAW_NO_OUTLINE: int = 256
+DRAW_SQUIGGLY_UNDERLINE: int = 4096
+KEEP_OPEN_ON_FOCUS_LOST: int = 2
+KIND_ID_COLOR_REDISH: int = 9
+KIND_ID_COLOR_YELLOWISH: int = 11
+KIND_ID_VARIABLE: int = 7
+LAYOUT_BELOW: int = 2
+
+Value = typing.Any
+
+
+def error_message(msg: str) -> None:
+    print(f"[ERROR] {msg}")
+
+
+def message_dialog(msg: str) -> None:
+    pass
+
+
+def ok_cancel_dialog(msg: str, ok_title: str = "") -> bool:
+    return True
+
+
+def open_dialog(*args: typing.Any, **kwargs: typing.Any) -> None:
+    pass
+
+
+def set_timeout(f: typing.Callable[[], None], delay: int = 0) -> None:
+    f()
+
+
+def set_timeout_async(f: typing.Callable[[], None], delay: int = 0) -> None:
+    f()
+
+
+class Html(str):
+    pass
+
+
+class Settings(dict):
+    pass
+
+
+def load_settings(name: str) -> Settings:
+    return Settings()
+
+
+class Region:
+    __slots__ = ("a", "b")
+
+    def __init__(self, a: int, b: typing.Optional[int] = None) -> None:
+        self.a = a
+        self.b = a if b is None else b
+
+    def begin(self) -> int:
+        return min(self.a, self.b)
+
+    def end(self) -> int:
+        return max(self.a, self.b)
+
+    def empty(self) -> bool:
+        return self.a == self.b
+
+
+class Selection(list):
+    def add(self, region: Region) -> None:
+        self.append(region)
+
+    def add_all(self, regions: typing.Iterable[Region]) -> None:
+        self.extend(regions)
+
+
+class Edit:
+    pass
+
+
+class HistoricPosition:
+    def __init__(self, pt: int) -> None:
+        self.pt = pt
+
+
+class TextChange:
+    def __init__(self, a: int, b: int, text: str) -> None:
+        self.a = HistoricPosition(a)
+        self.b = HistoricPosition(b)
+        self.str = text
+
+
+class QuickPanelItem:
+    def __init__(self, trigger: str, **kwargs: typing.Any) -> None:
+        self.trigger = trigger
+
+
+class CompletionItem:
+    def __init__(self, trigger: str, **kwargs: typing.Any) -> None:
+        self.trigger = trigger
+        self.completion: str = kwargs.get("completion", trigger)
+
+
+class Phantom:
+    def __init__(self, region: Region, content: str, layout: int) -> None:
+        self.region = region
+        self.content = content
+
+
+class PhantomSet:
+    def __init__(self, view: "View", key: str = "") -> None:
+        self.phantoms: typing.List[Phantom] = []
+
+    def update(self, phantoms: typing.List[Phantom]) -> None:
+        self.phantoms = phantoms
+
+
+class Sheet:
+    def __init__(self, view: "View") -> None:
+        self._view = view
+
+    def view(self) -> "View":
+        return self._view
+
+
+class Buffer:
+    def __init__(self, view: "View") -> None:
+        self._view = view
+
+    def id(self) -> int:
+        return self._view.buffer_id()
+
+    def primary_view(self) -> "View":
+        return self._view
+
+
+viewsCount: int = 0
+
+
+class View:
+    def __init__(
+        self,
+        content: str = "",
+        fileName: typing.Optional[str] = None
+    ) -> None:
+        global viewsCount
+        viewsCount += 1
+        self._id: int = viewsCount
+        self._content: str = content
+        self._size: int = len(content)
+        self._pendingEdits: typing.List[typing.Tuple[int, int, str]] = []
+        self._lineStarts: typing.Optional[typing.List[int]] = None
+        self._fileName = fileName
+        self._window: typing.Optional["Window"] = None
+        self._sel: Selection = Selection([Region(0)])
+        self._changeCount: int = 0
+        self._viewport: typing.Tuple[float, float] = (0.0, 0.0)
+        self.textChangeListeners: typing.List[typing.Any] = []
+
+    def _flush(self) -> None:
+        if not self._pendingEdits:
+            return
+        edits = self._pendingEdits
+        self._pendingEdits = []
+        self._lineStarts = None
+        # usually the edits go from the end of the buffer to its
+        # beginning without overlapping, then it's a single pass
+        if all(
+            edits[i][0] >= edits[i + 1][1] for i in range(len(edits) - 1)
+        ):
+            pieces: typing.List[str] = []
+            position: int = len(self._content)
+            for begin, end, text in edits:
+                pieces.append(self._content[end:position])
+                pieces.append(text)
+                position = begin
+            pieces.append(self._content[:position])
+            self._content = "".join(reversed(pieces))
+            return
+        for begin, end, text in edits:
+            self._content = self._content[:begin] + text + self._content[end:]
+
+    def _getLineStarts(self) -> typing.List[int]:
+        self._flush()
+        if self._lineStarts is None:
+            self._lineStarts = [0]
+            position: int = self._content.find("\n")
+            while position != -1:
+                self._lineStarts.append(position + 1)
+                position = self._content.find("\n", position + 1)
+        return self._lineStarts
+
+    def id(self) -> int:
+        return self._id
+
+    def buffer_id(self) -> int:
+        return self._id
+
+    def buffer(self) -> Buffer:
+        return Buffer(self)
+
+    def is_valid(self) -> bool:
+        return True
+
+    def file_name(self) -> typing.Optional[str]:
+        return self._fileName
+
+    def window(self) -> typing.Optional["Window"]:
+        return self._window
+
+    def sheet(self) -> Sheet:
+        return Sheet(self)
+
+    def size(self) -> int:
+        return self._size
+
+    def change_count(self) -> int:
+        return self._changeCount
+
+    def match_selector(self, pt: int, selector: str) -> bool:
+        return True
+
+    def sel(self) -> Selection:
+        return self._sel
+
+    def substr(self, x: typing.Union[Region, int]) -> str:
+        self._flush()
+        if isinstance(x, Region):
+            return self._content[x.begin():x.end()]
+        return self._content[x:x + 1]
+
+    def text_point(self, row: int, col: int) -> int:
+        lineStarts: typing.List[int] = self._getLineStarts()
+        if row >= len(lineStarts):
+            return self._size
+        return min(lineStarts[row] + col, self._size)
+
+    def rowcol(self, tp: int) -> typing.Tuple[int, int]:
+        lineStarts: typing.List[int] = self._getLineStarts()
+        row: int = bisect.bisect_right(lineStarts, tp) - 1
+        return (row, tp - lineStarts[row])
+
+    def line(self, x: typing.Union[Region, int]) -> Region:
+        point: int = x.begin() if isinstance(x, Region) else x
+        lineStarts: typing.List[int] = self._getLineStarts()
+        row: int = bisect.bisect_right(lineStarts, point) - 1
+        end: int = (
+            lineStarts[row + 1] - 1 if row + 1 < len(lineStarts)
+            else self._size
+        )
+        return Region(lineStarts[row], end)
+
+    def split_by_newlines(self, region: Region) -> typing.List[Region]:
+        regions: typing.List[Region] = []
+        begin: int = region.begin()
+        for line in self.substr(region).split("\n"):
+            regions.append(Region(begin, begin + len(line)))
+            begin += len(line) + 1
+        return regions
+
+    def _modify(self, begin: int, end: int, text: str) -> None:
+        self._pendingEdits.append((begin, end, text))
+        self._size += len(text) - (end - begin)
+        self._changeCount += 1
+        for listener in self.textChangeListeners:
+            listener.on_text_changed([TextChange(begin, end, text)])
+
+    def replace(self, edit: Edit, region: Region, text: str) -> None:
+        self._modify(region.begin(), region.end(), text)
+
+    def insert(self, edit: Edit, point: int, text: str) -> int:
+        self._modify(point, point, text)
+        return len(text)
+
+    def run_command(
+        self,
+        cmd: str,
+        args: typing.Optional[dict] = None
+    ) -> None:
+        import sublime_plugin
+        sublime_plugin.runCommand(self, cmd, args or {})
+
+    def set_status(self, key: str, value: str) -> None:
+        pass
+
+    def erase_status(self, key: str) -> None:
+        pass
+
+    def show(self, x: typing.Any, *args: typing.Any) -> None:
+        pass
+
+    def show_at_center(self, x: typing.Any, *args: typing.Any) -> None:
+        pass
+
+    def add_regions(self, key: str, *args: typing.Any) -> None:
+        pass
+
+    def erase_regions(self, key: str) -> None:
+        pass
+
+    def viewport_position(self) -> typing.Tuple[float, float]:
+        return self._viewport
+
+    def set_viewport_position(
+        self,
+        xy: typing.Tuple[float, float],
+        animate: bool = True
+    ) -> None:
+        self._viewport = xy
+
+
+class Window:
+    def __init__(
+        self,
+        projectData: typing.Optional[dict] = None,
+        projectFileName: typing.Optional[str] = None
+    ) -> None:
+        self._views: typing.List[View] = []
+        self._projectData = projectData
+        self._projectFileName = projectFileName
+
+    def add_view(self, view: View) -> View:
+        view._window = self
+        self._views.append(view)
+        return view
+
+    def views(self) -> typing.List[View]:
+        return self._views
+
+    def active_view(self) -> typing.Optional[View]:
+        return self._views[0] if self._views else None
+
+    def active_sheet(self) -> Sheet:
+        return Sheet(self._views[0])
+
+    def project_file_name(self) -> typing.Optional[str]:
+        return self._projectFileName
+
+    def project_data(self) -> typing.Optional[dict]:
+        return self._projectData
+
+    def set_project_data(self, data: dict) -> None:
+        self._projectData = data
+
+    def find_open_file(self, fileName: str) -> typing.Optional[View]:
+        for view in self._views:
+            if view.file_name() == fileName:
+                return view
+        return None
+
+    # the file is not actually read, that's not what is being measured
+    def open_file(self, fileName: str, flags: int = 0) -> View:
+        return self.find_open_file(fileName) or self.add_view(
+            View("", fileName)
+        )
+
+    def get_sheet_index(self, sheet: Sheet) -> typing.Tuple[int, int]:
+        return (0, 0)
+
+    def set_sheet_index(self, sheet: Sheet, group: int, index: int) -> None:
+        pass
+
+    def select_sheets(self, sheets: typing.List[Sheet]) -> None:
+        pass
+
+    def show_quick_panel(self, *args: typing.Any, **kwargs: typing.Any) -> None:
+        pass
+
+    def run_command(
+        self,
+        cmd: str,
+        args: typing.Optional[dict] = None
+    ) -> None:
+        import sublime_plugin
+        sublime_plugin.runCommand(self, cmd, args or {})
@@ -0,0 +1,85 @@
+# a stand-in for Sublime Text plugin API, see sublime.py next to it
+import re
+import typing
+
+import sublime
+
+commands: typing.Dict[str, type] = {}
+
+
+def commandName(commandClass: type) -> str:
+    name: str = commandClass.__name__
+    if name.endswith("Command"):
+        name = name[:-len("Command")]
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", name).lower()
+
+
+class CommandRegistry(type):
+    def __init__(
+        cls,
+        name: str,
+        bases: typing.Tuple[type, ...],
+        namespace: dict
+    ) -> None:
+        super().__init__(name, bases, namespace)
+        commands[commandName(cls)] = cls
+
+
+class TextCommand(metaclass=CommandRegistry):
+    def __init__(self, view: sublime.View) -> None:
+        self.view = view
+
+
+class WindowCommand(metaclass=CommandRegistry):
+    def __init__(self, window: sublime.Window) -> None:
+        self.window = window
+
+
+def runCommand(
+    target: typing.Union[sublime.View, sublime.Window],
+    name: str,
+    args: dict
+) -> None:
+    commandClass: type = commands[name]
+    if issubclass(commandClass, TextCommand):
+        view: typing.Optional[sublime.View] = (
+            target if isinstance(target, sublime.View)
+            else target.active_view()
+        )
+        commandClass(view).run(sublime.Edit(), **args)
+    else:
+        window: typing.Optional[sublime.Window] = (
+            target if isinstance(target, sublime.Window)
+            else target.window()
+        )
+        commandClass(window).run(**args)
+
+
+class EventListener:
+    pass
+
+
+class ViewEventListener:
+    def __init__(self, view: sublime.View) -> None:
+        self.view = view
+
+
+class TextChangeListener:
+    def __init__(self) -> None:
+        self.buffer: typing.Optional[sublime.Buffer] = None
+
+    def attach(self, buffer: sublime.Buffer) -> None:
+        self.buffer = buffer
+        buffer.primary_view().textChangeListeners.append(self)
+
+
+class CommandInputHandler:
+    pass
+
+
+class TextInputHandler(CommandInputHandler):
+    pass
+
+
+class ListInputHandler(CommandInputHandler):
+    pass
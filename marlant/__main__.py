@@ -0,0 +1,14 @@
+# headless tools, run from the package folder:
+#
+#   python -m marlant validate ./path/to/subtitles
+#
+# the code lives in the sublime-free core of the plugin
+import pathlib
+import sys
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / "plugins"))
+
+from core import cli  # noqa: E402
+
+if __name__ == "__main__":
+    sys.exit(cli.main())
@@ -9,9 +9,17 @@ import typing
 from .plugins import (
     _common as common
 )
+from .plugins._common import (
+    DocumentChangeListener,
+    DocumentsCacheEvictionListener
+)
 from .plugins.files import (
     MarlantCreateTranslationFileCommand,
-    MarlantOpenTranslationFileCommand
+    MarlantCreateTranslationFilesCommand,
+    MarlantSyncTranslationFileCommand,
+    MarlantOpenTranslationFileCommand,
+    TranslationProgressListener,
+    SyncTranslationViewsListener
 )
 from .plugins.titles import (
     MarlantRenumberTitlesCommand,
@@ -20,16 +28,23 @@ from .plugins.titles import (
     MarlantJoinTitlesCommand
 )
 from .plugins.timing import (
-    MarlantShiftTimingsCommand
+    MarlantShiftTimingsCommand,
+    MarlantConvertTimingsFramerateCommand,
+    MarlantSyncTimingsCommand
 )
 from .plugins.validation import (
     MarlantValidateAllTitlesCommand,
     MarlantExcludeTitleFromValidationsCommand,
-    MarlantClearExcludedTitlesList
+    MarlantClearExcludedTitlesList,
+    BackgroundValidationListener
 )
 from .plugins.dictionary import (
     MarlantAddToDictionary,
-    MarlantFindInDictionary
+    MarlantFindInDictionary,
+    MarlantImportDictionary,
+    MarlantExportDictionary,
+    MarlantCheckDictionaryConsistency,
+    DictionaryCompletionsListener
 )
 
 
@@ -47,9 +62,3 @@ def plugin_unloaded() -> None:
     # print("MarLant plugin has unloaded")
     pass
 
-
-# class FileEventListener(sublime_plugin.ViewEventListener):
-#     def on_post_save_async(self):
-#         # TODO: show translation progress (if in translation mode)
-#         if self.view.match_selector(0, "text.srt"):
-#             print("File was saved")
@@ -1,35 +1,43 @@
 import sublime
+import sublime_plugin
 
-import re
+import pathlib
 import typing
 
+from .core.subrip import (
+    regexLanguageCode,
+    regexSrtNumber,
+    regexSrtTimingString,
+    regexSrtTiming,
+    regexSrtTimeCode,
+    wrongFormatError,
+    wrongTitleFormatError,
+    SubRipFormatError,
+    SubRipTitle,
+    SubRipDocument,
+    parseSubRip
+)
+from .core.validation import (
+    maxTitleLineLengthFallback,
+    maxTitleLinesFallback,
+    minTitleDurationFallback,
+    maxTitleDurationFallback,
+    htmlTagsToWatchForFallback
+)
+from .core.translation import (
+    placeholdersInsteadOfEmptyLinesFallback,
+    titlePlaceholderFallback
+)
+from .core import translation
+from .core.settings import Settings
+
 # will be read on plugin_loaded()
-marlantSettings: sublime.Settings = {}
+marlantSettings: Settings = {}
 # fallback values
-maxTitleLineLengthFallback: int = 41
-maxTitleLinesFallback: int = 3
-minTitleDurationFallback: int = 500
-maxTitleDurationFallback: int = 6000
-htmlTagsToWatchForFallback: typing.List[str] = ["b", "i", "u", "font"]
-
-placeholdersInsteadOfEmptyLinesFallback: bool = True
-titlePlaceholderFallback: typing.Final[str] = "[ ... ]"
-
-regexLanguageCode: typing.Final[typing.Pattern] = re.compile(r"^[A-Za-z]+$")
-regexSrtNumber: typing.Final[typing.Pattern] = re.compile(r"^[1-9]{1}\d*$")
-# regexSrtTimingString = # r"^\d{2}:\d{2}:\d{2},\d{3} --> \d{2}:\d{2}:\d{2},\d{3}$"
-regexSrtTimingString = r"^(\d{2}:\d{2}:\d{2},\d{3}) (-->) (\d{2}:\d{2}:\d{2},\d{3})$"
-regexSrtTiming: typing.Final[typing.Pattern] = re.compile(regexSrtTimingString)
-regexSrtTimeCode: typing.Final[typing.Pattern] = re.compile(r"^\d{2}:\d{2}:\d{2},\d{3}$")
-
-wrongFormatError: typing.Final[str] = " ".join((
-    "The SubRip content seems to have",
-    "a wrong format, because"
-))
-wrongTitleFormatError: typing.Final[str] = " ".join((
-    "Current title seems to have",
-    "incorrect format, because"
-))
+backgroundValidationFallback: bool = True
+backgroundValidationDelayFallback: int = 500
+syncTranslationViewsFallback: bool = True
+dictionaryCompletionsFallback: bool = True
 
 
 def scrollToProblematicLine(
@@ -51,57 +59,171 @@ def scrollToProblematicLineNumber(
     scrollToProblematicLine(view, lineRegion)
 
 
-def parseTitleString(
+class DocumentsCacheEntry:
+    def __init__(self, document: SubRipDocument, changeCount: int) -> None:
+        self.document: SubRipDocument = document
+        # the buffer change count the document (including the changes
+        # marked in it but not yet re-parsed) corresponds to
+        self.changeCount: int = changeCount
+
+
+# parsed documents per buffer ID
+documentsCache: typing.Dict[int, DocumentsCacheEntry] = {}
+
+
+def getDocument(view: sublime.View) -> SubRipDocument:
+    changeCount: int = view.change_count()
+    cached = documentsCache.get(view.buffer_id())
+    if cached is not None and cached.changeCount == changeCount:
+        cached.document.reparseChanged(
+            lambda begin, end: view.substr(sublime.Region(begin, end))
+        )
+        return cached.document
+
+    document: SubRipDocument = parseSubRip(
+        view.substr(sublime.Region(0, view.size()))
+    )
+    documentsCache[view.buffer_id()] = DocumentsCacheEntry(
+        document,
+        changeCount
+    )
+    return document
+
+
+class DocumentChangeListener(sublime_plugin.TextChangeListener):
+    @classmethod
+    def is_applicable(cls, buffer: sublime.Buffer) -> bool:
+        view = buffer.primary_view()
+        return view is not None and view.match_selector(0, "text.srt")
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.lastChangeCount: typing.Optional[int] = None
+
+    def on_text_changed(self, changes: typing.List[sublime.TextChange]) -> None:
+        view = self.buffer.primary_view()
+        changeCount: int = view.change_count()
+        previousChangeCount = self.lastChangeCount
+        self.lastChangeCount = changeCount
+
+        cached = documentsCache.get(self.buffer.id())
+        if cached is None or cached.changeCount == changeCount:
+            return
+        # the document was parsed at some point that this listener
+        # does not know about, so the changes can't be applied to it
+        if cached.changeCount != previousChangeCount:
+            del documentsCache[self.buffer.id()]
+            return
+        for change in changes:
+            cached.document.markChanged(
+                change.a.pt,
+                change.b.pt,
+                len(change.str)
+            )
+        cached.changeCount = changeCount
+
+
+class DocumentsCacheEvictionListener(sublime_plugin.EventListener):
+    def on_close(self, view: sublime.View) -> None:
+        documentsCache.pop(view.buffer_id(), None)
+
+
+def getCurrentTitle(
     view: sublime.View,
-    titleRegions: typing.List[sublime.Region]
-) -> typing.Tuple[int, str, typing.List[sublime.Region]]:
-    # for index, region in enumerate(titleRegions):
-    #     line = view.substr(region).strip()
-    #     print(line)
-    if len(titleRegions) < 3:
+    document: SubRipDocument
+) -> int:
+    currentTitlePoint: int = view.sel()[0].b
+    titleIndex: typing.Optional[int] = document.titleIndexAt(
+        currentTitlePoint
+    )
+    if titleIndex is None:
         raise ValueError(
             " ".join((
-                wrongTitleFormatError,
-                "it must have at least one line of text",
-                "in addition to the ordinal and timing."
+                "The cursor is on an empty line,",
+                "can't guess the current title."
             ))
         )
-    titleOrdinal = view.substr(titleRegions[0]).strip()
-    if regexSrtNumber.fullmatch(titleOrdinal) is None:
-        raise ValueError(
+    document.titles[titleIndex].checkFormat()
+    return titleIndex
+
+
+# titles touched by non-empty selections,
+# or all the titles if nothing is selected
+def getSelectedTitles(
+    view: sublime.View,
+    document: SubRipDocument
+) -> typing.List[SubRipTitle]:
+    selectedRegions: typing.List[sublime.Region] = [
+        r for r in view.sel() if not r.empty()
+    ]
+    if not selectedRegions:
+        return document.titles
+    selectedTitles: typing.List[SubRipTitle] = []
+    lastTitleIndex: int = -1
+    for region in selectedRegions:
+        for titleIndex in document.titlesIndexesIn(
+            region.begin(),
+            region.end()
+        ):
+            # selections can touch the same title
+            if titleIndex > lastTitleIndex:
+                selectedTitles.append(document.titles[titleIndex])
+                lastTitleIndex = titleIndex
+    return selectedTitles
+
+
+# the original of the translation file in the view (some-file.srt
+# for some-file-ru.srt), parsed and checked; errors are reported here
+def getOriginalDocument(
+    view: sublime.View
+) -> typing.Optional[typing.Tuple[pathlib.Path, SubRipDocument]]:
+    translationFileValue: str = view.file_name()
+    if not translationFileValue:
+        sublime.error_message(
+            "You can run this command only from an existing file."
+        )
+        return None
+    originalFile: typing.Optional[pathlib.Path] = (
+        translation.originalFilePath(pathlib.Path(translationFileValue))
+    )
+    if originalFile is None or not originalFile.is_file():
+        sublime.error_message(
             " ".join((
-                wrongTitleFormatError,
-                "the first line should be a title ordinal."
+                "This doesn't look like a translation file,",
+                "there should be an original file next to it",
+                "(some-file.srt for some-file-ru.srt)."
             ))
         )
-    titleTiming = view.substr(titleRegions[1]).strip()
-    if regexSrtTiming.fullmatch(titleTiming) is None:
-        raise ValueError(
+        return None
+
+    # the original might have unsaved changes
+    originalView = view.window().find_open_file(str(originalFile))
+    try:
+        originalDocument: SubRipDocument = (
+            getDocument(originalView) if originalView
+            else parseSubRip(originalFile.read_text(encoding="utf-8-sig"))
+        )
+        originalDocument.checkStructure(True)
+    except (OSError, UnicodeDecodeError) as ex:
+        print(f"[ERROR] {ex}")
+        sublime.error_message(
             " ".join((
-                wrongTitleFormatError,
-                "the second line should be a title timing."
+                "There was an error reading the original file.",
+                "Check console for details."
             ))
         )
-    return int(titleOrdinal), titleTiming, titleRegions[2:]
+        return None
+    except SubRipFormatError as ex:
+        sublime.error_message(f"{originalFile.name}: {ex}")
+        return None
+    return (originalFile, originalDocument)
 
 
 def splitStringInTwo(stringToSplit: str) -> typing.Tuple[str, str]:
-    titlePlaceholder = marlantSettings.get(
-        "title_placeholder",
-        titlePlaceholderFallback
-    )
-    middlePoint: int = len(stringToSplit) // 2
-    while (
-        stringToSplit[middlePoint] != " "
-        and middlePoint != len(stringToSplit) - 1
-    ):
-        middlePoint += 1
-    firstHalf: str = stringToSplit[:middlePoint]
-    secondHalf: str = stringToSplit[middlePoint:]
-    if len(secondHalf) == 1:
-        firstHalf = stringToSplit
-        secondHalf = ""
-    return (
-        firstHalf if firstHalf else titlePlaceholder,
-        secondHalf.strip() if secondHalf else titlePlaceholder
+    return translation.splitStringInTwo(
+        stringToSplit,
+        marlantSettings.get(
+            "title_placeholder",
+            titlePlaceholderFallback
+        )
     )
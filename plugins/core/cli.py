@@ -0,0 +1,618 @@
+import argparse
+import json
+import multiprocessing
+import multiprocessing.pool
+import pathlib
+import re
+import sys
+import typing
+import xml.etree.ElementTree as ET
+
+from . import subrip
+from . import translation
+from . import validation
+
+# exit codes
+exitCodeOK: typing.Final[int] = 0
+exitCodeValidationFailed: typing.Final[int] = 1
+# the same code argparse uses for wrong arguments
+exitCodeError: typing.Final[int] = 2
+
+# the plugin's own settings file, used as the defaults
+packageSettingsPath: typing.Final[pathlib.Path] = (
+    pathlib.Path(__file__).parent.parent.parent / "marlant.sublime-settings"
+)
+
+# Sublime Text resources are JSON with comments and trailing commas
+regexJsonComments: typing.Final[typing.Pattern] = re.compile(
+    r"(\"(?:\\.|[^\"\\])*\")|//[^\n]*|/\*.*?\*/|,(?=\s*[}\]])",
+    re.DOTALL
+)
+
+
+class FileReport(typing.NamedTuple):
+    path: str
+    problems: typing.List[validation.ValidationProblem]
+    # if the file could not be read at all
+    error: typing.Optional[str] = None
+
+    @property
+    def errorsCount(self) -> int:
+        return sum(
+            1 for p in self.problems if p.severity == validation.severityError
+        )
+
+
+class TranslationReport(typing.NamedTuple):
+    originalPath: str
+    generatedPath: str
+    error: typing.Optional[str] = None
+
+
+def loadSublimeJson(path: pathlib.Path) -> typing.Any:
+    return json.loads(
+        regexJsonComments.sub(
+            lambda m: m.group(1) or "",
+            path.read_text(encoding="utf-8")
+        )
+    )
+
+
+def findSubRipFiles(paths: typing.List[str]) -> typing.List[pathlib.Path]:
+    files: typing.List[pathlib.Path] = []
+    for p in paths:
+        path: pathlib.Path = pathlib.Path(p)
+        if path.is_dir():
+            files.extend(sorted(path.rglob("*.srt")))
+        else:
+            files.append(path)
+    return files
+
+
+# files bigger than two parts of that size are split into parts
+# that are validated in parallel, so a single big file doesn't keep
+# one process busy while the others are idle
+minFilePartSize: typing.Final[int] = 1024 * 1024
+
+ValidationTask = typing.Tuple[
+    str,
+    validation.ValidationSettings,
+    typing.List[typing.Union[int, str]]
+]
+
+
+def readSubRipFile(path: str) -> str:
+    # universal newlines, the same as in Sublime Text buffer
+    return pathlib.Path(path).read_text(encoding="utf-8-sig")
+
+
+def validateFile(task: ValidationTask) -> FileReport:
+    path, settings, excludedTitles = task
+    try:
+        content: str = readSubRipFile(path)
+    except (OSError, UnicodeDecodeError) as ex:
+        return FileReport(path, [], str(ex))
+    document: subrip.SubRipDocument = subrip.parseSubRip(content)
+    return FileReport(
+        path,
+        list(
+            validation.validateDocument(
+                document,
+                settings,
+                validation.excludedTitlesIdentities(excludedTitles, document)
+            )
+        )
+    )
+
+
+class FilePart(typing.NamedTuple):
+    # the lines of the part
+    content: str
+    firstLineIndex: int
+    # of the whole file
+    lineCount: int
+    endsWithNewline: bool
+    settings: validation.ValidationSettings
+    excludedTitles: typing.FrozenSet[str]
+    state: validation.TitlesState
+    isLastPart: bool
+
+
+# the problems of the whole file (found only in the last part, as it has
+# the last title) and the problems of the titles in the part
+def validateFilePart(
+    part: FilePart
+) -> typing.Tuple[
+    typing.List[validation.ValidationProblem],
+    typing.List[validation.ValidationProblem]
+]:
+    # the offsets are of no use for validation
+    titles, whitespaceLines = subrip.parseTitles(
+        part.content.split("\n"),
+        part.firstLineIndex,
+        0
+    )
+    document: subrip.SubRipDocument = subrip.SubRipDocument(
+        titles,
+        len(part.content),
+        part.lineCount,
+        part.endsWithNewline,
+        whitespaceLines
+    )
+    return (
+        list(validation.checkDocument(document, part.settings))
+        if part.isLastPart else [],
+        list(
+            validation.validateTitles(
+                document,
+                part.settings,
+                part.excludedTitles,
+                part.state,
+                part.isLastPart
+            )
+        )
+    )
+
+
+# gives the same problems as validateFile(), but the parts of the file
+# are validated in the pool, and the titles state at the beginning of every
+# part is found from the titles right before it
+def validateBigFile(
+    task: ValidationTask,
+    pool: multiprocessing.pool.Pool,
+    partsCount: int
+) -> FileReport:
+    path, settings, excludedTitles = task
+    # titles numbers (made by the earlier versions) can only be found
+    # in the whole document
+    if any(not isinstance(t, str) for t in excludedTitles):
+        return pool.apply(validateFile, (task,))
+    try:
+        content: str = readSubRipFile(path)
+    except (OSError, UnicodeDecodeError) as ex:
+        return FileReport(path, [], str(ex))
+
+    lines: typing.List[str] = content.split("\n")
+    endsWithNewline: bool = content.endswith("\n")
+    if endsWithNewline:
+        lines.pop()
+    partsStarts: typing.List[int] = validation.findPartsStarts(
+        lines,
+        partsCount
+    )
+    if len(partsStarts) < 2:
+        return pool.apply(validateFile, (task,))
+    excludedIdentities: typing.FrozenSet[str] = frozenset(
+        typing.cast(typing.List[str], excludedTitles)
+    )
+    partsEnds: typing.List[int] = partsStarts[1:] + [len(lines)]
+    parts: typing.List[FilePart] = [
+        FilePart(
+            "\n".join(lines[begin:end]),
+            begin,
+            len(lines),
+            endsWithNewline,
+            settings,
+            excludedIdentities,
+            validation.titlesStateAt(lines, begin, excludedIdentities),
+            end == len(lines)
+        )
+        for begin, end in zip(partsStarts, partsEnds)
+    ]
+    del lines
+
+    partsProblems = pool.map(validateFilePart, parts, chunksize=1)
+    problems: typing.List[validation.ValidationProblem] = list(
+        partsProblems[-1][0]
+    )
+    for _, titlesProblems in partsProblems:
+        problems.extend(titlesProblems)
+    return FileReport(path, problems)
+
+
+def getFileSize(path: pathlib.Path) -> int:
+    try:
+        return path.stat().st_size
+    except OSError:  # the error will be reported when reading it
+        return 0
+
+
+def validateFiles(
+    files: typing.List[pathlib.Path],
+    settings: validation.ValidationSettings,
+    projectData: typing.Optional[dict],
+    jobs: int
+) -> typing.List[FileReport]:
+    tasks: typing.List[ValidationTask] = [
+        (
+            str(f),
+            settings,
+            validation.loadExcludedTitles(projectData, f.name)
+        )
+        for f in files
+    ]
+    if jobs == 1:
+        return [validateFile(t) for t in tasks]
+    # how many parts each file is split into
+    partsCounts: typing.List[int] = [
+        min(jobs, getFileSize(f) // minFilePartSize) for f in files
+    ]
+    bigFiles: typing.List[int] = [
+        i for i, partsCount in enumerate(partsCounts) if partsCount > 1
+    ]
+    if len(tasks) < 2 and not bigFiles:
+        return [validateFile(t) for t in tasks]
+    with multiprocessing.Pool(
+        min(jobs, sum(max(1, c) for c in partsCounts))
+    ) as pool:
+        # other files are validated while big files are being split
+        smallFilesReports = pool.map_async(
+            validateFile,
+            [t for i, t in enumerate(tasks) if partsCounts[i] <= 1],
+            chunksize=1
+        )
+        bigFilesReports: typing.Dict[int, FileReport] = {
+            i: validateBigFile(tasks[i], pool, partsCounts[i])
+            for i in bigFiles
+        }
+        # keeps the order of the files
+        smallFilesReportsIterator: typing.Iterator[FileReport] = iter(
+            smallFilesReports.get()
+        )
+        return [
+            bigFilesReports[i] if i in bigFilesReports
+            else next(smallFilesReportsIterator)
+            for i in range(len(tasks))
+        ]
+
+
+def problemToDict(problem: validation.ValidationProblem) -> dict:
+    return {
+        "line": (
+            problem.lineIndex + 1 if problem.lineIndex is not None
+            else None
+        ),
+        "title": problem.titleOrdinal,
+        "severity": problem.severity,
+        "message": validation.problemDescription(problem)
+    }
+
+
+def formatText(reports: typing.List[FileReport]) -> str:
+    output: typing.List[str] = []
+    for report in reports:
+        if report.error is not None:
+            output.append(f"{report.path}: [ERROR] {report.error}")
+            continue
+        for problem in report.problems:
+            location: str = (
+                f":{problem.lineIndex+1}" if problem.lineIndex is not None
+                else ""
+            )
+            output.append(
+                " ".join((
+                    f"{report.path}{location}:",
+                    f"[{problem.severity.upper()}]",
+                    validation.problemDescription(problem)
+                ))
+            )
+    failedCount: int = sum(
+        1 for r in reports if r.error is not None or r.errorsCount > 0
+    )
+    output.append(
+        f"Validated {len(reports)} files, {failedCount} failed"
+    )
+    return "\n".join(output)
+
+
+def formatJson(reports: typing.List[FileReport]) -> str:
+    return json.dumps(
+        {
+            "files": [
+                {
+                    "path": r.path,
+                    "error": r.error,
+                    "problems": [problemToDict(p) for p in r.problems]
+                }
+                for r in reports
+            ]
+        },
+        ensure_ascii=False,
+        indent=4
+    )
+
+
+def formatJUnit(reports: typing.List[FileReport]) -> str:
+    testSuite = ET.Element(
+        "testsuite",
+        {
+            "name": "marlant.validation",
+            "tests": str(len(reports)),
+            "failures": str(
+                sum(1 for r in reports if r.error is None and r.errorsCount)
+            ),
+            "errors": str(sum(1 for r in reports if r.error is not None))
+        }
+    )
+    for report in reports:
+        testCase = ET.SubElement(
+            testSuite,
+            "testcase",
+            {"classname": "marlant.validation", "name": report.path}
+        )
+        if report.error is not None:
+            ET.SubElement(testCase, "error", {"message": report.error})
+            continue
+        errors: typing.List[str] = []
+        warnings: typing.List[str] = []
+        for problem in report.problems:
+            description: str = validation.problemDescription(problem)
+            if problem.severity == validation.severityError:
+                errors.append(description)
+            else:
+                warnings.append(description)
+        if errors:
+            failure = ET.SubElement(
+                testCase,
+                "failure",
+                {"message": f"{len(errors)} validation errors"}
+            )
+            failure.text = "\n".join(errors)
+        if warnings:
+            ET.SubElement(testCase, "system-out").text = "\n".join(warnings)
+    return "\n".join((
+        "<?xml version=\"1.0\" encoding=\"UTF-8\"?>",
+        ET.tostring(testSuite, encoding="unicode")
+    ))
+
+
+outputFormats: typing.Final[
+    typing.Dict[str, typing.Callable[[typing.List[FileReport]], str]]
+] = {
+    "text": formatText,
+    "json": formatJson,
+    "junit": formatJUnit
+}
+
+
+def loadSettings(settingsPath: typing.Optional[str]) -> dict:
+    settings: dict = loadSublimeJson(packageSettingsPath)
+    if settingsPath:
+        settings.update(loadSublimeJson(pathlib.Path(settingsPath)))
+    return settings
+
+
+def generateTranslationFiles(
+    task: typing.Tuple[str, typing.List[str], str, bool]
+) -> typing.List[TranslationReport]:
+    originalPath, languages, titlePlaceholder, overwrite = task
+    reports: typing.List[TranslationReport] = []
+    generatedFiles: typing.List[pathlib.Path] = []
+    for language in languages:
+        generatedFile: pathlib.Path = translation.translationFilePath(
+            pathlib.Path(originalPath),
+            language
+        )
+        if not overwrite and generatedFile.exists():
+            reports.append(
+                TranslationReport(
+                    originalPath,
+                    str(generatedFile),
+                    " ".join((
+                        f"{generatedFile.name} already exists,",
+                        "use --overwrite to replace it"
+                    ))
+                )
+            )
+        else:
+            generatedFiles.append(generatedFile)
+    if not generatedFiles:
+        return reports
+    # all the languages in one pass over the original
+    error: typing.Optional[str] = None
+    try:
+        translation.writeTranslationSkeletons(
+            pathlib.Path(originalPath),
+            generatedFiles,
+            titlePlaceholder
+        )
+    except (OSError, UnicodeDecodeError, subrip.SubRipFormatError) as ex:
+        error = str(ex)
+    reports.extend(
+        TranslationReport(originalPath, str(f), error) for f in generatedFiles
+    )
+    return reports
+
+
+def runTranslation(cliArgs: argparse.Namespace) -> int:
+    try:
+        settings: dict = loadSettings(cliArgs.settings)
+    except (OSError, ValueError) as ex:
+        print(f"[ERROR] Couldn't load settings: {ex}", file=sys.stderr)
+        return exitCodeError
+    titlePlaceholder: str = translation.loadTitlePlaceholder(settings)
+
+    files: typing.List[pathlib.Path] = translation.findOriginalFiles(
+        cliArgs.paths
+    )
+    if not files:
+        print("[ERROR] Didn't find any SubRip files", file=sys.stderr)
+        return exitCodeError
+    languages: typing.List[str] = list(dict.fromkeys(cliArgs.languages))
+    tasks = [
+        (str(f), languages, titlePlaceholder, cliArgs.overwrite)
+        for f in files
+    ]
+    filesReports: typing.List[typing.List[TranslationReport]]
+    if cliArgs.jobs == 1 or len(tasks) < 2:
+        filesReports = [generateTranslationFiles(t) for t in tasks]
+    else:
+        with multiprocessing.Pool(min(cliArgs.jobs, len(tasks))) as pool:
+            filesReports = pool.map(
+                generateTranslationFiles,
+                tasks,
+                chunksize=1
+            )
+    reports: typing.List[TranslationReport] = [
+        r for fileReports in filesReports for r in fileReports
+    ]
+
+    for report in reports:
+        if report.error is not None:
+            print(
+                f"[ERROR] {report.originalPath}: {report.error}",
+                file=sys.stderr
+            )
+        else:
+            print(f"{report.originalPath} -> {report.generatedPath}")
+    failedCount: int = sum(1 for r in reports if r.error is not None)
+    print(f"Created {len(reports) - failedCount} files, {failedCount} failed")
+    return exitCodeError if failedCount else exitCodeOK
+
+
+def runValidate(cliArgs: argparse.Namespace) -> int:
+    try:
+        settings: dict = loadSettings(cliArgs.settings)
+        projectData: typing.Optional[dict] = (
+            loadSublimeJson(pathlib.Path(cliArgs.project))
+            if cliArgs.project else None
+        )
+    except (OSError, ValueError) as ex:
+        print(f"[ERROR] Couldn't load settings: {ex}", file=sys.stderr)
+        return exitCodeError
+    validationSettings: validation.ValidationSettings = (
+        validation.loadValidationSettings(settings)
+    )
+    try:
+        validation.compileValidationRules(validationSettings)
+    except (TypeError, ValueError, re.error) as ex:
+        print(f"[ERROR] Wrong validation settings: {ex}", file=sys.stderr)
+        return exitCodeError
+
+    files: typing.List[pathlib.Path] = findSubRipFiles(cliArgs.paths)
+    if not files:
+        print("[ERROR] Didn't find any SubRip files", file=sys.stderr)
+        return exitCodeError
+    reports: typing.List[FileReport] = validateFiles(
+        files,
+        validationSettings,
+        projectData,
+        cliArgs.jobs
+    )
+
+    output: str = outputFormats[cliArgs.format](reports)
+    if cliArgs.output:
+        pathlib.Path(cliArgs.output).write_text(
+            output + "\n",
+            encoding="utf-8"
+        )
+    else:
+        print(output)
+
+    if any(r.error is not None for r in reports):
+        return exitCodeError
+    if any(r.errorsCount > 0 for r in reports):
+        return exitCodeValidationFailed
+    return exitCodeOK
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> int:
+    argParser = argparse.ArgumentParser(
+        prog="python -m marlant",
+        description="MarLant tools for SubRip files"
+    )
+    subParsers = argParser.add_subparsers(dest="command", required=True)
+
+    validateParser = subParsers.add_parser(
+        "validate",
+        help="validate SubRip files, the same way the plugin does",
+        description=" ".join((
+            "Validates SubRip files. Exit code is 0 if there are no errors,",
+            f"{exitCodeValidationFailed} if some files have errors",
+            f"and {exitCodeError} if something went wrong."
+        ))
+    )
+    validateParser.add_argument(
+        "paths",
+        nargs="+",
+        help="SubRip files or directories to look for .srt files in"
+    )
+    validateParser.add_argument(
+        "--format",
+        choices=outputFormats.keys(),
+        default="text",
+        help="output format (default: %(default)s)"
+    )
+    validateParser.add_argument(
+        "--output",
+        metavar="PATH",
+        help="write the output to a file instead of stdout"
+    )
+    validateParser.add_argument(
+        "--settings",
+        metavar="PATH",
+        help="marlant.sublime-settings to override the default settings"
+    )
+    validateParser.add_argument(
+        "--project",
+        metavar="PATH",
+        help=".sublime-project with excluded titles"
+    )
+    validateParser.add_argument(
+        "--jobs",
+        type=int,
+        default=multiprocessing.cpu_count(),
+        help="number of processes (default: number of CPUs)"
+    )
+    validateParser.set_defaults(run=runValidate)
+
+    translationParser = subParsers.add_parser(
+        "translation",
+        help="create translation files with placeholders instead of text",
+        description=" ".join((
+            "Creates translation files (some-file-LANGUAGE.srt) next to",
+            "the original SubRip files, the same way the plugin does.",
+            "The originals are read in chunks, so they can be of any size.",
+            "Exit code is 0 if all the files were created",
+            f"and {exitCodeError} otherwise."
+        ))
+    )
+    translationParser.add_argument(
+        "paths",
+        nargs="+",
+        help="SubRip files or directories to look for .srt files in"
+    )
+    translationParser.add_argument(
+        "--languages",
+        nargs="+",
+        required=True,
+        metavar="LANGUAGE",
+        help="language suffixes of translation files"
+    )
+    translationParser.add_argument(
+        "--overwrite",
+        action="store_true",
+        help="replace already existing translation files"
+    )
+    translationParser.add_argument(
+        "--settings",
+        metavar="PATH",
+        help="marlant.sublime-settings to override the default settings"
+    )
+    translationParser.add_argument(
+        "--jobs",
+        type=int,
+        default=multiprocessing.cpu_count(),
+        help="number of processes (default: number of CPUs)"
+    )
+    translationParser.set_defaults(run=runTranslation)
+
+    cliArgs: argparse.Namespace = argParser.parse_args(argv)
+    if cliArgs.jobs < 1:
+        argParser.error("--jobs should be at least 1")
+    if any(
+        subrip.regexLanguageCode.fullmatch(lang) is None
+        for lang in getattr(cliArgs, "languages", [])
+    ):
+        argParser.error("language suffixes should contain only letters")
+    return cliArgs.run(cliArgs)
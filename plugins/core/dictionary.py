@@ -0,0 +1,466 @@
+import bisect
+import csv
+import heapq
+import json
+import pathlib
+import re
+import typing
+
+from . import subrip
+from . import translation
+
+# the length of the character n-grams for fuzzy lookup
+ngramLength: typing.Final[int] = 3
+# how similar (by the share of common n-grams) an entry should be
+# to the looked up text to count as a fuzzy match
+fuzzyMatchThreshold: typing.Final[float] = 0.3
+
+regexWords: typing.Final[typing.Pattern] = re.compile(r"\w+")
+# automaton transitions are keyed by state and character code together,
+# one dictionary for all the states takes much less memory than
+# a dictionary per state
+automatonStateStride: typing.Final[int] = 0x110000
+
+
+def loadDictionary(
+    projectData: typing.Optional[dict]
+) -> typing.Dict[str, str]:
+    if not projectData:
+        return {}
+    projectSettings: typing.Optional[dict] = projectData.get("settings")
+    if not projectSettings:
+        return {}
+    return projectSettings.get(
+        "marlant", {}
+    ).get(
+        "dictionary", {}
+    )
+
+
+# the dictionary can be kept in a separate JSON lines file instead of
+# the project file, then adding an entry is appending a line to it,
+# not rewriting the whole project; the path is relative to the project
+def loadDictionaryFilePath(
+    projectData: typing.Optional[dict],
+    projectFile: pathlib.Path
+) -> typing.Optional[pathlib.Path]:
+    if not projectData:
+        return None
+    projectSettings: typing.Optional[dict] = projectData.get("settings")
+    if not projectSettings:
+        return None
+    dictionaryFile: typing.Optional[str] = projectSettings.get(
+        "marlant", {}
+    ).get(
+        "dictionary_file"
+    )
+    if not dictionaryFile:
+        return None
+    return projectFile.parent / pathlib.Path(dictionaryFile).expanduser()
+
+
+# one {"original": ..., "translation": ...} object per line, the later
+# lines override the earlier ones, so entries are updated by appending
+def readDictionaryFile(path: pathlib.Path) -> typing.Dict[str, str]:
+    dictionary: typing.Dict[str, str] = {}
+    if not path.is_file():
+        return dictionary
+    with open(path, "r", encoding="utf-8") as df:
+        for lineIndex, line in enumerate(df):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+                dictionary[entry["original"]] = entry["translation"]
+            except (ValueError, KeyError, TypeError) as ex:
+                raise ValueError(
+                    f"Wrong dictionary entry on the line {lineIndex+1}: {ex}"
+                )
+    return dictionary
+
+
+def appendDictionaryEntries(
+    path: pathlib.Path,
+    entries: typing.Iterable[typing.Tuple[str, str]]
+) -> None:
+    with open(path, "a", encoding="utf-8") as df:
+        df.writelines(
+            json.dumps(
+                {"original": original, "translation": translated},
+                ensure_ascii=False
+            ) + "\n"
+            for original, translated in entries
+        )
+
+
+# glossaries are CSV or TSV (by the file extension) with the original
+# in the first column and the translation in the second one,
+# an optional header row is skipped
+def glossaryDelimiter(path: pathlib.Path) -> str:
+    return "\t" if path.suffix.lower() in (".tsv", ".tab") else ","
+
+
+def readGlossary(path: pathlib.Path) -> typing.Dict[str, str]:
+    dictionary: typing.Dict[str, str] = {}
+    with open(path, "r", encoding="utf-8-sig", newline="") as gf:
+        try:
+            for rowIndex, row in enumerate(
+                csv.reader(gf, delimiter=glossaryDelimiter(path))
+            ):
+                if not any(cell.strip() for cell in row):
+                    continue
+                if (
+                    len(row) < 2
+                    or not row[0].strip()
+                    or not row[1].strip()
+                ):
+                    raise ValueError(
+                        " ".join((
+                            f"The row {rowIndex+1} should have",
+                            "the original and the translation"
+                        ))
+                    )
+                if rowIndex == 0 and row[0].strip().casefold() == "original":
+                    continue
+                dictionary[row[0].strip()] = row[1].strip()
+        except csv.Error as ex:
+            raise ValueError(f"Wrong glossary format: {ex}")
+    return dictionary
+
+
+def writeGlossary(
+    path: pathlib.Path,
+    entries: typing.Iterable[typing.Tuple[str, str]]
+) -> None:
+    with open(path, "w", encoding="utf-8", newline="") as gf:
+        writer = csv.writer(gf, delimiter=glossaryDelimiter(path))
+        writer.writerow(("original", "translation"))
+        writer.writerows(entries)
+
+
+def makeNgrams(text: str) -> typing.Set[str]:
+    # padded, so short words and word boundaries count too
+    padded: str = f" {text.casefold()} "
+    return {
+        padded[i:i + ngramLength]
+        for i in range(max(len(padded) - ngramLength + 1, 1))
+    }
+
+
+def isWordCharacter(character: str) -> bool:
+    return character.isalnum() or character == "_"
+
+
+# finds all the terms (case-insensitive, as whole words) in a text
+# in a single pass over it, no matter how many terms there are:
+# an Aho-Corasick automaton, a trie of the terms where every state
+# also has a link to the state of the longest suffix of its text
+# that is some other term prefix, so a mismatch doesn't go back in the text
+class TermsMatcher:
+    def __init__(self, terms: typing.Iterable[str]) -> None:
+        # case-folded terms, and the original terms for every one of them
+        self._terms: typing.List[str] = []
+        self._termsOriginals: typing.List[typing.List[str]] = []
+        termsIndexes: typing.Dict[str, int] = {}
+        # (state * automatonStateStride + character code) -> next state
+        self._transitions: typing.Dict[int, int] = {}
+        transitions: typing.Dict[int, int] = self._transitions
+        # state -> the state of the longest suffix
+        self._failures: typing.List[int] = [0]
+        # state -> indexes of the terms that end in it
+        self._outputs: typing.Dict[int, typing.Tuple[int, ...]] = {}
+        outputs: typing.Dict[int, typing.Tuple[int, ...]] = self._outputs
+
+        # the trie; the states are numbered as they are added, so every
+        # state's parent has a lower number
+        statesParents: typing.List[int] = [0]
+        statesCodes: typing.List[int] = [0]
+        statesDepths: typing.List[int] = [0]
+        for term in terms:
+            foldedTerm: str = term.strip().casefold()
+            if not foldedTerm:
+                continue
+            termIndex: typing.Optional[int] = termsIndexes.get(foldedTerm)
+            if termIndex is not None:
+                self._termsOriginals[termIndex].append(term)
+                continue
+            termIndex = len(self._terms)
+            termsIndexes[foldedTerm] = termIndex
+            self._terms.append(foldedTerm)
+            self._termsOriginals.append([term])
+
+            state: int = 0
+            for code in map(ord, foldedTerm):
+                key: int = state * automatonStateStride + code
+                nextState: typing.Optional[int] = transitions.get(key)
+                if nextState is None:
+                    nextState = len(statesParents)
+                    transitions[key] = nextState
+                    statesParents.append(state)
+                    statesCodes.append(code)
+                    statesDepths.append(statesDepths[state] + 1)
+                state = nextState
+            outputs[state] = (termIndex,)
+
+        # failure links, from the shallow states to the deep ones,
+        # as a link always goes to a shallower state
+        failures: typing.List[int] = [0] * len(statesParents)
+        for state in sorted(
+            range(1, len(statesParents)),
+            key=statesDepths.__getitem__
+        ):
+            parent: int = statesParents[state]
+            if parent == 0:
+                continue
+            code = statesCodes[state]
+            failure: int = failures[parent]
+            while True:
+                failureNext: typing.Optional[int] = transitions.get(
+                    failure * automatonStateStride + code
+                )
+                if failureNext is not None:
+                    failures[state] = failureNext
+                    # terms that end in the failure state end here too
+                    failureOutputs: typing.Optional[
+                        typing.Tuple[int, ...]
+                    ] = outputs.get(failureNext)
+                    if failureOutputs is not None:
+                        outputs[state] = (
+                            outputs.get(state, ()) + failureOutputs
+                        )
+                    break
+                if failure == 0:
+                    break
+                failure = failures[failure]
+        self._failures = failures
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    # the original terms found in the text
+    def findTerms(self, text: str) -> typing.Set[str]:
+        text = text.casefold()
+        foundTerms: typing.Set[int] = set()
+        state: int = 0
+        for position, character in enumerate(text):
+            code: int = ord(character)
+            nextState: typing.Optional[int] = self._transitions.get(
+                state * automatonStateStride + code
+            )
+            while nextState is None and state != 0:
+                state = self._failures[state]
+                nextState = self._transitions.get(
+                    state * automatonStateStride + code
+                )
+            state = nextState or 0
+            for termIndex in self._outputs.get(state, ()):
+                if termIndex in foundTerms:
+                    continue
+                term: str = self._terms[termIndex]
+                # only whole words, "Thor" is not in "Thorvald"
+                start: int = position - len(term) + 1
+                if (
+                    start > 0
+                    and isWordCharacter(term[0])
+                    and isWordCharacter(text[start - 1])
+                ):
+                    continue
+                if (
+                    position + 1 < len(text)
+                    and isWordCharacter(term[-1])
+                    and isWordCharacter(text[position + 1])
+                ):
+                    continue
+                foundTerms.add(termIndex)
+        return {
+            original
+            for termIndex in foundTerms
+            for original in self._termsOriginals[termIndex]
+        }
+
+
+# the project dictionary (original -> translation) prepared for lookups:
+# it is built once, and then the lookups don't go through all the entries
+class DictionaryIndex:
+    def __init__(self, dictionary: typing.Mapping[str, str]) -> None:
+        # (original, translation) pairs, sorted by original
+        self.items: typing.List[typing.Tuple[str, str]] = sorted(
+            dictionary.items(),
+            key=lambda item: item[0].casefold()
+        )
+        # original -> its index in items
+        self._positions: typing.Dict[str, int] = {
+            original: index for index, (original, _) in enumerate(self.items)
+        }
+        # every word of every entry, original and translation (case-folded),
+        # with the indexes of the entries that have it; the words are
+        # sorted, so prefixes can be found with bisect, and there are
+        # far fewer of them than the (word, entry) pairs
+        self._wordsEntries: typing.Dict[str, typing.List[int]] = {}
+        for index, (original, translated) in enumerate(self.items):
+            for word in set(
+                regexWords.findall(f"{original} {translated}".casefold())
+            ):
+                self._wordsEntries.setdefault(word, []).append(index)
+        self._words: typing.List[str] = sorted(self._wordsEntries)
+        # n-gram -> indexes of the entries that have it in the original,
+        # built on the first fuzzy lookup, as it takes the most time
+        self._ngrams: typing.Optional[typing.Dict[str, typing.List[int]]] = (
+            None
+        )
+        self._ngramsCounts: typing.List[int] = []
+        # built on the first consistency check
+        self._termsMatcher: typing.Optional[TermsMatcher] = None
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def lookup(self, original: str) -> typing.Optional[str]:
+        index: typing.Optional[int] = self._positions.get(original)
+        return self.items[index][1] if index is not None else None
+
+    def position(self, original: str) -> typing.Optional[int]:
+        return self._positions.get(original)
+
+    # entries with a word (in the original or in the translation) that
+    # starts with the prefix (case-insensitive), in the order of originals;
+    # with the limit it stops after finding that many entries
+    def findByPrefix(
+        self,
+        prefix: str,
+        limit: typing.Optional[int] = None
+    ) -> typing.List[typing.Tuple[str, str]]:
+        prefix = prefix.casefold()
+        if not prefix:
+            return []
+        indexes: typing.Set[int] = set()
+        position: int = bisect.bisect_left(self._words, prefix)
+        while (
+            position < len(self._words)
+            and self._words[position].startswith(prefix)
+        ):
+            if limit is None:
+                indexes.update(self._wordsEntries[self._words[position]])
+            else:
+                for index in self._wordsEntries[self._words[position]]:
+                    if len(indexes) >= limit:
+                        break
+                    indexes.add(index)
+                if len(indexes) >= limit:
+                    break
+            position += 1
+        return [self.items[i] for i in sorted(indexes)]
+
+    # entries with originals similar to the text, the most similar first;
+    # similarity is the share of common n-grams, so it tolerates typos
+    # and different word forms
+    def findFuzzy(
+        self,
+        text: str,
+        limit: int = 10
+    ) -> typing.List[typing.Tuple[str, str]]:
+        if self._ngrams is None:
+            self._ngrams = {}
+            for index, (original, _) in enumerate(self.items):
+                ngrams: typing.Set[str] = makeNgrams(original)
+                self._ngramsCounts.append(len(ngrams))
+                for ngram in ngrams:
+                    self._ngrams.setdefault(ngram, []).append(index)
+
+        textNgrams: typing.Set[str] = makeNgrams(text)
+        commonNgrams: typing.Dict[int, int] = {}
+        for ngram in textNgrams:
+            for index in self._ngrams.get(ngram, ()):
+                commonNgrams[index] = commonNgrams.get(index, 0) + 1
+        scores: typing.List[typing.Tuple[float, int]] = []
+        for index, common in commonNgrams.items():
+            score: float = common / (
+                len(textNgrams) + self._ngramsCounts[index] - common
+            )
+            if score >= fuzzyMatchThreshold:
+                scores.append((score, -index))
+        return [
+            self.items[-index]
+            for _, index in heapq.nlargest(limit, scores)
+        ]
+
+    def termsMatcher(self) -> TermsMatcher:
+        if self._termsMatcher is None:
+            self._termsMatcher = TermsMatcher(
+                original for original, _ in self.items
+            )
+        return self._termsMatcher
+
+
+class MissingTranslation(typing.NamedTuple):
+    # the translation title
+    titleIndex: int
+    titleOrdinal: typing.Optional[int]
+    lineIndex: int
+    original: str
+    translation: str
+
+
+# translated titles that don't have the dictionary translation of a term
+# that is in the original title they correspond to (by timing).
+# Titles that are not translated yet are skipped; both documents
+# should pass the strict structure check
+def findMissingTranslations(
+    originalDocument: subrip.SubRipDocument,
+    translationDocument: subrip.SubRipDocument,
+    dictionary: DictionaryIndex,
+    titlePlaceholder: str
+) -> typing.List[MissingTranslation]:
+    missingTranslations: typing.List[MissingTranslation] = []
+    if not len(dictionary):
+        return missingTranslations
+    matcher: TermsMatcher = dictionary.termsMatcher()
+    translationTitles: typing.List[subrip.SubRipTitle] = (
+        translationDocument.titles
+    )
+    matches: typing.List[typing.Optional[int]] = (
+        translation.matchTitlesByTiming(
+            originalDocument.titles,
+            translationTitles
+        )
+    )
+    # an original title might have been split in the translation
+    translationIndexes: typing.Dict[int, typing.List[int]] = {}
+    for translationIndex, originalIndex in enumerate(matches):
+        if originalIndex is not None and translation.isTitleTranslated(
+            translationTitles[translationIndex],
+            titlePlaceholder
+        ):
+            translationIndexes.setdefault(originalIndex, []).append(
+                translationIndex
+            )
+
+    for originalIndex, indexes in sorted(
+        translationIndexes.items(),
+        key=lambda item: item[1][0]
+    ):
+        foundTerms: typing.Set[str] = matcher.findTerms(
+            "\n".join(originalDocument.titles[originalIndex].textLines)
+        )
+        if not foundTerms:
+            continue
+        translatedText: str = "\n".join(
+            ln for i in indexes for ln in translationTitles[i].textLines
+        ).casefold()
+        title: subrip.SubRipTitle = translationTitles[indexes[0]]
+        for original in sorted(foundTerms):
+            expectedTranslation: str = typing.cast(
+                str,
+                dictionary.lookup(original)
+            )
+            if expectedTranslation.strip().casefold() not in translatedText:
+                missingTranslations.append(
+                    MissingTranslation(
+                        indexes[0],
+                        title.ordinal,
+                        title.lineIndex,
+                        original,
+                        expectedTranslation
+                    )
+                )
+    return missingTranslations
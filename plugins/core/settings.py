@@ -0,0 +1,9 @@
+import typing
+
+
+# anything settings can be read from: sublime.Settings in the plugin,
+# a dictionary loaded from a JSON file outside of it. There is always
+# a fallback value for every setting, so default is required
+class Settings(typing.Protocol):
+    def get(self, __key: str, __default: typing.Any) -> typing.Any:
+        ...
@@ -0,0 +1,592 @@
+import re
+import typing
+
+# this module must not import sublime, so the parsing can be done
+# (and tested/profiled) outside of the plugin host
+
+regexLanguageCode: typing.Final[typing.Pattern] = re.compile(r"^[A-Za-z]+$")
+regexSrtNumber: typing.Final[typing.Pattern] = re.compile(r"^[1-9]{1}\d*$")
+# regexSrtTimingString = # r"^\d{2}:\d{2}:\d{2},\d{3} --> \d{2}:\d{2}:\d{2},\d{3}$"
+regexSrtTimingString = r"^(\d{2}:\d{2}:\d{2},\d{3}) (-->) (\d{2}:\d{2}:\d{2},\d{3})$"
+regexSrtTiming: typing.Final[typing.Pattern] = re.compile(regexSrtTimingString)
+regexSrtTimeCode: typing.Final[typing.Pattern] = re.compile(r"^\d{2}:\d{2}:\d{2},\d{3}$")
+
+wrongFormatError: typing.Final[str] = " ".join((
+    "The SubRip content seems to have",
+    "a wrong format, because"
+))
+wrongTitleFormatError: typing.Final[str] = " ".join((
+    "Current title seems to have",
+    "incorrect format, because"
+))
+
+
+class SubRipFormatError(ValueError):
+    def __init__(self, message: str, lineIndex: int) -> None:
+        super().__init__(message)
+        self.lineIndex = lineIndex
+
+
+def timeCodeToMilliseconds(timeCode: str) -> int:
+    if regexSrtTimeCode.fullmatch(timeCode) is None:
+        raise ValueError("Timecode has a wrong format.")
+    tms = timeCode.split(":")
+    hour: int = int(tms[0])
+    minute: int = int(tms[1])
+    seconds: typing.List[str] = tms[2].split(",")
+    second: int = int(seconds[0])
+    millisecond: int = int(seconds[1])
+
+    return (
+        hour * 60 * 60 * 1000 +
+        minute * 60 * 1000 +
+        second * 1000 +
+        millisecond
+    )
+
+
+def millisecondsToTimeCode(milliseconds: int) -> str:
+    timeComponents: typing.Tuple[int, int, int, int] = (
+        milliseconds // (60 * 60 * 1000),
+        (milliseconds % (60 * 60 * 1000)) // (60 * 1000),
+        (milliseconds % (60 * 1000)) // 1000,
+        milliseconds % 1000
+    )
+    return "%02d:%02d:%02d,%03d" % timeComponents
+
+
+# one title block: ordinal line, timing line and text lines, exactly
+# as they are in the buffer. Malformed ordinal/timing lines are kept
+# as they are, with ordinal/timing set to None, so validation
+# can report them
+class SubRipTitle:
+    __slots__ = (
+        "lineIndex", "offset", "lines",
+        "ordinal", "timing", "timeStart", "timeEnd"
+    )
+
+    def __init__(
+        self,
+        lineIndex: int,
+        offset: int,
+        lines: typing.List[str]
+    ) -> None:
+        # index of the ordinal line in the buffer
+        self.lineIndex: int = lineIndex
+        # buffer offset of the first character of the ordinal line
+        self.offset: int = offset
+        self.lines: typing.List[str] = lines
+
+        self.ordinal: typing.Optional[int] = None
+        self.timing: typing.Optional[str] = None
+        self.timeStart: typing.Optional[int] = None
+        self.timeEnd: typing.Optional[int] = None
+
+        ordinalLine: str = lines[0].strip()
+        if regexSrtNumber.fullmatch(ordinalLine) is not None:
+            self.ordinal = int(ordinalLine)
+        if len(lines) > 1:
+            timingMatches = regexSrtTiming.fullmatch(lines[1].strip())
+            if timingMatches is not None:
+                self.timing = timingMatches.group(0)
+                self.timeStart = timeCodeToMilliseconds(timingMatches.group(1))
+                self.timeEnd = timeCodeToMilliseconds(timingMatches.group(3))
+
+    @property
+    def textLines(self) -> typing.List[str]:
+        return self.lines[2:]
+
+    @property
+    def endOffset(self) -> int:
+        # right after the last character of the last title line
+        return self.offset + sum(len(ln) + 1 for ln in self.lines) - 1
+
+    @property
+    def nextLineIndex(self) -> int:
+        return self.lineIndex + len(self.lines)
+
+    def lineRegion(self, index: int) -> typing.Tuple[int, int]:
+        begin: int = self.offset
+        for ln in self.lines[:index]:
+            begin += len(ln) + 1
+        return (begin, begin + len(self.lines[index]))
+
+    # the checks for a single title that is about to be modified
+    def checkFormat(self) -> None:
+        if len(self.lines) < 3:
+            raise ValueError(
+                " ".join((
+                    wrongTitleFormatError,
+                    "it must have at least one line of text",
+                    "in addition to the ordinal and timing."
+                ))
+            )
+        if self.ordinal is None:
+            raise ValueError(
+                " ".join((
+                    wrongTitleFormatError,
+                    "the first line should be a title ordinal."
+                ))
+            )
+        if self.timing is None:
+            raise ValueError(
+                " ".join((
+                    wrongTitleFormatError,
+                    "the second line should be a title timing."
+                ))
+            )
+
+    def __repr__(self) -> str:
+        return f"SubRipTitle({self.lineIndex}, {self.offset}, {self.lines!r})"
+
+
+class SubRipDocument:
+    def __init__(
+        self,
+        titles: typing.List[SubRipTitle],
+        size: int,
+        lineCount: int,
+        endsWithNewline: bool,
+        whitespaceLines: typing.List[int]
+    ) -> None:
+        self.titles: typing.List[SubRipTitle] = titles
+        self.size: int = size
+        # the number of lines the same way view.split_by_newlines() counts
+        # them, so the trailing newline does not produce an extra line
+        self.lineCount: int = lineCount
+        self.endsWithNewline: bool = endsWithNewline
+        # "empty" lines that actually contain some whitespace
+        self.whitespaceLines: typing.List[int] = whitespaceLines
+        self._titlesOrdinals: typing.Optional[typing.Dict[int, int]] = None
+        # the number of neighbouring titles where the ordinal doesn't go up,
+        # while it is 0 titles can be found by ordinals with a binary search
+        self._ordinalsDisorder: typing.Optional[int] = None
+        # counts of titles matching some predicates, see countTitles()
+        self._titlesCounts: typing.Dict[
+            str,
+            typing.Tuple[typing.Callable[[SubRipTitle], bool], int]
+        ] = {}
+        # the region of this document (in its own coordinates) that
+        # has been changed in the buffer since it was parsed, and by how
+        # many characters the buffer got longer
+        self._changedBegin: typing.Optional[int] = None
+        self._changedEnd: int = 0
+        self._changedDelta: int = 0
+
+    @property
+    def isChanged(self) -> bool:
+        return self._changedBegin is not None
+
+    # begin/end are in the coordinates of the buffer as it is now,
+    # with all the previously marked changes applied
+    def markChanged(self, begin: int, end: int, insertedLength: int) -> None:
+        delta: int = insertedLength - (end - begin)
+        if self._changedBegin is None:
+            self._changedBegin = begin
+            self._changedEnd = end
+            self._changedDelta = delta
+            return
+        changedBegin: int = self._changedBegin
+        changedEnd: int = self._changedEnd
+        changedEndNow: int = changedEnd + self._changedDelta
+        # map the positions back to the coordinates of this document,
+        # anything inside the already changed region counts as its bounds
+        if begin >= changedEndNow:
+            begin -= self._changedDelta
+        elif begin > changedBegin:
+            begin = changedBegin
+        if end >= changedEndNow:
+            end -= self._changedDelta
+        elif end > changedBegin:
+            end = changedEnd
+        self._changedBegin = min(changedBegin, begin)
+        self._changedEnd = max(changedEnd, end)
+        self._changedDelta += delta
+
+    # re-parses only the titles touched by the changes marked so far
+    # (plus their neighbours, as removing/adding an empty line can join
+    # or split titles), getContent(begin, end) should return that region
+    # of the buffer as it is now
+    def reparseChanged(
+        self,
+        getContent: typing.Callable[[int, int], str]
+    ) -> None:
+        if self._changedBegin is None:
+            return
+        changedBegin: int = self._changedBegin
+        changedEnd: int = self._changedEnd
+        delta: int = self._changedDelta
+        self._changedBegin = None
+        self._changedEnd = 0
+        self._changedDelta = 0
+
+        firstTitle: int = max(self._lastTitleStartingAt(changedBegin), 0)
+        lastTitle: int = self._lastTitleStartingAt(changedEnd) + 1
+
+        regionBegin: int = 0
+        regionLineIndex: int = 0
+        if self.titles and self.titles[firstTitle].offset <= changedBegin:
+            regionBegin = self.titles[firstTitle].offset
+            regionLineIndex = self.titles[firstTitle].lineIndex
+        else:  # the change is in the empty lines before the first title
+            firstTitle = 0
+
+        toTheEnd: bool = lastTitle >= len(self.titles)
+        regionEnd: int = self.size
+        regionLinesCount: int = self.lineCount - regionLineIndex
+        if not toTheEnd:
+            regionEnd = self.titles[lastTitle].endOffset
+            regionLinesCount = (
+                self.titles[lastTitle].nextLineIndex - regionLineIndex
+            )
+
+        content: str = getContent(regionBegin, regionEnd + delta)
+        lines: typing.List[str] = content.split("\n")
+        if toTheEnd:
+            # content always starts at the beginning of a line, so if there
+            # is nothing left, then the previous line is the last one
+            self.endsWithNewline = (
+                content.endswith("\n") if content
+                else regionBegin > 0
+            )
+            if self.endsWithNewline or not content:
+                lines.pop()
+        linesDelta: int = len(lines) - regionLinesCount
+
+        titles, whitespaceLines = parseTitles(
+            lines,
+            regionLineIndex,
+            regionBegin
+        )
+        for title in self.titles[lastTitle + 1:]:
+            title.offset += delta
+            title.lineIndex += linesDelta
+        if self._titlesCounts:
+            replacedTitles: typing.List[SubRipTitle] = (
+                self.titles[firstTitle:lastTitle + 1]
+            )
+            for key, (predicate, count) in self._titlesCounts.items():
+                self._titlesCounts[key] = (
+                    predicate,
+                    count
+                    - sum(1 for t in replacedTitles if predicate(t))
+                    + sum(1 for t in titles if predicate(t))
+                )
+        if self._ordinalsDisorder is not None:
+            self._ordinalsDisorder -= countOrdinalsDisorder(
+                self.titles,
+                firstTitle,
+                min(lastTitle + 1, len(self.titles))
+            )
+        self.titles[firstTitle:lastTitle + 1] = titles
+        if self._ordinalsDisorder is not None:
+            self._ordinalsDisorder += countOrdinalsDisorder(
+                self.titles,
+                firstTitle,
+                firstTitle + len(titles)
+            )
+
+        regionLineEnd: int = regionLineIndex + regionLinesCount
+        self.whitespaceLines = (
+            [i for i in self.whitespaceLines if i < regionLineIndex]
+            + whitespaceLines
+            + [
+                i + linesDelta for i in self.whitespaceLines
+                if i >= regionLineEnd
+            ]
+        )
+        self.size += delta
+        self.lineCount += linesDelta
+        self._titlesOrdinals = None
+
+    # index of the last title that starts at or before the point (-1 if
+    # there is no such title). Titles always go in the order of offsets,
+    # so they are searched right in the list, without keeping a separate
+    # list of offsets that would need to be rebuilt after every edit
+    def _lastTitleStartingAt(self, point: int) -> int:
+        titles: typing.List[SubRipTitle] = self.titles
+        low: int = 0
+        high: int = len(titles)
+        while low < high:
+            middle: int = (low + high) // 2
+            if titles[middle].offset <= point:
+                low = middle + 1
+            else:
+                high = middle
+        return low - 1
+
+    # ordinal to title index, if there are several titles with the same
+    # ordinal (which is a problem on its own), the first one is used
+    def _getTitlesOrdinals(self) -> typing.Dict[int, int]:
+        if self._titlesOrdinals is None:
+            self._titlesOrdinals = {}
+            for index, title in enumerate(self.titles):
+                if title.ordinal is not None:
+                    self._titlesOrdinals.setdefault(title.ordinal, index)
+        return self._titlesOrdinals
+
+    def titleIndexByOrdinal(self, ordinal: int) -> typing.Optional[int]:
+        if self._ordinalsDisorder is None:
+            self._ordinalsDisorder = countOrdinalsDisorder(
+                self.titles,
+                0,
+                len(self.titles)
+            )
+        if self._ordinalsDisorder > 0:
+            return self._getTitlesOrdinals().get(ordinal)
+
+        # ordinals go up, as they should, so there are no duplicates
+        # and the title can be found with a binary search
+        titles: typing.List[SubRipTitle] = self.titles
+        low: int = 0
+        high: int = len(titles)
+        while low < high:
+            middle: int = (low + high) // 2
+            if typing.cast(int, titles[middle].ordinal) < ordinal:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(titles) and titles[low].ordinal == ordinal:
+            return low
+        return None
+
+    # the number of titles for which the predicate is true. It is counted
+    # once per key, and then only the re-parsed titles are re-checked, so
+    # the predicate should depend only on the title and the key
+    def countTitles(
+        self,
+        key: str,
+        predicate: typing.Callable[[SubRipTitle], bool]
+    ) -> int:
+        cached = self._titlesCounts.get(key)
+        if cached is not None:
+            return cached[1]
+        count: int = sum(1 for t in self.titles if predicate(t))
+        self._titlesCounts[key] = (predicate, count)
+        return count
+
+    @property
+    def trailingEmptyLines(self) -> int:
+        if not self.titles:
+            return self.lineCount
+        return self.lineCount - self.titles[-1].nextLineIndex
+
+    # None if the point is on an empty line between titles
+    def titleIndexAt(self, point: int) -> typing.Optional[int]:
+        index: int = self._lastTitleStartingAt(point)
+        if index < 0 or point > self.titles[index].endOffset:
+            return None
+        return index
+
+    # indexes of the titles that overlap with the [begin, end) span
+    def titlesIndexesIn(self, begin: int, end: int) -> range:
+        first: int = self._lastTitleStartingAt(begin)
+        if first < 0 or begin > self.titles[first].endOffset:
+            first += 1
+        return range(first, self._lastTitleStartingAt(end - 1) + 1)
+
+    # raises on the first problem that makes the content not usable
+    # for modifying titles; strict check is for generating new content
+    # based on this one, so ordinals increments and timings must be fine too
+    def checkStructure(self, strict: bool) -> None:
+        previousTitle: typing.Optional[SubRipTitle] = None
+        for title in self.titles:
+            checkTitleStructure(title, previousTitle, strict)
+            previousTitle = title
+        checkTrailingEmptyLines(previousTitle, self.lineCount)
+
+
+# the part of SubRipDocument.checkStructure() for a single title,
+# so titles can also be checked one by one as they are read
+def checkTitleStructure(
+    title: SubRipTitle,
+    previousTitle: typing.Optional[SubRipTitle],
+    strict: bool
+) -> None:
+    previousLineEnd: int = 0
+    previousOrdinal: int = 0
+    if previousTitle is not None:
+        previousLineEnd = previousTitle.nextLineIndex
+        previousOrdinal = previousTitle.ordinal or 0
+    emptyLines: int = title.lineIndex - previousLineEnd
+    if previousLineEnd == 0 and emptyLines > 0:
+        raise SubRipFormatError(
+            f"{wrongFormatError} the line 1 should not be empty.",
+            0
+        )
+    if emptyLines > 1:
+        raise SubRipFormatError(
+            " ".join((
+                f"{wrongFormatError} the line {previousLineEnd+2}",
+                "should not be empty."
+            )),
+            previousLineEnd + 1
+        )
+
+    if title.ordinal is None:
+        raise SubRipFormatError(
+            " ".join((
+                f"{wrongFormatError} the line {title.lineIndex+1}",
+                "should contain a non-zero title number."
+            )),
+            title.lineIndex
+        )
+    if not strict:
+        return
+    if title.ordinal - previousOrdinal != 1:
+        raise SubRipFormatError(
+            " ".join((
+                f"{wrongFormatError} the title number",
+                f"on the line {title.lineIndex+1}",
+                f"({title.ordinal}) is not",
+                "a +1 increment of the previous",
+                f"title number ({previousOrdinal})."
+            )),
+            title.lineIndex
+        )
+    if title.timing is None:
+        raise SubRipFormatError(
+            " ".join((
+                f"{wrongFormatError} there",
+                "should be a correct timing string",
+                f"on the line {title.lineIndex+2}."
+            )),
+            title.lineIndex + 1
+        )
+
+
+# the titles from fromIndex on whose ordinals don't go one by one
+# from firstOrdinal, with the ordinals they should have. Raises
+# on the titles that can't be renumbered (the ones without ordinals)
+def findMisnumberedTitles(
+    titles: typing.List[SubRipTitle],
+    fromIndex: int,
+    firstOrdinal: int
+) -> typing.List[typing.Tuple[int, int]]:
+    misnumberedTitles: typing.List[typing.Tuple[int, int]] = []
+    for index in range(fromIndex, len(titles)):
+        checkTitleStructure(
+            titles[index],
+            titles[index - 1] if index > 0 else None,
+            False
+        )
+        ordinal: int = firstOrdinal + index - fromIndex
+        if titles[index].ordinal != ordinal:
+            misnumberedTitles.append((index, ordinal))
+    return misnumberedTitles
+
+
+# replaces the ordinal lines of the given titles in the content
+# (which starts at contentOffset in the document), so all the new
+# ordinals can be put into the buffer with a single edit
+def replaceOrdinals(
+    content: str,
+    contentOffset: int,
+    titles: typing.Sequence[SubRipTitle],
+    ordinals: typing.Sequence[int]
+) -> str:
+    pieces: typing.List[str] = []
+    position: int = 0
+    for title, ordinal in zip(titles, ordinals):
+        ordinalBegin: int = title.offset - contentOffset
+        pieces.append(content[position:ordinalBegin])
+        pieces.append(str(ordinal))
+        position = ordinalBegin + len(title.lines[0])
+    pieces.append(content[position:])
+    return "".join(pieces)
+
+
+# the number of titles in [begin, end), and the one right after them,
+# that don't have an ordinal or whose ordinal is not greater
+# than the ordinal of the title before
+def countOrdinalsDisorder(
+    titles: typing.List[SubRipTitle],
+    begin: int,
+    end: int
+) -> int:
+    disorder: int = 0
+    for index in range(begin, min(end + 1, len(titles))):
+        ordinal: typing.Optional[int] = titles[index].ordinal
+        previousOrdinal: typing.Optional[int] = (
+            titles[index - 1].ordinal if index > 0
+            else None
+        )
+        if ordinal is None or (
+            previousOrdinal is not None
+            and ordinal <= previousOrdinal
+        ):
+            disorder += 1
+    return disorder
+
+
+def checkTrailingEmptyLines(
+    lastTitle: typing.Optional[SubRipTitle],
+    lineCount: int
+) -> None:
+    previousLineEnd: int = (
+        lastTitle.nextLineIndex if lastTitle is not None
+        else 0
+    )
+    if lineCount - previousLineEnd > 1:
+        raise SubRipFormatError(
+            " ".join((
+                f"{wrongFormatError} the line {previousLineEnd+2}",
+                "should not be empty."
+            )),
+            previousLineEnd + 1
+        )
+
+
+# titles are separated by empty lines, or by lines with only whitespace
+def isEmptyLine(line: str) -> bool:
+    return not line or line.isspace()
+
+
+def parseTitles(
+    lines: typing.List[str],
+    firstLineIndex: int,
+    firstLineOffset: int
+) -> typing.Tuple[typing.List[SubRipTitle], typing.List[int]]:
+    titles: typing.List[SubRipTitle] = []
+    whitespaceLines: typing.List[int] = []
+    titleLines: typing.List[str] = []
+    titleLineIndex: int = 0
+    titleOffset: int = 0
+    offset: int = firstLineOffset
+    for index, line in enumerate(lines, start=firstLineIndex):
+        if not line or line.isspace():
+            if line:
+                whitespaceLines.append(index)
+            if titleLines:
+                titles.append(
+                    SubRipTitle(titleLineIndex, titleOffset, titleLines)
+                )
+                titleLines = []
+        else:
+            if not titleLines:
+                titleLineIndex = index
+                titleOffset = offset
+            titleLines.append(line)
+        offset += len(line) + 1
+    if titleLines:
+        titles.append(SubRipTitle(titleLineIndex, titleOffset, titleLines))
+    return titles, whitespaceLines
+
+
+# parses the whole SubRip content in one pass. It never fails on
+# malformed content, it is up to the caller to decide what is fatal
+def parseSubRip(content: str) -> SubRipDocument:
+    lines: typing.List[str] = content.split("\n")
+    endsWithNewline: bool = content.endswith("\n")
+    if endsWithNewline or not content:
+        lines.pop()
+
+    titles, whitespaceLines = parseTitles(lines, 0, 0)
+
+    return SubRipDocument(
+        titles,
+        len(content),
+        len(lines),
+        endsWithNewline,
+        whitespaceLines
+    )
@@ -0,0 +1,203 @@
+from array import array
+import math
+import re
+import typing
+
+from . import subrip
+
+# NumPy is not available in Sublime Text plugin host, but when these
+# functions are used outside of it (CLI, benchmarks), it speeds things up
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# "00:00:00,000 --> 00:00:00,000"
+timingLength: typing.Final[int] = 29
+# timing lines of a document joined with new lines,
+# captures hours, minutes, seconds and milliseconds of both timecodes
+regexSrtTimingsLines: typing.Final[typing.Pattern] = re.compile(
+    r"^(\d{2}):(\d{2}):(\d{2}),(\d{3}) --> (\d{2}):(\d{2}):(\d{2}),(\d{3})$",
+    re.MULTILINE
+)
+
+
+def timingsToMilliseconds(
+    timings: typing.Sequence[str]
+) -> typing.Tuple[array, array]:
+    # all the timing lines are parsed at once, and the result is
+    # a pair of arrays with start and end milliseconds
+    if numpy is not None:
+        return timingsToMillisecondsNumPy(timings)
+
+    timeCodes: typing.List[typing.Tuple[str, ...]] = (
+        regexSrtTimingsLines.findall("\n".join(timings))
+    )
+    if len(timeCodes) != len(timings):
+        raise ValueError(findWrongTiming(timings))
+    starts: array = array("q", [
+        int(h) * 3600000 + int(m) * 60000 + int(s) * 1000 + int(ms)
+        for h, m, s, ms, _, _, _, _ in timeCodes
+    ])
+    ends: array = array("q", [
+        int(h) * 3600000 + int(m) * 60000 + int(s) * 1000 + int(ms)
+        for _, _, _, _, h, m, s, ms in timeCodes
+    ])
+    return (starts, ends)
+
+
+def timingsToMillisecondsNumPy(
+    timings: typing.Sequence[str]
+) -> typing.Tuple[array, array]:
+    if len(timings) == 0:
+        return (array("q"), array("q"))
+    # timings have fixed width, so they can be treated as a matrix
+    # of characters, one row per timing
+    try:
+        content: bytes = "".join(timings).encode("ascii")
+    except UnicodeEncodeError:
+        raise ValueError(findWrongTiming(timings))
+    if len(content) != len(timings) * timingLength:
+        raise ValueError(findWrongTiming(timings))
+    chars = numpy.frombuffer(content, dtype=numpy.uint8).reshape(
+        (len(timings), timingLength)
+    )
+    expected = numpy.frombuffer(
+        b"00:00:00,000 --> 00:00:00,000",
+        dtype=numpy.uint8
+    )
+    isDigit = expected == ord("0")
+    digits = chars.astype(numpy.int64) - ord("0")
+    if (
+        numpy.any(chars[:, ~isDigit] != expected[~isDigit])
+        or numpy.any((digits[:, isDigit] < 0) | (digits[:, isDigit] > 9))
+    ):
+        raise ValueError(findWrongTiming(timings))
+
+    def columnsToMilliseconds(first: int):  # type: ignore
+        d = digits[:, first:first + 12]
+        return (
+            (d[:, 0] * 10 + d[:, 1]) * 3600000
+            + (d[:, 3] * 10 + d[:, 4]) * 60000
+            + (d[:, 6] * 10 + d[:, 7]) * 1000
+            + d[:, 9] * 100 + d[:, 10] * 10 + d[:, 11]
+        )
+
+    return (
+        array("q", columnsToMilliseconds(0).tobytes()),
+        array("q", columnsToMilliseconds(17).tobytes())
+    )
+
+
+def millisecondsToTimings(
+    starts: array,
+    ends: array
+) -> typing.List[str]:
+    # the reverse of timingsToMilliseconds
+    if len(starts) != len(ends):
+        raise ValueError("There should be as many end times as start times.")
+    if len(starts) == 0:
+        return []
+    if min(starts) < 0 or min(ends) < 0:
+        raise ValueError("Timecode cannot be negative.")
+    # more than 99 hours doesn't fit into fixed width
+    if numpy is not None and max(max(starts), max(ends)) < 360000000:
+        return millisecondsToTimingsNumPy(starts, ends)
+
+    return [
+        "%02d:%02d:%02d,%03d --> %02d:%02d:%02d,%03d" % (
+            start // 3600000,
+            start % 3600000 // 60000,
+            start % 60000 // 1000,
+            start % 1000,
+            end // 3600000,
+            end % 3600000 // 60000,
+            end % 60000 // 1000,
+            end % 1000
+        )
+        for start, end in zip(starts, ends)
+    ]
+
+
+def millisecondsToTimingsNumPy(
+    starts: array,
+    ends: array
+) -> typing.List[str]:
+    # the timings are "printed" digit by digit into a matrix of
+    # characters, which is then decoded as a single string
+    chars = numpy.tile(
+        numpy.frombuffer(
+            b"00:00:00,000 --> 00:00:00,000",
+            dtype=numpy.uint8
+        ),
+        (len(starts), 1)
+    )
+    for first, values in (
+        (0, numpy.frombuffer(starts, dtype=numpy.int64)),
+        (17, numpy.frombuffer(ends, dtype=numpy.int64))
+    ):
+        for column, divisor, modulo in (
+            (0, 36000000, 10),
+            (1, 3600000, 10),
+            (3, 600000, 6),
+            (4, 60000, 10),
+            (6, 10000, 6),
+            (7, 1000, 10),
+            (9, 100, 10),
+            (10, 10, 10),
+            (11, 1, 10)
+        ):
+            chars[:, first + column] += (
+                values // divisor % modulo
+            ).astype(numpy.uint8)
+    content: str = chars.tobytes().decode("ascii")
+    return [
+        content[i:i + timingLength]
+        for i in range(0, len(content), timingLength)
+    ]
+
+
+def transformMilliseconds(
+    values: array,
+    scale: float,
+    offset: float
+) -> array:
+    # affine transform (value * scale + offset), rounded
+    # to the nearest millisecond
+    if numpy is not None:
+        transformed = numpy.floor(
+            numpy.frombuffer(values, dtype=numpy.int64) * scale + offset + 0.5
+        ).astype(numpy.int64)
+        return array("q", transformed.tobytes())
+    return array("q", [
+        math.floor(value * scale + offset + 0.5) for value in values
+    ])
+
+
+def findWrongTiming(timings: typing.Sequence[str]) -> str:
+    for index, timing in enumerate(timings):
+        if subrip.regexSrtTiming.fullmatch(timing) is None:
+            return f"Timing #{index+1} has a wrong format: {timing}"
+    return "Timings have a wrong format."
+
+
+# replaces the timing lines of the given titles in the content
+# (which starts at contentOffset in the document), so all the new
+# timings can be put into the buffer with a single edit
+def replaceTimings(
+    content: str,
+    contentOffset: int,
+    titles: typing.Sequence[subrip.SubRipTitle],
+    timings: typing.Sequence[str]
+) -> str:
+    pieces: typing.List[str] = []
+    position: int = 0
+    for title, timing in zip(titles, timings):
+        timingBegin: int = (
+            title.offset + len(title.lines[0]) + 1 - contentOffset
+        )
+        pieces.append(content[position:timingBegin])
+        pieces.append(timing)
+        position = timingBegin + len(title.lines[1])
+    pieces.append(content[position:])
+    return "".join(pieces)
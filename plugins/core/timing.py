@@ -0,0 +1,212 @@
+import math
+import re
+import typing
+
+from . import subrip
+from . import timecodes
+from .subrip import (
+    timeCodeToMilliseconds,
+    millisecondsToTimeCode
+)
+
+
+def splitTimingInTwo(timingToSplit: str) -> typing.Tuple[str, str]:
+    timingMatches = subrip.regexSrtTiming.match(timingToSplit)
+    # print(timingMatches.group(0)) # full timing
+    # print(timingMatches.group(1)) # start time
+    # print(timingMatches.group(2)) # separator
+    # print(timingMatches.group(3)) # end time
+    if timingMatches is None:
+        raise ValueError("The title timing has a wrong format.")
+    timingStart: int = timeCodeToMilliseconds(timingMatches.group(1))
+    timingEnd: int = timeCodeToMilliseconds(timingMatches.group(3))
+    timingHalfLength: int = (timingEnd - timingStart) // 2
+    endTimeFirst: str = millisecondsToTimeCode(
+        timingStart + timingHalfLength
+    )
+    startTimeSecond: str = millisecondsToTimeCode(
+        timingEnd - timingHalfLength + 1
+    )
+    return (
+        f"{timingMatches.group(1)} {timingMatches.group(2)} {endTimeFirst}",
+        f"{startTimeSecond} {timingMatches.group(2)} {timingMatches.group(3)}"
+    )
+
+
+def joinTimings(timingStartStr: str, timingEndStr: str) -> str:
+    timingStartMatches = subrip.regexSrtTiming.match(timingStartStr)
+    timingEndMatches = subrip.regexSrtTiming.match(timingEndStr)
+    # print(timingStartMatches.group(0)) # full timing
+    # print(timingStartMatches.group(1)) # start time
+    # print(timingStartMatches.group(2)) # separator
+    # print(timingStartMatches.group(3)) # end time
+    if timingStartMatches is None or timingEndMatches is None:
+        raise ValueError("One of the title timings has a wrong format.")
+    timingStart: int = timeCodeToMilliseconds(timingStartMatches.group(1))
+    timingEnd: int = timeCodeToMilliseconds(timingEndMatches.group(3))
+    # if timingEnd < timingStart:
+    #     raise ValueError("Second timing cannot be earlier than the first one.")
+    return (
+        " ".join((
+            timingStartMatches.group(1),
+            timingStartMatches.group(2),
+            timingEndMatches.group(3)
+        )) if timingEnd > timingStart
+        else
+        " ".join((
+            timingEndMatches.group(1),
+            timingStartMatches.group(2),
+            timingStartMatches.group(3)
+        ))
+    )
+
+
+def shiftTiming(timingToShift: str, shiftValue: int) -> str:
+    return transformTiming(timingToShift, 1, shiftValue)
+
+
+# affine transform of a timing: every timecode is multiplied by scale
+# and then offset is added to it, the result is rounded to milliseconds
+def transformTiming(
+    timingToTransform: str,
+    scale: float,
+    offset: float
+) -> str:
+    timingMatches = subrip.regexSrtTiming.match(timingToTransform)
+    # print(timingMatches.group(0)) # full timing
+    # print(timingMatches.group(1)) # start time
+    # print(timingMatches.group(2)) # separator
+    # print(timingMatches.group(3)) # end time
+    if timingMatches is None:
+        raise ValueError("The title timing has a wrong format.")
+    timingStart: int = math.floor(
+        timeCodeToMilliseconds(timingMatches.group(1)) * scale + offset + 0.5
+    )
+    timingEnd: int = math.floor(
+        timeCodeToMilliseconds(timingMatches.group(3)) * scale + offset + 0.5
+    )
+    if timingStart < 0 or timingEnd < 0:
+        raise ValueError("The timing goes below 00:00:00,000.")
+    return " ".join((
+        millisecondsToTimeCode(timingStart),
+        timingMatches.group(2),
+        millisecondsToTimeCode(timingEnd)
+    ))
+
+
+# the same as transformTiming, but for all the timings at once
+def transformTimings(
+    timingsToTransform: typing.Sequence[str],
+    scale: float,
+    offset: float
+) -> typing.List[str]:
+    starts, ends = timecodes.timingsToMilliseconds(timingsToTransform)
+    starts = timecodes.transformMilliseconds(starts, scale, offset)
+    ends = timecodes.transformMilliseconds(ends, scale, offset)
+    for index, (timingStart, timingEnd) in enumerate(zip(starts, ends)):
+        if timingStart < 0 or timingEnd < 0:
+            raise ValueError(
+                " ".join((
+                    f"The timing #{index+1} ({timingsToTransform[index]})",
+                    "goes below 00:00:00,000."
+                ))
+            )
+    return timecodes.millisecondsToTimings(starts, ends)
+
+
+def shiftTimings(
+    timingsToShift: typing.Sequence[str],
+    shiftValue: int
+) -> typing.List[str]:
+    return transformTimings(timingsToShift, 1, shiftValue)
+
+
+# two-point synchronisation: the scale and offset that move the first
+# timecode to the first new one and the last timecode to the last new one
+def twoPointsTransform(
+    firstTime: int,
+    lastTime: int,
+    firstTimeNew: int,
+    lastTimeNew: int
+) -> typing.Tuple[float, float]:
+    if lastTime <= firstTime:
+        raise ValueError(
+            " ".join((
+                "The last title should start",
+                "later than the first one."
+            ))
+        )
+    if lastTimeNew <= firstTimeNew:
+        raise ValueError(
+            " ".join((
+                "The new start time of the last title should be",
+                "later than the new start time of the first one."
+            ))
+        )
+    scale: float = (lastTimeNew - firstTimeNew) / (lastTime - firstTime)
+    return (scale, firstTimeNew - firstTime * scale)
+
+
+# "12-40", "12-" (till the last title) or just "12"
+regexTitlesRange: typing.Final[typing.Pattern] = re.compile(
+    r"^\s*(\d+)\s*(?:(-)\s*(\d*)\s*)?$"
+)
+
+
+def parseTitlesRange(
+    titlesRange: str
+) -> typing.Tuple[int, typing.Optional[int]]:
+    rangeMatches = regexTitlesRange.fullmatch(titlesRange)
+    if rangeMatches is None:
+        raise ValueError(
+            " ".join((
+                "Titles range should be like 12-40,",
+                "12- (till the last title) or just 12."
+            ))
+        )
+    firstOrdinal: int = int(rangeMatches.group(1))
+    lastOrdinal: typing.Optional[int] = firstOrdinal
+    if rangeMatches.group(2):
+        lastOrdinal = (
+            int(rangeMatches.group(3)) if rangeMatches.group(3) else None
+        )
+    if lastOrdinal is not None and lastOrdinal < firstOrdinal:
+        raise ValueError(
+            "The last title of the range goes before the first one."
+        )
+    return (firstOrdinal, lastOrdinal)
+
+
+def getTitlesRange(
+    document: subrip.SubRipDocument,
+    titlesRange: str
+) -> typing.List[subrip.SubRipTitle]:
+    firstOrdinal, lastOrdinal = parseTitlesRange(titlesRange)
+    firstIndex: typing.Optional[int] = document.titleIndexByOrdinal(
+        firstOrdinal
+    )
+    if firstIndex is None:
+        raise ValueError(f"There is no title #{firstOrdinal}.")
+    lastIndex: typing.Optional[int] = len(document.titles) - 1
+    if lastOrdinal is not None:
+        lastIndex = document.titleIndexByOrdinal(lastOrdinal)
+    if lastIndex is None:
+        raise ValueError(f"There is no title #{lastOrdinal}.")
+    if lastIndex < firstIndex:
+        raise ValueError(
+            "The last title of the range goes before the first one."
+        )
+    return document.titles[firstIndex:lastIndex + 1]
+
+
+# fractional ones are NTSC framerates
+framerates: typing.Final[typing.List[typing.Tuple[str, float]]] = [
+    ("23.976", 24000 / 1001),
+    ("24", 24),
+    ("25", 25),
+    ("29.97", 30000 / 1001),
+    ("30", 30),
+    ("50", 50),
+    ("59.94", 60000 / 1001),
+    ("60", 60)
+]
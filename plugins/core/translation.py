@@ -0,0 +1,439 @@
+import concurrent.futures
+import contextlib
+import heapq
+import os
+import pathlib
+import re
+import typing
+
+from . import subrip
+from .settings import Settings
+
+# fallback values, if there is nothing in the settings
+placeholdersInsteadOfEmptyLinesFallback: bool = True
+titlePlaceholderFallback: typing.Final[str] = "[ ... ]"
+# characters to read/write at once when generating translation files
+# from the files on disk, without parsing them as a whole
+streamChunkSize: typing.Final[int] = 1024 * 1024
+# no need for more threads than that, they all write to the same disk
+maxTranslationFileWriters: typing.Final[int] = 8
+# language suffixes can be separated with commas and/or spaces
+regexLanguagesSeparator: typing.Final[typing.Pattern] = re.compile(r"[\s,]+")
+# some-file-LANGUAGE, captures the original file name
+regexTranslationFileStem: typing.Final[typing.Pattern] = re.compile(
+    r"^(.+)-[A-Za-z]+$"
+)
+
+
+def translationFilePath(
+    originalFile: pathlib.Path,
+    language: str
+) -> pathlib.Path:
+    return pathlib.Path(
+        originalFile.parents[0],
+        f"{originalFile.stem}-{language}{originalFile.suffix}"
+    )
+
+
+def makeTitleSkeleton(
+    title: subrip.SubRipTitle,
+    titlePlaceholder: str
+) -> str:
+    return "\n".join(
+        [str(title.ordinal), str(title.timing)]
+        + [titlePlaceholder] * len(title.textLines)
+    )
+
+
+# "ru, de es" -> ["ru", "de", "es"], without duplicates; the suffixes
+# themselves should be checked with subrip.regexLanguageCode
+def parseLanguages(languages: str) -> typing.List[str]:
+    return list(dict.fromkeys(
+        lang for lang in regexLanguagesSeparator.split(languages) if lang
+    ))
+
+
+# what text lines of the original are replaced with in translation files
+def loadTitlePlaceholder(settings: Settings) -> str:
+    titlePlaceholder: str = settings.get(
+        "title_placeholder",
+        titlePlaceholderFallback
+    )
+    placeholdersInsteadOfEmptyLines: bool = settings.get(
+        "placeholders_instead_of_empty_lines",
+        placeholdersInsteadOfEmptyLinesFallback
+    )
+    return titlePlaceholder if placeholdersInsteadOfEmptyLines else ""
+
+
+# the reverse of translationFilePath(): some-file-LANGUAGE.srt ->
+# some-file.srt, None if the file name doesn't look like a translation
+def originalFilePath(
+    translationFile: pathlib.Path
+) -> typing.Optional[pathlib.Path]:
+    translationMatches = regexTranslationFileStem.fullmatch(
+        translationFile.stem
+    )
+    if translationMatches is None:
+        return None
+    return translationFile.with_name(
+        f"{translationMatches.group(1)}{translationFile.suffix}"
+    )
+
+
+# .srt files in the given files and directories (recursively), except
+# for translation files: some-file-LANGUAGE.srt next to some-file.srt,
+# so generating translations for a folder twice doesn't translate them
+def findOriginalFiles(
+    paths: typing.Iterable[str]
+) -> typing.List[pathlib.Path]:
+    files: typing.List[pathlib.Path] = []
+    for p in paths:
+        path: pathlib.Path = pathlib.Path(p)
+        if not path.is_dir():
+            files.append(path)
+            continue
+        foundFiles: typing.List[pathlib.Path] = sorted(path.rglob("*.srt"))
+        foundFilesSet: typing.Set[pathlib.Path] = set(foundFiles)
+        files.extend(
+            f for f in foundFiles
+            if originalFilePath(f) not in foundFilesSet
+        )
+    return files
+
+
+# the same titles with the same ordinals and timings, but with
+# every text line replaced with a placeholder (or an empty line)
+def makeTranslationSkeleton(
+    document: subrip.SubRipDocument,
+    titlePlaceholder: str
+) -> str:
+    return "".join((
+        "\n\n".join(
+            makeTitleSkeleton(title, titlePlaceholder)
+            for title in document.titles
+        ),
+        "\n" * (1 + document.trailingEmptyLines)
+    ))
+
+
+# lines of a text stream (without new line characters), the same way
+# parseSubRip() splits the content, but read in chunks
+def readLines(
+    stream: typing.TextIO,
+    chunkSize: int = streamChunkSize
+) -> typing.Iterator[str]:
+    rest: str = ""
+    while True:
+        chunk: str = stream.read(chunkSize)
+        if not chunk:
+            break
+        lines: typing.List[str] = (rest + chunk).split("\n")
+        rest = lines.pop()
+        yield from lines
+    if rest:
+        yield rest
+
+
+# the same as makeTranslationSkeleton() with the strict structure check,
+# but titles are processed one by one as the lines come, so the whole
+# original is never in memory; the result comes in pieces of about
+# chunkSize characters. Raises SubRipFormatError on the first problem
+def generateTranslationSkeleton(
+    lines: typing.Iterable[str],
+    titlePlaceholder: str,
+    chunkSize: int = streamChunkSize
+) -> typing.Iterator[str]:
+    pieces: typing.List[str] = []
+    piecesSize: int = 0
+    previousTitle: typing.Optional[subrip.SubRipTitle] = None
+    titleLines: typing.List[str] = []
+    titleOffset: int = 0
+    offset: int = 0
+    lineCount: int = 0
+
+    def addTitle(lineIndex: int) -> None:
+        nonlocal previousTitle, piecesSize
+        title: subrip.SubRipTitle = subrip.SubRipTitle(
+            lineIndex,
+            titleOffset,
+            titleLines
+        )
+        subrip.checkTitleStructure(title, previousTitle, True)
+        piece: str = makeTitleSkeleton(title, titlePlaceholder)
+        if previousTitle is not None:
+            piece = f"\n\n{piece}"
+        pieces.append(piece)
+        piecesSize += len(piece)
+        previousTitle = title
+
+    for line in lines:
+        if not line or line.isspace():
+            if titleLines:
+                addTitle(lineCount - len(titleLines))
+                titleLines = []
+                if piecesSize >= chunkSize:
+                    yield "".join(pieces)
+                    pieces.clear()
+                    piecesSize = 0
+        else:
+            if not titleLines:
+                titleOffset = offset
+            titleLines.append(line)
+        offset += len(line) + 1
+        lineCount += 1
+    if titleLines:
+        addTitle(lineCount - len(titleLines))
+
+    subrip.checkTrailingEmptyLines(previousTitle, lineCount)
+    trailingEmptyLines: int = lineCount - (
+        previousTitle.nextLineIndex if previousTitle is not None
+        else 0
+    )
+    pieces.append("\n" * (1 + trailingEmptyLines))
+    yield "".join(pieces)
+
+
+# generates translation files straight from the original on disk,
+# all the languages in one pass over it. The results are written
+# to temporary files first, so if the original turns out
+# to be malformed, existing translation files stay intact
+def writeTranslationSkeletons(
+    originalFile: pathlib.Path,
+    generatedFiles: typing.Sequence[pathlib.Path],
+    titlePlaceholder: str,
+    chunkSize: int = streamChunkSize
+) -> None:
+    temporaryFiles: typing.List[pathlib.Path] = [
+        f.with_name(f".{f.name}.tmp") for f in generatedFiles
+    ]
+    try:
+        with contextlib.ExitStack() as files:
+            # universal newlines, the same as in Sublime Text buffer
+            of = files.enter_context(
+                open(originalFile, "r", encoding="utf-8-sig")
+            )
+            gfs: typing.List[typing.TextIO] = [
+                files.enter_context(
+                    open(f, "w", encoding="utf-8", buffering=chunkSize)
+                )
+                for f in temporaryFiles
+            ]
+            for piece in generateTranslationSkeleton(
+                readLines(of, chunkSize),
+                titlePlaceholder,
+                chunkSize
+            ):
+                for gf in gfs:
+                    gf.write(piece)
+        for temporaryFile, generatedFile in zip(
+            temporaryFiles,
+            generatedFiles
+        ):
+            os.replace(temporaryFile, generatedFile)
+    except BaseException:
+        for temporaryFile in temporaryFiles:
+            if temporaryFile.exists():
+                temporaryFile.unlink()
+        raise
+
+
+# the same content into several files, concurrently, as it's mostly
+# waiting for the disk; returns the errors of the files that failed
+def writeTranslationFiles(
+    content: str,
+    generatedFiles: typing.Sequence[pathlib.Path]
+) -> typing.Dict[pathlib.Path, OSError]:
+    def writeFile(generatedFile: pathlib.Path) -> typing.Optional[OSError]:
+        try:
+            with open(generatedFile, "w", encoding="utf-8") as gf:
+                gf.write(content)
+        except OSError as ex:
+            return ex
+        return None
+
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=min(len(generatedFiles), maxTranslationFileWriters) or 1
+    ) as executor:
+        errors = executor.map(writeFile, generatedFiles)
+        return {
+            f: ex for f, ex in zip(generatedFiles, errors) if ex is not None
+        }
+
+
+class TranslationProgress(typing.NamedTuple):
+    translatedTitles: int
+    titles: int
+
+
+# a title is translated when it has some text besides placeholders
+def isTitleTranslated(
+    title: subrip.SubRipTitle,
+    titlePlaceholder: str
+) -> bool:
+    return any(
+        ln.strip() and ln != titlePlaceholder for ln in title.textLines
+    )
+
+
+# cheap to call after every edit, as only the changed titles
+# are checked again, see SubRipDocument.countTitles()
+def getTranslationProgress(
+    document: subrip.SubRipDocument,
+    titlePlaceholder: str
+) -> TranslationProgress:
+    return TranslationProgress(
+        document.countTitles(
+            f"translated:{titlePlaceholder}",
+            lambda t: isTitleTranslated(t, titlePlaceholder)
+        ),
+        len(document.titles)
+    )
+
+
+class TranslationSyncResult(typing.NamedTuple):
+    content: str
+    # original titles that got the text of some translation titles
+    matchedTitles: int
+    # original titles that didn't match anything, got placeholders
+    newTitles: int
+    # translation titles that don't match any original title anymore
+    droppedTitles: int
+    # ...and how many of them had something besides placeholders
+    droppedTranslatedTitles: int
+
+
+# for every translation title, the index of the original title
+# it overlaps with the most (None if there is no such title).
+# Both lists are swept in the order of start times, keeping a heap
+# of the original titles that might still overlap by their end times,
+# so there is no need to compare every title with every other
+def matchTitlesByTiming(
+    originalTitles: typing.Sequence[subrip.SubRipTitle],
+    translationTitles: typing.Sequence[subrip.SubRipTitle]
+) -> typing.List[typing.Optional[int]]:
+    originalTimes: typing.List[typing.Tuple[int, int]] = [
+        (typing.cast(int, t.timeStart), typing.cast(int, t.timeEnd))
+        for t in originalTitles
+    ]
+    originalOrder: typing.List[int] = sorted(
+        range(len(originalTitles)),
+        key=lambda i: originalTimes[i][0]
+    )
+    translationOrder: typing.List[int] = sorted(
+        range(len(translationTitles)),
+        key=lambda i: typing.cast(int, translationTitles[i].timeStart)
+    )
+
+    matches: typing.List[typing.Optional[int]] = [None] * len(
+        translationTitles
+    )
+    # (end time, index) of the original titles that started already
+    activeTitles: typing.List[typing.Tuple[int, int]] = []
+    nextOriginal: int = 0
+    for translationIndex in translationOrder:
+        title: subrip.SubRipTitle = translationTitles[translationIndex]
+        timeStart: int = typing.cast(int, title.timeStart)
+        timeEnd: int = typing.cast(int, title.timeEnd)
+        while (
+            nextOriginal < len(originalOrder)
+            and originalTimes[originalOrder[nextOriginal]][0] < timeEnd
+        ):
+            originalIndex: int = originalOrder[nextOriginal]
+            heapq.heappush(
+                activeTitles,
+                (originalTimes[originalIndex][1], originalIndex)
+            )
+            nextOriginal += 1
+        # the ones that ended can't overlap with the next titles either
+        while activeTitles and activeTitles[0][0] <= timeStart:
+            heapq.heappop(activeTitles)
+
+        bestOverlap: int = 0
+        for originalEnd, originalIndex in activeTitles:
+            overlap: int = (
+                min(originalEnd, timeEnd)
+                - max(originalTimes[originalIndex][0], timeStart)
+            )
+            if overlap > bestOverlap or (
+                overlap == bestOverlap
+                and overlap > 0
+                and originalIndex < typing.cast(int, matches[translationIndex])
+            ):
+                bestOverlap = overlap
+                matches[translationIndex] = originalIndex
+    return matches
+
+
+# rebuilds the translation after the titles of the original were
+# inserted/split/joined/removed: every title of the original gets the text
+# of the translation titles matched to it by timing (several of them
+# are joined together), or placeholders if there are none. Ordinals
+# and timings are taken from the original; both documents should pass
+# the strict structure check
+def syncTranslation(
+    originalDocument: subrip.SubRipDocument,
+    translationDocument: subrip.SubRipDocument,
+    titlePlaceholder: str
+) -> TranslationSyncResult:
+    originalTitles: typing.List[subrip.SubRipTitle] = originalDocument.titles
+    translationTitles: typing.List[subrip.SubRipTitle] = (
+        translationDocument.titles
+    )
+    matches: typing.List[typing.Optional[int]] = matchTitlesByTiming(
+        originalTitles,
+        translationTitles
+    )
+
+    textLines: typing.List[typing.List[str]] = [[] for _ in originalTitles]
+    droppedTitles: int = 0
+    droppedTranslatedTitles: int = 0
+    for title, match in zip(translationTitles, matches):
+        if match is not None:
+            textLines[match].extend(title.textLines)
+            continue
+        droppedTitles += 1
+        if isTitleTranslated(title, titlePlaceholder):
+            droppedTranslatedTitles += 1
+
+    translatedTitles: typing.List[str] = []
+    matchedTitles: int = 0
+    for title, lines in zip(originalTitles, textLines):
+        if lines:
+            matchedTitles += 1
+        else:
+            lines = [titlePlaceholder] * len(title.textLines)
+        translatedTitles.append(
+            "\n".join([str(title.ordinal), str(title.timing)] + lines)
+        )
+    return TranslationSyncResult(
+        "".join((
+            "\n\n".join(translatedTitles),
+            "\n" * (1 + translationDocument.trailingEmptyLines)
+        )),
+        matchedTitles,
+        len(originalTitles) - matchedTitles,
+        droppedTitles,
+        droppedTranslatedTitles
+    )
+
+
+def splitStringInTwo(
+    stringToSplit: str,
+    titlePlaceholder: str
+) -> typing.Tuple[str, str]:
+    middlePoint: int = len(stringToSplit) // 2
+    while (
+        stringToSplit[middlePoint] != " "
+        and middlePoint != len(stringToSplit) - 1
+    ):
+        middlePoint += 1
+    firstHalf: str = stringToSplit[:middlePoint]
+    secondHalf: str = stringToSplit[middlePoint:]
+    if len(secondHalf) == 1:
+        firstHalf = stringToSplit
+        secondHalf = ""
+    return (
+        firstHalf if firstHalf else titlePlaceholder,
+        secondHalf.strip() if secondHalf else titlePlaceholder
+    )
@@ -0,0 +1,1228 @@
+from collections import Counter, OrderedDict
+import hashlib
+import re
+import typing
+
+from . import subrip
+from .settings import Settings
+
+severityError: typing.Final[str] = "error"
+severityWarning: typing.Final[str] = "warning"
+# for disabling a rule
+severityOff: typing.Final[str] = "off"
+
+# fallback values, if there is nothing in the settings
+maxTitleLineLengthFallback: int = 41
+maxTitleLinesFallback: int = 3
+minTitleDurationFallback: int = 500
+maxTitleDurationFallback: int = 6000
+htmlTagsToWatchForFallback: typing.List[str] = ["b", "i", "u", "font"]
+# rule name -> severity, the rules that are not there are errors
+validationRulesFallback: typing.Dict[str, str] = {}
+customValidationRulesFallback: typing.List[dict] = []
+
+
+class ValidationSettings(typing.NamedTuple):
+    maxTitleLineLength: int
+    maxTitleLines: int
+    minTitleDuration: int
+    maxTitleDuration: int
+    htmlTagsToWatchFor: typing.List[str]
+    ruleSeverities: typing.Dict[str, str]
+    customRules: typing.List[dict]
+
+
+class ValidationProblem(typing.NamedTuple):
+    # None if the problem is about the whole content
+    lineIndex: typing.Optional[int]
+    # None if the problem is not about a particular title,
+    # or if the title doesn't have a valid ordinal
+    titleOrdinal: typing.Optional[int]
+    message: str
+    severity: str = severityError
+
+
+def loadValidationSettings(settings: Settings) -> ValidationSettings:
+    return ValidationSettings(
+        settings.get(
+            "maximum_title_text_line_length",
+            maxTitleLineLengthFallback
+        ),
+        settings.get(
+            "maximum_title_text_lines",
+            maxTitleLinesFallback
+        ),
+        settings.get(
+            "minimum_title_duration",
+            minTitleDurationFallback
+        ),
+        settings.get(
+            "maximum_title_duration",
+            maxTitleDurationFallback
+        ),
+        settings.get(
+            "html_tags_to_watch_for",
+            htmlTagsToWatchForFallback
+        ),
+        settings.get(
+            "validation_rules",
+            validationRulesFallback
+        ),
+        settings.get(
+            "custom_validation_rules",
+            customValidationRulesFallback
+        )
+    )
+
+
+# excluded titles are stored in project data per file name,
+# as title identities (see titleIdentity()), or as ordinals
+# in the lists made by the older versions
+def loadExcludedTitles(
+    projectData: typing.Optional[dict],
+    fileName: str
+) -> typing.List[typing.Union[int, str]]:
+    if not projectData:
+        return []
+    projectSettings: typing.Optional[dict] = projectData.get("settings")
+    if not projectSettings:
+        return []
+    return projectSettings.get(
+        "marlant", {}
+    ).get(
+        "validation", {}
+    ).get(
+        "excluded-titles", {}
+    ).get(
+        fileName, []
+    )
+
+
+# identifies a title by its start time and text, unlike the ordinal
+# it doesn't change when titles before it are inserted/joined/renumbered
+def makeTitleIdentity(timing: str, textLines: typing.Iterable[str]) -> str:
+    textHash: str = hashlib.blake2b(
+        "\n".join(ln.strip() for ln in textLines).encode("utf-8"),
+        digest_size=6
+    ).hexdigest()
+    return f"{timing.split(' ', 1)[0]}/{textHash}"
+
+
+def titleIdentity(title: subrip.SubRipTitle) -> typing.Optional[str]:
+    if title.timing is None:
+        return None
+    return makeTitleIdentity(title.timing, title.textLines)
+
+
+# identities of the excluded titles, the ordinals are looked up
+# in the document
+def excludedTitlesIdentities(
+    excludedTitles: typing.Iterable[typing.Union[int, str]],
+    document: subrip.SubRipDocument
+) -> typing.Set[str]:
+    identities: typing.Set[str] = set()
+    for excludedTitle in excludedTitles:
+        if isinstance(excludedTitle, str):
+            identities.add(excludedTitle)
+            continue
+        titleIndex: typing.Optional[int] = document.titleIndexByOrdinal(
+            excludedTitle
+        )
+        if titleIndex is None:
+            continue
+        identity: typing.Optional[str] = titleIdentity(
+            document.titles[titleIndex]
+        )
+        if identity is not None:
+            identities.add(identity)
+    return identities
+
+
+def problemDescription(problem: ValidationProblem) -> str:
+    return problem.message[:1].upper() + problem.message[1:]
+
+
+def checkForUnmatchedHtmlTags(
+    openHtmlTags: typing.List[str],
+    closeHtmlTags: typing.List[str]
+) -> typing.Tuple[typing.List[str], typing.List[str]]:
+    unmatchedOpenTags: typing.List[str] = []
+    unmatchedCloseTags: typing.List[str] = []
+    # print(f"Collected open tags: {openHtmlTags}")
+    # print(f"Collected closing tags: {closeHtmlTags}")
+    if len(openHtmlTags) > 0:
+        unmatchedOpenTags = list(
+            Counter(openHtmlTags) - Counter(closeHtmlTags)
+        )
+        # if len(unmatchedOpenTags.keys()) > 0:
+        #     print(f"Unmatched open tags: {','.join(unmatchedOpenTags.keys())}")
+    if len(closeHtmlTags) > 0:
+        unmatchedCloseTags = list(
+            Counter(closeHtmlTags) - Counter(openHtmlTags)
+        )
+        # if len(unmatchedCloseTags.keys()) > 0:
+        #     print(f"Unmatched close tags: {','.join(unmatchedCloseTags.keys())}")
+    return (unmatchedOpenTags, unmatchedCloseTags)
+
+
+def compileHtmlTagsRegexes(
+    htmlTagsToWatchFor: typing.List[str]
+) -> typing.Tuple[typing.Pattern, typing.Pattern]:
+    if not isinstance(htmlTagsToWatchFor, list):
+        raise TypeError("Tags need to be a list of strings")
+    htmlTagsToWatchForJoined = "|".join(htmlTagsToWatchFor)
+    # this regular expression is very naive, as it will also find
+    # <underestimated>, <incredibly>, <beautiful>, <fontange> tags,
+    # not just <u>, <i>, <b>, <font>
+    regexHTMLtagOpen: typing.Pattern = re.compile(
+        f"(<({htmlTagsToWatchForJoined})[^>]*>)"
+    )
+    # this one is quite okay though
+    regexHTMLtagClose: typing.Pattern = re.compile(
+        f"(<\\/({htmlTagsToWatchForJoined})>)"
+    )
+    return (regexHTMLtagOpen, regexHTMLtagClose)
+
+
+# where a rule is at in the document, and what the previous titles
+# left for the next ones; one object for the whole run, updated as it goes
+class ValidationContext:
+    def __init__(self, document: subrip.SubRipDocument) -> None:
+        self.document: subrip.SubRipDocument = document
+        self.lastTitleIndex: int = len(document.titles) - 1
+        self.whitespaceLines: typing.Set[int] = set(document.whitespaceLines)
+        # the end of the previous title, empty lines are checked up to it
+        self.previousLineEnd: int = 0
+        self.titleIndex: int = 0
+        self.title: subrip.SubRipTitle = subrip.SubRipTitle(0, 0, [""])
+        # the ordinal of the current title, or of the previous one
+        # while the ordinal line is being checked
+        self.titleCount: int = 0
+        self.previousTitleTimeEnd: int = 0
+        self.lineIndex: int = 0
+        self.line: str = ""
+        # the number of the line in the title, starting from 1
+        self.titleLineNumber: int = 0
+        # the length of the HTML tags in the current text line,
+        # and all the tags of the current title
+        self.lineTagsLength: int = 0
+        self.openHtmlTags: typing.List[str] = []
+        self.closeHtmlTags: typing.List[str] = []
+
+
+noProblems: typing.Final[typing.Tuple[ValidationProblem, ...]] = ()
+
+# rules put it in the messages instead of the number of the problem line,
+# so the problems of a title can be reused when the title moves
+lineNumberPlaceholder: typing.Final[str] = "{line}"
+
+
+# the problem with its line moved by the offset and the line number
+# in the message
+def placeProblem(
+    problem: ValidationProblem,
+    lineOffset: int = 0
+) -> ValidationProblem:
+    if problem.lineIndex is None:
+        return problem
+    lineIndex: int = problem.lineIndex + lineOffset
+    return ValidationProblem(
+        lineIndex,
+        problem.titleOrdinal,
+        problem.message.replace(lineNumberPlaceholder, str(lineIndex + 1)),
+        problem.severity
+    )
+
+
+# a single check with its severity. The checks are done in the methods
+# for the parts of the document they are about, and a rule overrides
+# only the ones it needs, the rest are not called at all. Every method
+# returns the problems it found, usually none. The same rule objects
+# are used for all the documents (possibly at the same time), so rules
+# keep everything about the document in the context
+class ValidationRule:
+    # the key in the "validation_rules" setting
+    name: str = ""
+
+    def __init__(self, settings: ValidationSettings, severity: str) -> None:
+        self.severity: str = severity
+
+    def problem(
+        self,
+        lineIndex: typing.Optional[int],
+        titleOrdinal: typing.Optional[int],
+        message: str
+    ) -> ValidationProblem:
+        return ValidationProblem(
+            lineIndex,
+            titleOrdinal,
+            message,
+            self.severity
+        )
+
+    # once for the whole document, before the titles
+    def checkDocument(
+        self,
+        context: ValidationContext
+    ) -> typing.Sequence[ValidationProblem]:
+        return noProblems
+
+    # empty lines before a title
+    def checkEmptyLine(
+        self,
+        context: ValidationContext
+    ) -> typing.Sequence[ValidationProblem]:
+        return noProblems
+
+    # every line of a title, including the ordinal and the timing
+    def checkLine(
+        self,
+        context: ValidationContext
+    ) -> typing.Sequence[ValidationProblem]:
+        return noProblems
+
+    def checkOrdinal(
+        self,
+        context: ValidationContext
+    ) -> typing.Sequence[ValidationProblem]:
+        return noProblems
+
+    def checkTiming(
+        self,
+        context: ValidationContext
+    ) -> typing.Sequence[ValidationProblem]:
+        return noProblems
+
+    def checkText(
+        self,
+        context: ValidationContext
+    ) -> typing.Sequence[ValidationProblem]:
+        return noProblems
+
+    # after all the lines of a title
+    def checkTitle(
+        self,
+        context: ValidationContext
+    ) -> typing.Sequence[ValidationProblem]:
+        return noProblems
+
+
+class EndOfFileRule(ValidationRule):
+    name = "end_of_file"
+
+    def checkDocument(
+        self,
+        context: ValidationContext
+    ) -> typing.Sequence[ValidationProblem]:
+        problems: typing.List[ValidationProblem] = []
+        if not context.document.endsWithNewline:
+            problems.append(
+                self.problem(
+                    None,
+                    None,
+                    " ".join((
+                        "there should",
+                        "be an empty line in the end of file."
+                    ))
+                )
+            )
+        if context.document.trailingEmptyLines > 0:
+            problems.append(
+                self.problem(
+                    context.document.lineCount,
+                    None,
+                    " ".join((
+                        "there is a redundant",
+                        "empty line in the end of file."
+                    ))
+                )
+            )
+        return problems
+
+
+class EmptyLinesRule(ValidationRule):
+    name = "empty_lines"
+
+    def checkEmptyLine(
+        self,
+        context: ValidationContext
+    ) -> typing.Sequence[ValidationProblem]:
+        index: int = context.lineIndex
+        if index == 0 or index > context.previousLineEnd:
+            return (
+                self.problem(
+                    index,
+                    None,
+                    " ".join((
+                        f"the line {lineNumberPlaceholder}",
+                        "should not be empty."
+                    ))
+                ),
+            )
+        return noProblems
+
+    def checkTitle(
+        self,
+        context: ValidationContext
+    ) -> typing.Sequence[ValidationProblem]:
+        title: subrip.SubRipTitle = context.title
+        if len(title.lines) >= 3:
+            return noProblems
+        if context.titleIndex == context.lastTitleIndex:
+            return (
+                self.problem(
+                    context.document.lineCount,
+                    title.ordinal,
+                    " ".join((
+                        "the last title",
+                        "doesn't have any text lines."
+                    ))
+                ),
+            )
+        return (
+            self.problem(
+                title.nextLineIndex,
+                title.ordinal,
+                " ".join((
+                    f"the line {lineNumberPlaceholder}",
+                    "should not be empty."
+                ))
+            ),
+        )
+
+
+class WhitespaceRule(ValidationRule):
+    name = "whitespace"
+
+    def checkEmptyLine(
+        self,
+        context: ValidationContext
+    ) -> typing.Sequence[ValidationProblem]:
+        if context.lineIndex in context.whitespaceLines:
+            return (
+                self.problem(
+                    context.lineIndex,
+                    None,
+                    " ".join((
+                        "there is a trailing whitespace",
+                        f"on the line {lineNumberPlaceholder}."
+                    ))
+                ),
+            )
+        return noProblems
+
+    def checkLine(
+        self,
+        context: ValidationContext
+    ) -> typing.Sequence[ValidationProblem]:
+        line: str = context.line
+        if line[-1:] != " " and line[:1] != " ":
+            return noProblems
+        problems: typing.List[ValidationProblem] = []
+        index: int = context.lineIndex
+        if line.endswith(" "):
+            problems.append(
+                self.problem(
+                    index,
+                    context.title.ordinal,
+                    " ".join((
+                        "there is a trailing whitespace",
+                        f"on the line {lineNumberPlaceholder}."
+                    ))
+                )
+            )
+        if line.startswith(" "):
+            problems.append(
+                self.problem(
+                    index,
+                    context.title.ordinal,
+                    " ".join((
+                        f"the line {lineNumberPlaceholder}",
+                        "starts with a whitespace."
+                    ))
+                )
+            )
+        return problems
+
+
+class OrdinalsRule(ValidationRule):
+    name = "ordinals"
+
+    def checkOrdinal(
+        self,
+        context: ValidationContext
+    ) -> typing.Sequence[ValidationProblem]:
+        ordinal: typing.Optional[int] = context.title.ordinal
+        index: int = context.lineIndex
+        if ordinal is None:
+            return (
+                self.problem(
+                    index,
+                    None,
+                    " ".join((
+                        f"the line {lineNumberPlaceholder}",
+                        "should contain a title number."
+                    ))
+                ),
+            )
+        if ordinal - context.titleCount != 1:
+            return (
+                self.problem(
+                    index,
+                    ordinal,
+                    " ".join((
+                        "the title number",
+                        f"on the line {lineNumberPlaceholder}",
+                        f"({ordinal}) is not",
+                        "a +1 increment of the previous",
+                        f"title number ({context.titleCount})."
+                    ))
+                ),
+            )
+        return noProblems
+
+
+class TimingFormatRule(ValidationRule):
+    name = "timing_format"
+
+    def checkTiming(
+        self,
+        context: ValidationContext
+    ) -> typing.Sequence[ValidationProblem]:
+        if context.title.timeStart is None or context.title.timeEnd is None:
+            return (
+                self.problem(
+                    context.lineIndex,
+                    context.title.ordinal,
+                    " ".join((
+                        "there",
+                        "should be a correct timing string",
+                        f"on the line {lineNumberPlaceholder}."
+                    ))
+                ),
+            )
+        return noProblems
+
+
+class DurationRule(ValidationRule):
+    name = "duration"
+
+    def __init__(self, settings: ValidationSettings, severity: str) -> None:
+        super().__init__(settings, severity)
+        self.minTitleDuration: int = settings.minTitleDuration
+        self.maxTitleDuration: int = settings.maxTitleDuration
+
+    def checkTiming(
+        self,
+        context: ValidationContext
+    ) -> typing.Sequence[ValidationProblem]:
+        title: subrip.SubRipTitle = context.title
+        if title.timeStart is None or title.timeEnd is None:
+            return noProblems
+        duration: int = title.timeEnd - title.timeStart
+        if (
+            duration >= 0
+            and self.minTitleDuration <= duration <= self.maxTitleDuration
+        ):
+            return noProblems
+        index: int = context.lineIndex
+        # start timecode should not be "later" than end timecode
+        if duration < 0:
+            message: str = " ".join((
+                "the start time",
+                f"of the title on the line {lineNumberPlaceholder}",
+                "is bigger than its end time."
+            ))
+        # title time duration should not be too short
+        elif duration < self.minTitleDuration:
+            message = " ".join((
+                "duration of the title",
+                f"on the line {lineNumberPlaceholder} is too short",
+                f"(less than {self.minTitleDuration} milliseconds)."
+            ))
+        # title time duration should not be too long
+        else:
+            message = " ".join((
+                "duration of the title",
+                f"on the line {lineNumberPlaceholder} is too long",
+                f"(more than {self.maxTitleDuration} milliseconds)."
+            ))
+        return (self.problem(index, title.ordinal, message),)
+
+
+class OverlapRule(ValidationRule):
+    name = "overlap"
+
+    def checkTiming(
+        self,
+        context: ValidationContext
+    ) -> typing.Sequence[ValidationProblem]:
+        timeStart: typing.Optional[int] = context.title.timeStart
+        if (
+            timeStart is None
+            or context.title.timeEnd is None
+            or context.titleCount <= 1
+            or timeStart > context.previousTitleTimeEnd
+        ):
+            return noProblems
+        return (
+            self.problem(
+                context.lineIndex,
+                context.title.ordinal,
+                " ".join((
+                    "the title",
+                    f"on the line {lineNumberPlaceholder} starts before",
+                    "the previous one ends."
+                ))
+            ),
+        )
+
+
+class LinesCountRule(ValidationRule):
+    name = "lines_count"
+
+    def __init__(self, settings: ValidationSettings, severity: str) -> None:
+        super().__init__(settings, severity)
+        self.maxTitleLines: int = settings.maxTitleLines
+
+    def checkText(
+        self,
+        context: ValidationContext
+    ) -> typing.Sequence[ValidationProblem]:
+        # report it only once per title
+        if context.titleLineNumber != 3 + self.maxTitleLines:
+            return noProblems
+        return (
+            self.problem(
+                context.lineIndex,
+                context.title.ordinal,
+                " ".join((
+                    "this title has too many",
+                    f"text lines (more than {self.maxTitleLines}).",
+                    "It may be obstructing the view."
+                ))
+            ),
+        )
+
+
+class LineLengthRule(ValidationRule):
+    name = "line_length"
+
+    def __init__(self, settings: ValidationSettings, severity: str) -> None:
+        super().__init__(settings, severity)
+        self.maxTitleLineLength: int = settings.maxTitleLineLength
+
+    def checkText(
+        self,
+        context: ValidationContext
+    ) -> typing.Sequence[ValidationProblem]:
+        if (
+            len(context.line) - context.lineTagsLength
+            <= self.maxTitleLineLength
+        ):
+            return noProblems
+        return (
+            self.problem(
+                context.lineIndex,
+                context.title.ordinal,
+                " ".join((
+                    f"the line {lineNumberPlaceholder}",
+                    f"is longer than {self.maxTitleLineLength} characters.",
+                    "Longer lines are harder to read."
+                ))
+            ),
+        )
+
+
+class TimingInTextRule(ValidationRule):
+    name = "timing_in_text"
+
+    def checkText(
+        self,
+        context: ValidationContext
+    ) -> typing.Sequence[ValidationProblem]:
+        if (
+            "-->" not in context.line
+            or subrip.regexSrtTiming.fullmatch(context.line) is None
+        ):
+            return noProblems
+        return (
+            self.problem(
+                context.lineIndex,
+                context.title.ordinal,
+                " ".join((
+                    "there is a timing string",
+                    f"on the line {lineNumberPlaceholder}.",
+                    "Most likely there is a missing empty line",
+                    "on one of the previous lines."
+                ))
+            ),
+        )
+
+
+class HtmlTagsRule(ValidationRule):
+    name = "html_tags"
+
+    def checkTitle(
+        self,
+        context: ValidationContext
+    ) -> typing.Sequence[ValidationProblem]:
+        if not context.openHtmlTags and not context.closeHtmlTags:
+            return noProblems
+        title: subrip.SubRipTitle = context.title
+        titleName: str = (
+            "last title" if context.titleIndex == context.lastTitleIndex
+            else "this title"
+        )
+        problems: typing.List[ValidationProblem] = []
+        uot, uct = checkForUnmatchedHtmlTags(
+            context.openHtmlTags,
+            context.closeHtmlTags
+        )
+        if len(uot) > 0:
+            problems.append(
+                self.problem(
+                    title.nextLineIndex - 1,
+                    title.ordinal,
+                    " ".join((
+                        f"{titleName} has",
+                        f"unmatched open HTML tags: {', '.join(uot)}."
+                    ))
+                )
+            )
+        if len(uct) > 0:
+            problems.append(
+                self.problem(
+                    title.nextLineIndex - 1,
+                    title.ordinal,
+                    " ".join((
+                        f"{titleName} has",
+                        f"unmatched closing HTML tags: {', '.join(uct)}."
+                    ))
+                )
+            )
+        return problems
+
+
+# the user rules from the "custom_validation_rules" setting: regular
+# expressions for the text lines. The ones without groups and flags
+# are also merged into one alternation, which is searched first, so most
+# of the lines are searched only once. Only if it matches, the rules
+# are searched one by one to find all the matching ones. The rest can't
+# be merged without changing what they match (groups get renumbered,
+# and flags would apply to all the rules), so they are searched always
+class CustomRule(typing.NamedTuple):
+    regex: typing.Pattern
+    message: str
+    severity: str
+    # if it is a part of the merged alternation
+    isMerged: bool
+
+
+class CustomRegexRules(ValidationRule):
+    name = "custom"
+
+    def __init__(self, settings: ValidationSettings, severity: str) -> None:
+        super().__init__(settings, severity)
+        # in the order of the rules
+        self.rules: typing.List[CustomRule] = []
+        if not isinstance(settings.customRules, list):
+            raise TypeError("Custom validation rules need to be a list")
+        defaultFlags: int = re.compile("").flags
+        for ruleIndex, rule in enumerate(settings.customRules):
+            if not isinstance(rule, dict) or not rule.get("pattern"):
+                raise TypeError(
+                    f"Custom validation rule #{ruleIndex+1} has no pattern"
+                )
+            ruleName: str = rule.get("name", f"#{ruleIndex+1}")
+            ruleSeverity: str = checkSeverity(
+                rule.get("severity", severityWarning),
+                ruleName
+            )
+            if ruleSeverity == severityOff:
+                continue
+            try:
+                regex: typing.Pattern = re.compile(rule["pattern"])
+            except re.error as ex:
+                raise ValueError(
+                    f"Custom validation rule {ruleName} is wrong: {ex}"
+                )
+            self.rules.append(
+                CustomRule(
+                    regex,
+                    rule.get(
+                        "message",
+                        f"there is a match of the \"{ruleName}\" rule"
+                    ),
+                    ruleSeverity,
+                    regex.groups == 0 and regex.flags == defaultFlags
+                )
+            )
+        mergedPatterns: typing.List[str] = [
+            f"(?:{r.regex.pattern})" for r in self.rules if r.isMerged
+        ]
+        self.mergedRegex: typing.Optional[typing.Pattern] = (
+            re.compile("|".join(mergedPatterns)) if mergedPatterns
+            else None
+        )
+        self.hasSeparateRules: bool = any(
+            not r.isMerged for r in self.rules
+        )
+
+    def checkText(
+        self,
+        context: ValidationContext
+    ) -> typing.Sequence[ValidationProblem]:
+        line: str = context.line
+        mergedMatched: bool = (
+            self.mergedRegex is not None
+            and self.mergedRegex.search(line) is not None
+        )
+        if not mergedMatched and not self.hasSeparateRules:
+            return noProblems
+        return [
+            ValidationProblem(
+                context.lineIndex,
+                context.title.ordinal,
+                f"{rule.message} on the line {lineNumberPlaceholder}.",
+                rule.severity
+            )
+            for rule in self.rules
+            if (mergedMatched or not rule.isMerged)
+            and rule.regex.search(line) is not None
+        ]
+
+
+# in the order their problems are reported for the same line
+validationRules: typing.Final[
+    typing.List[typing.Type[ValidationRule]]
+] = [
+    EndOfFileRule,
+    EmptyLinesRule,
+    WhitespaceRule,
+    OrdinalsRule,
+    TimingFormatRule,
+    DurationRule,
+    OverlapRule,
+    LinesCountRule,
+    LineLengthRule,
+    TimingInTextRule,
+    HtmlTagsRule,
+    CustomRegexRules
+]
+
+
+def checkSeverity(severity: typing.Any, ruleName: str) -> str:
+    if severity not in (severityError, severityWarning, severityOff):
+        raise ValueError(
+            " ".join((
+                f"Severity of the {ruleName} validation rule should be",
+                f"{severityError}, {severityWarning} or {severityOff}"
+            ))
+        )
+    return severity
+
+
+# the rules for some settings, with regular expressions compiled
+# and the rules sorted by the parts of the document they check
+class CompiledRules:
+    def __init__(self, settings: ValidationSettings) -> None:
+        self.fingerprint: str = settingsFingerprint(settings)
+        self.htmlTagsRegexes: typing.Tuple[
+            typing.Pattern,
+            typing.Pattern
+        ] = compileHtmlTagsRegexes(settings.htmlTagsToWatchFor)
+        if not isinstance(settings.ruleSeverities, dict):
+            raise TypeError("Validation rules need to be a dictionary")
+        for ruleName in settings.ruleSeverities:
+            if ruleName not in {r.name for r in validationRules}:
+                raise ValueError(f"There is no {ruleName} validation rule")
+
+        self.rules: typing.List[ValidationRule] = []
+        for ruleClass in validationRules:
+            severity: str = checkSeverity(
+                settings.ruleSeverities.get(ruleClass.name, severityError),
+                ruleClass.name
+            )
+            if severity != severityOff:
+                self.rules.append(ruleClass(settings, severity))
+
+        def overriding(method: str) -> typing.List[typing.Callable[
+            [ValidationContext],
+            typing.Sequence[ValidationProblem]
+        ]]:
+            return [
+                getattr(r, method) for r in self.rules
+                if getattr(type(r), method) is not getattr(
+                    ValidationRule,
+                    method
+                )
+            ]
+
+        self.documentChecks = overriding("checkDocument")
+        self.emptyLineChecks = overriding("checkEmptyLine")
+        self.lineChecks = overriding("checkLine")
+        self.ordinalChecks = overriding("checkOrdinal")
+        self.timingChecks = overriding("checkTiming")
+        self.textChecks = overriding("checkText")
+        self.titleChecks = overriding("checkTitle")
+
+
+# compiled rules for the last few settings, so the regular expressions
+# are not compiled on every run, only when the settings change
+compiledRulesCache: typing.Dict[str, CompiledRules] = {}
+maxCompiledRules: typing.Final[int] = 4
+
+
+def settingsFingerprint(settings: ValidationSettings) -> str:
+    return repr(settings)
+
+
+# raises TypeError/ValueError/re.error if the settings are wrong
+def compileValidationRules(settings: ValidationSettings) -> CompiledRules:
+    fingerprint: str = settingsFingerprint(settings)
+    compiledRules: typing.Optional[CompiledRules] = compiledRulesCache.get(
+        fingerprint
+    )
+    if compiledRules is None:
+        compiledRules = CompiledRules(settings)
+        if len(compiledRulesCache) >= maxCompiledRules:
+            del compiledRulesCache[next(iter(compiledRulesCache))]
+        compiledRulesCache[fingerprint] = compiledRules
+    return compiledRules
+
+
+# problems of every title are remembered, so validation after an edit
+# checks only the changed titles and the ones next to them (the result
+# also depends on the previous title ordinal and end time). The problems
+# don't depend on where the title is, so adding or removing lines doesn't
+# make the titles after them checked again. It is shared by all the files,
+# and the least recently used titles are forgotten
+titlesProblemsCache: typing.OrderedDict[
+    typing.Tuple[typing.Any, ...],
+    typing.Tuple[ValidationProblem, ...]
+] = OrderedDict()
+maxCachedTitles: typing.Final[int] = 100000
+
+
+def cacheTitleProblems(
+    key: typing.Tuple[typing.Any, ...],
+    problems: typing.Tuple[ValidationProblem, ...]
+) -> None:
+    titlesProblemsCache[key] = problems
+    # background validation runs in another thread,
+    # so the cache might get shorter meanwhile
+    try:
+        while len(titlesProblemsCache) > maxCachedTitles:
+            titlesProblemsCache.popitem(last=False)
+    except KeyError:
+        pass
+
+
+def clearValidationCache() -> None:
+    titlesProblemsCache.clear()
+
+
+# checks all the lines of the title and the title itself. Rules can only
+# rely on the title and the previous title ordinal and end time here,
+# as the result is cached, and should have lineNumberPlaceholder
+# in the messages instead of the line numbers
+def validateTitle(
+    context: ValidationContext,
+    rules: CompiledRules,
+    isExcluded: bool
+) -> typing.Tuple[ValidationProblem, ...]:
+    regexHTMLtagOpen, regexHTMLtagClose = rules.htmlTagsRegexes
+    title: subrip.SubRipTitle = context.title
+    titleProblems: typing.List[ValidationProblem] = []
+    context.openHtmlTags = []
+    context.closeHtmlTags = []
+    for crntTitleStrNumber, line in enumerate(title.lines, start=1):
+        index: int = title.lineIndex + crntTitleStrNumber - 1
+        context.lineIndex = index
+        context.line = line
+        context.titleLineNumber = crntTitleStrNumber
+
+        for check in rules.lineChecks:
+            problems = check(context)
+            if problems:
+                titleProblems.extend(problems)
+
+        # --- ordinal line
+
+        if crntTitleStrNumber == 1:
+            for check in rules.ordinalChecks:
+                titleProblems.extend(check(context))
+            # if there is no ordinal, assume it is the next one,
+            # so the following titles don't fail because of this one
+            context.titleCount = (
+                title.ordinal if title.ordinal is not None
+                else context.titleCount + 1
+            )
+            continue
+
+        # --- checking for excluded titles
+
+        # validation checks after this point are ignorable (more or less),
+        # so they can be skipped, if translator/editor wants to exclude them
+        if isExcluded:
+            if crntTitleStrNumber == 2:  # don't repeat the warning
+                titleProblems.append(
+                    ValidationProblem(
+                        index,
+                        context.titleCount,
+                        " ".join((
+                            f"title #{context.titleCount}",
+                            "is in the ignore list, so it will not",
+                            "go through all the checks."
+                        )),
+                        severityWarning
+                    )
+                )
+            continue
+
+        # --- timing line
+
+        if crntTitleStrNumber == 2:
+            for check in rules.timingChecks:
+                problems = check(context)
+                if problems:
+                    titleProblems.extend(problems)
+            if title.timeStart is not None and title.timeEnd is not None:
+                context.previousTitleTimeEnd = title.timeEnd
+            continue
+
+        # --- title text lines
+
+        # possible HTML tags, they don't count in the line length
+        thisLineTagsLength: int = 0
+        if "<" in line:
+            for m in regexHTMLtagOpen.findall(line):
+                thisLineTagsLength += len(m[0])
+                context.openHtmlTags.append(f"<{m[1]}>")
+            for m in regexHTMLtagClose.findall(line):
+                thisLineTagsLength += len(m[0])
+                context.closeHtmlTags.append(f"<{m[1]}>")
+        context.lineTagsLength = thisLineTagsLength
+
+        for check in rules.textChecks:
+            problems = check(context)
+            if problems:
+                titleProblems.extend(problems)
+
+    # --- done iterating through the title lines
+
+    for check in rules.titleChecks:
+        problems = check(context)
+        if problems:
+            titleProblems.extend(problems)
+
+    # with the lines relative to the title, placeProblem() puts them back
+    return tuple(
+        p._replace(lineIndex=p.lineIndex - title.lineIndex)
+        if p.lineIndex is not None else p
+        for p in titleProblems
+    )
+
+
+# where validation of the previous titles has stopped, so a document
+# can be validated in parts, each starting where the previous one ended
+class TitlesState(typing.NamedTuple):
+    # the line right after the previous title
+    previousLineEnd: int = 0
+    titleCount: int = 0
+    previousTitleTimeEnd: int = 0
+
+
+# yields every problem in the order they appear in the content, so taking
+# just the first one is the same as stopping the validation on it.
+# All the rules are checked in a single pass over the document
+def validateDocument(
+    document: subrip.SubRipDocument,
+    settings: ValidationSettings,
+    excludedTitles: typing.Collection[str]
+) -> typing.Iterator[ValidationProblem]:
+    # there must be at least 3 lines: ordinal, timing and a line of text
+    if document.lineCount < 3:
+        yield ValidationProblem(
+            None,
+            None,
+            " ".join((
+                "there are no SubRip titles. At least",
+                "there should be an ordinal, timing and a line of text."
+            ))
+        )
+        return
+
+    yield from checkDocument(document, settings)
+    yield from validateTitles(
+        document,
+        settings,
+        excludedTitles,
+        TitlesState(),
+        True
+    )
+
+
+# the checks of the document as a whole, such as how it ends
+def checkDocument(
+    document: subrip.SubRipDocument,
+    settings: ValidationSettings
+) -> typing.Iterator[ValidationProblem]:
+    rules: CompiledRules = compileValidationRules(settings)
+    context: ValidationContext = ValidationContext(document)
+    for check in rules.documentChecks:
+        for problem in check(context):
+            yield placeProblem(problem)
+
+
+# the document might have only a part of the titles, then the state
+# is what the titles before them have left, and unless the part is
+# the last one, its last title is not reported as the last in the file
+def validateTitles(
+    document: subrip.SubRipDocument,
+    settings: ValidationSettings,
+    excludedTitles: typing.Collection[str],
+    state: TitlesState,
+    isLastPart: bool
+) -> typing.Iterator[ValidationProblem]:
+    rules: CompiledRules = compileValidationRules(settings)
+    context: ValidationContext = ValidationContext(document)
+    context.previousLineEnd = state.previousLineEnd
+    context.titleCount = state.titleCount
+    context.previousTitleTimeEnd = state.previousTitleTimeEnd
+    if not isLastPart:
+        context.lastTitleIndex = -1
+
+    emptyLineChecks = rules.emptyLineChecks
+
+    for titleIndex, title in enumerate(document.titles):
+        context.titleIndex = titleIndex
+        context.title = title
+
+        # --- empty lines before the title
+
+        if emptyLineChecks:
+            for index in range(context.previousLineEnd, title.lineIndex):
+                context.lineIndex = index
+                for check in emptyLineChecks:
+                    for problem in check(context):
+                        yield placeProblem(problem)
+        context.previousLineEnd = title.nextLineIndex
+
+        isExcluded: bool = (
+            bool(excludedTitles)
+            and titleIdentity(title) in excludedTitles
+        )
+        # the problems are cached with the lines relative to the title,
+        # so the title line is not a part of the key, but the last title
+        # has a problem on the line after the end of file
+        key: typing.Tuple[typing.Any, ...] = (
+            rules.fingerprint,
+            tuple(title.lines),
+            context.titleCount,
+            context.previousTitleTimeEnd,
+            isExcluded,
+            document.lineCount - title.lineIndex
+            if titleIndex == context.lastTitleIndex
+            else -1
+        )
+        titleProblems: typing.Optional[
+            typing.Tuple[ValidationProblem, ...]
+        ] = titlesProblemsCache.get(key)
+        if titleProblems is None:
+            titleProblems = validateTitle(context, rules, isExcluded)
+            cacheTitleProblems(key, titleProblems)
+        else:
+            # the same state as after checking the title
+            try:
+                titlesProblemsCache.move_to_end(key)
+            except KeyError:  # evicted by another thread meanwhile
+                pass
+            context.titleCount = (
+                title.ordinal if title.ordinal is not None
+                else context.titleCount + 1
+            )
+            if (
+                not isExcluded
+                and title.timeStart is not None
+                and title.timeEnd is not None
+            ):
+                context.previousTitleTimeEnd = title.timeEnd
+        for problem in titleProblems:
+            yield placeProblem(problem, title.lineIndex)
+
+
+# indexes of the lines where parts of the document start, for validating
+# them separately. Parts start right after a title, so every part has
+# whole titles, and there might be fewer parts if titles are too long
+def findPartsStarts(
+    lines: typing.List[str],
+    partsCount: int
+) -> typing.List[int]:
+    lastTextLine: int = len(lines) - 1
+    while lastTextLine >= 0 and subrip.isEmptyLine(lines[lastTextLine]):
+        lastTextLine -= 1
+    starts: typing.List[int] = [0]
+    for part in range(1, partsCount):
+        index: int = max(starts[-1] + 1, len(lines) * part // partsCount)
+        while index < lastTextLine and not (
+            subrip.isEmptyLine(lines[index])
+            and not subrip.isEmptyLine(lines[index - 1])
+        ):
+            index += 1
+        if index >= lastTextLine:
+            break
+        starts.append(index)
+    return starts
+
+
+# the state after the titles before the line (which should be right after
+# a title), found by going back only as far as the state depends on:
+# to the closest title with an ordinal and to the closest title that has
+# a correct timing and is not excluded
+def titlesStateAt(
+    lines: typing.List[str],
+    lineIndex: int,
+    excludedTitles: typing.Collection[str]
+) -> TitlesState:
+    titleCount: typing.Optional[int] = None
+    # titles without ordinals after the closest title with an ordinal
+    titlesWithoutOrdinals: int = 0
+    previousTitleTimeEnd: typing.Optional[int] = None
+    end: int = lineIndex
+    while titleCount is None or previousTitleTimeEnd is None:
+        while end > 0 and subrip.isEmptyLine(lines[end - 1]):
+            end -= 1
+        if end == 0:
+            break
+        begin: int = end - 1
+        while begin > 0 and not subrip.isEmptyLine(lines[begin - 1]):
+            begin -= 1
+        # the offset is of no use for validation
+        title: subrip.SubRipTitle = subrip.SubRipTitle(
+            begin,
+            0,
+            lines[begin:end]
+        )
+        if titleCount is None:
+            if title.ordinal is not None:
+                titleCount = title.ordinal + titlesWithoutOrdinals
+            else:
+                titlesWithoutOrdinals += 1
+        if (
+            previousTitleTimeEnd is None
+            and title.timeStart is not None
+            and title.timeEnd is not None
+            and not (
+                bool(excludedTitles)
+                and titleIdentity(title) in excludedTitles
+            )
+        ):
+            previousTitleTimeEnd = title.timeEnd
+        end = begin
+    return TitlesState(
+        lineIndex,
+        titleCount if titleCount is not None else titlesWithoutOrdinals,
+        previousTitleTimeEnd if previousTitleTimeEnd is not None else 0
+    )
@@ -1,9 +1,154 @@
 import sublime
 import sublime_plugin
 
+import os
+import pathlib
 import typing
 
 from . import _common as common
+from .core import dictionary as core
+from .core import translation
+
+
+# no need to offer completions for a single letter
+minCompletionPrefixLength: typing.Final[int] = 2
+# the completions list is for picking, not for browsing the dictionary
+maxCompletions: typing.Final[int] = 50
+
+
+class DictionaryCacheEntry(typing.NamedTuple):
+    # modification time and size of the project file
+    projectFileState: typing.Tuple[int, int]
+    # separate dictionary file, if the project has one, and its state
+    dictionaryFile: typing.Optional[pathlib.Path]
+    dictionaryFileState: typing.Optional[typing.Tuple[int, int]]
+    dictionary: core.DictionaryIndex
+
+
+# dictionary indexes per project file, rebuilt only when the project
+# file (or the separate dictionary file) changes, as getting project data
+# means converting all of it
+dictionariesCache: typing.Dict[str, DictionaryCacheEntry] = {}
+
+
+def getFileState(
+    filePath: typing.Union[str, pathlib.Path]
+) -> typing.Optional[typing.Tuple[int, int]]:
+    try:
+        fileStat: os.stat_result = os.stat(filePath)
+    except OSError:
+        return None
+    return (fileStat.st_mtime_ns, fileStat.st_size)
+
+
+def loadDictionaryEntries(
+    projectData: typing.Optional[dict],
+    dictionaryFile: typing.Optional[pathlib.Path]
+) -> typing.Dict[str, str]:
+    dictionary: typing.Dict[str, str] = dict(core.loadDictionary(projectData))
+    if dictionaryFile is not None:
+        try:
+            dictionary.update(core.readDictionaryFile(dictionaryFile))
+        except (OSError, UnicodeDecodeError, ValueError) as ex:
+            print(f"[ERROR] {dictionaryFile}: {ex}")
+    return dictionary
+
+
+def getDictionary(window: sublime.Window) -> core.DictionaryIndex:
+    projectFileName: typing.Optional[str] = window.project_file_name()
+    if not projectFileName:
+        return core.DictionaryIndex({})
+    projectFileState: typing.Optional[typing.Tuple[int, int]] = (
+        getFileState(projectFileName)
+    )
+    cached = dictionariesCache.get(projectFileName)
+    if (
+        cached is not None
+        and projectFileState is not None
+        and cached.projectFileState == projectFileState
+        and (
+            cached.dictionaryFile is None
+            or getFileState(cached.dictionaryFile)
+            == cached.dictionaryFileState
+        )
+    ):
+        return cached.dictionary
+
+    projectData: typing.Optional[dict] = window.project_data()
+    dictionaryFile: typing.Optional[pathlib.Path] = (
+        core.loadDictionaryFilePath(
+            projectData,
+            pathlib.Path(projectFileName)
+        )
+    )
+    # the state is taken before reading, so a change made in between
+    # makes the next lookup read the file again
+    dictionaryFileState: typing.Optional[typing.Tuple[int, int]] = (
+        getFileState(dictionaryFile) if dictionaryFile is not None else None
+    )
+    dictionary: core.DictionaryIndex = core.DictionaryIndex(
+        loadDictionaryEntries(projectData, dictionaryFile)
+    )
+    if projectFileState is not None:
+        dictionariesCache[projectFileName] = DictionaryCacheEntry(
+            projectFileState,
+            dictionaryFile,
+            dictionaryFileState,
+            dictionary
+        )
+    return dictionary
+
+
+def invalidateDictionary(window: sublime.Window) -> None:
+    projectFileName: typing.Optional[str] = window.project_file_name()
+    if projectFileName:
+        dictionariesCache.pop(projectFileName, None)
+
+
+# adds or updates entries either in the separate dictionary file
+# (by appending them) or in the project data
+def storeDictionaryEntries(
+    window: sublime.Window,
+    entries: typing.Dict[str, str]
+) -> bool:
+    projectData: typing.Optional[dict] = window.project_data()
+    if not projectData:
+        sublime.error_message(
+            " ".join((
+                "Couldn't get project data, check if you have",
+                "any content in your current Sublime Text project file."
+            ))
+        )
+        return False
+
+    dictionaryFile: typing.Optional[pathlib.Path] = (
+        core.loadDictionaryFilePath(
+            projectData,
+            pathlib.Path(window.project_file_name())
+        )
+    )
+    if dictionaryFile is not None:
+        try:
+            core.appendDictionaryEntries(dictionaryFile, entries.items())
+        except OSError as ex:
+            print(f"[ERROR] {ex}")
+            sublime.error_message(
+                f"Couldn't write to the dictionary file. {ex}"
+            )
+            return False
+    else:
+        # ensure that settings tree structure is in place
+        if not projectData.get("settings"):
+            projectData["settings"] = {}
+        if not projectData["settings"].get("marlant"):
+            projectData["settings"]["marlant"] = {}
+        if not projectData["settings"]["marlant"].get("dictionary"):
+            projectData["settings"]["marlant"]["dictionary"] = {}
+        projectData["settings"]["marlant"]["dictionary"].update(entries)
+        window.set_project_data(projectData)
+    # the project file might be written a bit later
+    invalidateDictionary(window)
+    return True
 
 
 class DictionaryEntryOriginalInputHandler(sublime_plugin.TextInputHandler):
@@ -108,30 +253,7 @@ class MarlantAddToDictionary(sublime_plugin.WindowCommand):
             )
             return
 
-        activeView = self.window.active_view()
-
-        # TODO: move this to a generalized common functions
-        # ensure that settings tree structure is in place
-        projectData = self.window.project_data()
-        if projectData:
-            if not projectData.get("settings"):
-                projectData["settings"] = {}
-            if not projectData["settings"].get("marlant"):
-                projectData["settings"]["marlant"] = {}
-            if not projectData["settings"]["marlant"].get("dictionary"):
-                projectData["settings"]["marlant"]["dictionary"] = {}
-        else:
-            sublime.error_message(
-                " ".join((
-                    "Couldn't get project data, check if you have",
-                    "any content in your current Sublime Text project file."
-                ))
-            )
-            return
-
-        if original in projectData["settings"]["marlant"][
-            "dictionary"
-        ]:
+        if getDictionary(self.window).lookup(original) is not None:
             userAnswer: bool = sublime.ok_cancel_dialog(
                 " ".join((
                     "The project dictionary already has this entry.",
@@ -142,10 +264,7 @@ class MarlantAddToDictionary(sublime_plugin.WindowCommand):
             if not userAnswer:
                 return
 
-        projectData["settings"]["marlant"]["dictionary"][
-            original
-        ] = translation
-        self.window.set_project_data(projectData)
+        storeDictionaryEntries(self.window, {original: translation})
 
     def input(self, args: dict) -> sublime_plugin.TextInputHandler:
         if "original" not in args:
@@ -184,18 +303,23 @@ class DictionaryEntryInputHandler(sublime_plugin.ListInputHandler):
         else:
             return ""
 
-    def list_items(self) -> typing.ItemsView[str, str]:
-        dictionary: typing.Dict[str, str] = {}
-        projectSettings: sublime.Value = None
-        if self.view.window().project_file_name():
-            projectSettings = self.view.window().project_data().get("settings")
-        if projectSettings:
-            dictionary = projectSettings.get(
-                "marlant", {}
-            ).get(
-                "dictionary", {}
+    def list_items(
+        self
+    ) -> typing.Tuple[typing.List[typing.Tuple[str, str]], int]:
+        dictionary: core.DictionaryIndex = getDictionary(self.view.window())
+        # the entry most similar to the selected text is preselected
+        selectedIndex: int = 0
+        selectedText: str = self.initial_text().strip()
+        if selectedText:
+            fuzzyMatches: typing.List[typing.Tuple[str, str]] = (
+                dictionary.findFuzzy(selectedText, 1)
             )
-        return dictionary.items()
+            if fuzzyMatches:
+                selectedIndex = typing.cast(
+                    int,
+                    dictionary.position(fuzzyMatches[0][0])
+                )
+        return (dictionary.items, selectedIndex)
 
     def preview(self, text: str) -> str:
         if not text:
@@ -236,3 +360,244 @@ class MarlantFindInDictionary(sublime_plugin.TextCommand):
 
     def is_visible(self) -> bool:
         return self.view.window().active_view().match_selector(0, "text.srt")
+
+
+# bulk import of a CSV/TSV glossary (original, translation) into
+# the project dictionary, as one write
+class MarlantImportDictionary(sublime_plugin.WindowCommand):
+    def run(self, path: typing.Optional[str] = None) -> None:
+        projectFileName: typing.Optional[str] = (
+            self.window.project_file_name()
+        )
+        if not projectFileName:
+            sublime.error_message(
+                " ".join((
+                    "You need to have a Sublime Text project file",
+                    "for this functionality to work."
+                ))
+            )
+            return
+
+        if not path:
+            sublime.open_dialog(
+                lambda f: sublime.set_timeout(
+                    lambda: self.importGlossary(f) if f else None
+                ),
+                [("CSV / TSV glossaries", ["csv", "tsv"])],
+                os.path.dirname(projectFileName),
+                False,
+                False
+            )
+            return
+        self.importGlossary(path)
+
+    def importGlossary(self, path: str) -> None:
+        try:
+            glossary: typing.Dict[str, str] = core.readGlossary(
+                pathlib.Path(path)
+            )
+        except (OSError, UnicodeDecodeError, ValueError) as ex:
+            print(f"[ERROR] {ex}")
+            sublime.error_message(f"Couldn't read the glossary. {ex}")
+            return
+
+        dictionary: core.DictionaryIndex = getDictionary(self.window)
+        changedEntries: typing.Dict[str, str] = {
+            original: translation
+            for original, translation in glossary.items()
+            if dictionary.lookup(original) != translation
+        }
+        if not changedEntries:
+            self.window.status_message(
+                "The project dictionary already has all the glossary entries"
+            )
+            return
+        updatedEntries: int = sum(
+            1 for original in changedEntries
+            if dictionary.lookup(original) is not None
+        )
+        if updatedEntries:
+            userAnswer: bool = sublime.ok_cancel_dialog(
+                " ".join((
+                    f"{updatedEntries} of the glossary entries are",
+                    "already in the project dictionary with different",
+                    "translations. Do you want to update them?"
+                )),
+                "Yes"
+            )
+            if not userAnswer:
+                return
+
+        if storeDictionaryEntries(self.window, changedEntries):
+            self.window.status_message(
+                " ".join((
+                    f"Imported {len(changedEntries)} entries",
+                    "to the project dictionary"
+                ))
+            )
+
+
+class MarlantExportDictionary(sublime_plugin.WindowCommand):
+    def run(self, path: typing.Optional[str] = None) -> None:
+        projectFileName: typing.Optional[str] = (
+            self.window.project_file_name()
+        )
+        if not projectFileName:
+            sublime.error_message(
+                " ".join((
+                    "You need to have a Sublime Text project file",
+                    "for this functionality to work."
+                ))
+            )
+            return
+        if not len(getDictionary(self.window)):
+            sublime.error_message("The project dictionary is empty.")
+            return
+
+        if not path:
+            sublime.save_dialog(
+                lambda f: sublime.set_timeout(
+                    lambda: self.exportGlossary(f) if f else None
+                ),
+                [("CSV glossary", ["csv"]), ("TSV glossary", ["tsv"])],
+                os.path.dirname(projectFileName),
+                "dictionary",
+                "csv"
+            )
+            return
+        self.exportGlossary(path)
+
+    def exportGlossary(self, path: str) -> None:
+        dictionary: core.DictionaryIndex = getDictionary(self.window)
+        try:
+            core.writeGlossary(pathlib.Path(path), dictionary.items)
+        except OSError as ex:
+            print(f"[ERROR] {ex}")
+            sublime.error_message(f"Couldn't write the glossary. {ex}")
+            return
+        self.window.status_message(
+            f"Exported {len(dictionary)} entries from the project dictionary"
+        )
+
+
+# translated titles that don't use the dictionary translations
+# of the terms from the original titles
+class MarlantCheckDictionaryConsistency(sublime_plugin.TextCommand):
+    def run(self, edit: sublime.Edit) -> None:
+        window: sublime.Window = self.view.window()
+        if not window.project_file_name():
+            sublime.error_message(
+                " ".join((
+                    "You need to have a Sublime Text project file",
+                    "for this functionality to work."
+                ))
+            )
+            return
+        dictionary: core.DictionaryIndex = getDictionary(window)
+        if not len(dictionary):
+            sublime.error_message("The project dictionary is empty.")
+            return
+
+        original = common.getOriginalDocument(self.view)
+        if original is None:
+            return
+        originalFile, originalDocument = original
+        document: common.SubRipDocument = common.getDocument(self.view)
+        try:
+            document.checkStructure(True)
+        except common.SubRipFormatError as ex:
+            sublime.error_message(str(ex))
+            common.scrollToProblematicLineNumber(self.view, ex.lineIndex)
+            return
+
+        missingTranslations: typing.List[core.MissingTranslation] = (
+            core.findMissingTranslations(
+                originalDocument,
+                document,
+                dictionary,
+                translation.loadTitlePlaceholder(common.marlantSettings)
+            )
+        )
+        if not missingTranslations:
+            window.status_message(
+                " ".join((
+                    "The translation is consistent with the dictionary",
+                    f"and {originalFile.name}"
+                ))
+            )
+            return
+
+        def goToTitle(index: int) -> None:
+            if index < 0:
+                return
+            common.scrollToProblematicLineNumber(
+                self.view,
+                missingTranslations[index].lineIndex
+            )
+
+        window.show_quick_panel(
+            [
+                sublime.QuickPanelItem(
+                    f"{m.original} → {m.translation}",
+                    annotation=f"line {m.lineIndex+1}",
+                    details=f"title #{m.titleOrdinal}",
+                    kind=(sublime.KIND_ID_COLOR_YELLOWISH, "D", "Dictionary")
+                )
+                for m in missingTranslations
+            ],
+            goToTitle,
+            sublime.KEEP_OPEN_ON_FOCUS_LOST,
+            0,
+            goToTitle,
+            " ".join((
+                f"{len(missingTranslations)} dictionary translations",
+                "are missing"
+            ))
+        )
+
+    def is_enabled(self) -> bool:
+        return self.view.match_selector(0, "text.srt")
+
+    def is_visible(self) -> bool:
+        return self.view.match_selector(0, "text.srt")
+
+
+# translations from the project dictionary in auto-completion,
+# for the word before the cursor (in the original or in the translation)
+class DictionaryCompletionsListener(sublime_plugin.ViewEventListener):
+    @classmethod
+    def is_applicable(cls, settings: sublime.Settings) -> bool:
+        return settings.get("syntax", "").endswith("subrip.sublime-syntax")
+
+    def on_query_completions(
+        self,
+        prefix: str,
+        locations: typing.List[int]
+    ) -> typing.Optional[typing.List[sublime.CompletionItem]]:
+        if len(prefix) < minCompletionPrefixLength or not (
+            common.marlantSettings.get(
+                "dictionary_completions",
+                common.dictionaryCompletionsFallback
+            )
+        ):
+            return None
+        window: typing.Optional[sublime.Window] = self.view.window()
+        if window is None or not window.project_file_name():
+            return None
+        if not self.view.match_selector(locations[0], "text.srt"):
+            return None
+
+        return [
+            sublime.CompletionItem(
+                # matched against what is typed, so both are there
+                f"{original} → {translation}",
+                annotation="dictionary",
+                completion=translation,
+                completion_format=sublime.COMPLETION_FORMAT_TEXT,
+                kind=(sublime.KIND_ID_VARIABLE, "d", "Dictionary")
+            )
+            for original, translation in getDictionary(window).findByPrefix(
+                prefix,
+                maxCompletions
+            )
+        ]
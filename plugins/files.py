@@ -5,6 +5,27 @@ import pathlib
 import typing
 
 from . import _common as common
+from .core import translation
+
+translationProgressStatusKey: typing.Final[str] = (
+    "marlant_translation_progress"
+)
+# milliseconds | after the last edit, so typing doesn't trigger recounting
+translationProgressDelay: typing.Final[int] = 300
+
+
+class TranslationProgressCacheEntry(typing.NamedTuple):
+    changeCount: int
+    titlePlaceholder: str
+    progress: translation.TranslationProgress
+
+
+# milliseconds | how often to check if a translation/original view scrolled,
+# as there is no event for that
+syncScrollingInterval: typing.Final[int] = 100
+# the last counted progress per buffer ID, so switching
+# between tabs doesn't need to look at the documents at all
+translationProgressCache: typing.Dict[int, TranslationProgressCacheEntry] = {}
 
 
 # might be an overkill, it is enough to just check for text.srt selector/scope
@@ -95,28 +116,44 @@ class LanguageInputHandler(sublime_plugin.TextInputHandler):
         return "language"
 
     def placeholder(self) -> str:
-        return "lang"
+        return "lang, lang, ..."
 
     def initial_text(self) -> str:
         return "ru"
 
     def validate(self, text: str) -> bool:
-        if common.regexLanguageCode.fullmatch(text) is None:
-            return False
-        else:
-            return True
+        languages: typing.List[str] = translation.parseLanguages(text)
+        return bool(languages) and all(
+            common.regexLanguageCode.fullmatch(lang) is not None
+            for lang in languages
+        )
 
     def preview(self, text: str) -> str:
-        if text.strip():
-            return sublime.Html(f"some-file-<b>{text}</b>.srt")
+        languages: typing.List[str] = translation.parseLanguages(text)
+        if languages:
+            return sublime.Html(
+                ", ".join(
+                    f"some-file-<b>{lang}</b>.srt" for lang in languages
+                )
+            )
         else:
             return sublime.Html(
-                "<i>You need to provide a language suffix</i>"
+                "<i>You need to provide a language suffix (or several)</i>"
             )
 
 
+# the "language" argument can be a single suffix, several of them
+# separated with commas/spaces (as typed in the input) or a list
+def getLanguages(
+    language: typing.Union[str, typing.List[str]]
+) -> typing.List[str]:
+    if isinstance(language, str):
+        return translation.parseLanguages(language)
+    return list(dict.fromkeys(lang.strip() for lang in language))
+
+
 class MarlantCreateTranslationFileCommand(sublime_plugin.WindowCommand):
-    def run(self, language: str) -> None:
+    def run(self, language: typing.Union[str, typing.List[str]]) -> None:
         activeView = self.window.active_view()
         originalFileValue: str = activeView.file_name()
         if not originalFileValue:
@@ -129,134 +166,58 @@ class MarlantCreateTranslationFileCommand(sublime_plugin.WindowCommand):
             sublime.error_message("This is not an .srt file.")
             return
 
-        titlePlaceholder = common.marlantSettings.get(
-            "title_placeholder",
-            common.titlePlaceholderFallback
-        )
-
-        placeholdersInsteadOfEmptyLines: bool = common.marlantSettings.get(
-            "placeholders_instead_of_empty_lines",
-            common.placeholdersInsteadOfEmptyLinesFallback
-        )
-        whatToReplaceTitlesWith: str = (
-            titlePlaceholder if placeholdersInsteadOfEmptyLines
-            else ""
+        whatToReplaceTitlesWith: str = translation.loadTitlePlaceholder(
+            common.marlantSettings
         )
 
         # there should be no need to check for empty string,
         # because TextInputHandler.validate() takes care of this
-        language = language.strip()
-
-        generatedFile: pathlib.Path = pathlib.Path(
-            originalFile.parents[0],
-            f"{originalFile.stem}-{language}{originalFile.suffix}"
-        )
-
-        if generatedFile.is_file():
+        generatedFiles: typing.List[pathlib.Path] = [
+            translation.translationFilePath(originalFile, lang)
+            for lang in getLanguages(language)
+        ]
+
+        existingFiles: typing.List[str] = [
+            str(f) for f in generatedFiles if f.is_file()
+        ]
+        if existingFiles:
             userAnswer: bool = sublime.ok_cancel_dialog(
                 " ".join((
-                    f"The file {generatedFile} already exists.",
+                    f"The file {existingFiles[0]} already exists.",
                     "Do you want to overwrite it?"
+                )) if len(existingFiles) == 1
+                else " ".join((
+                    "These files already exist:",
+                    f"{', '.join(existingFiles)}.",
+                    "Do you want to overwrite them?"
                 )),
                 "Yes"
             )
             if not userAnswer:
                 return
 
+        document: common.SubRipDocument = common.getDocument(activeView)
         try:
-            with open(
-                generatedFile,
-                "w",
-                encoding="utf-8"
-            ) as gf:
-                hadEmptyLine: bool = False
-                crntTitleStrNumber: int = 0
-                crntTitleCnt: int = 0
-                bufferLinesRegions: typing.List[sublime.Region] = (
-                    activeView.split_by_newlines(
-                        sublime.Region(0, activeView.size())
-                    )
-                )
-                for index, region in enumerate(bufferLinesRegions):
-                    line = activeView.substr(region).strip()
-
-                    if not line:
-                        if hadEmptyLine or index == 0:
-                            sublime.error_message(
-                                " ".join((
-                                    f"{common.wrongFormatError} the line {index+1}",
-                                    "should not be empty."
-                                ))
-                            )
-                            common.scrollToProblematicLineNumber(activeView, index)
-                            return
-                        else:
-                            crntTitleStrNumber = 0
-                            hadEmptyLine = True
-                            gf.write("\n")
-                            continue
-
-                    hadEmptyLine = False
-                    crntTitleStrNumber += 1
-
-                    if crntTitleStrNumber == 1:
-                        if common.regexSrtNumber.fullmatch(line) is not None:
-                            crntTitleCntCandidate = int(line)
-                            if crntTitleCntCandidate - crntTitleCnt != 1:
-                                sublime.error_message(
-                                    " ".join((
-                                        f"{common.wrongFormatError} the title number",
-                                        f"on the line {index+1}",
-                                        f"({crntTitleCntCandidate}) is not",
-                                        "a +1 increment of the previous",
-                                        f"title number ({crntTitleCnt})."
-                                    ))
-                                )
-                                common.scrollToProblematicLineNumber(activeView, index)
-                                return
-                            else:
-                                crntTitleCnt = crntTitleCntCandidate
-                                gf.write(f"{line}\n")
-                                continue
-                        else:
-                            sublime.error_message(
-                                " ".join((
-                                    f"{common.wrongFormatError} the line {index+1}",
-                                    "should contain a title number."
-                                ))
-                            )
-                            common.scrollToProblematicLineNumber(activeView, index)
-                            return
-
-                    if crntTitleStrNumber == 2:
-                        if common.regexSrtTiming.fullmatch(line) is not None:
-                            gf.write(f"{line}\n")
-                            continue
-                        else:
-                            sublime.error_message(
-                                " ".join((
-                                    f"{common.wrongFormatError} there",
-                                    "should be a correct timing string",
-                                    f"on the line {index+1}."
-                                ))
-                            )
-                            common.scrollToProblematicLineNumber(activeView, index)
-                            return
-
-                    # replace actual titles
-                    gf.write(f"{whatToReplaceTitlesWith}\n")
-
-        # except UnicodeDecodeError as ex:
-        #     sublime.error_message(
-        #         " ".join((
-        #             "It looks like the original SRT file is not",
-        #             "in UTF-8 encoding. Try to re-open it",
-        #             "with the right encoding and then save it with UTF-8."
-        #         ))
-        #     )
-        #     return
-        except Exception as ex:
-            print(f"[ERROR] {ex}")
+            document.checkStructure(True)
+        except common.SubRipFormatError as ex:
+            sublime.error_message(str(ex))
+            common.scrollToProblematicLineNumber(activeView, ex.lineIndex)
+            return
+
+        # the original is parsed once for all the languages
+        # and the files are written concurrently
+        failedFiles: typing.Dict[pathlib.Path, OSError] = (
+            translation.writeTranslationFiles(
+                translation.makeTranslationSkeleton(
+                    document,
+                    whatToReplaceTitlesWith
+                ),
+                generatedFiles
+            )
+        )
+        if failedFiles:
+            for failedFile, error in failedFiles.items():
+                print(f"[ERROR] {failedFile}: {error}")
             sublime.error_message(
                 " ".join((
                     "There was an error writing to the generated file.",
@@ -265,11 +226,23 @@ class MarlantCreateTranslationFileCommand(sublime_plugin.WindowCommand):
             )
             return
 
-        openTranslationFile(
-            self.window,
-            originalFile,
-            # [],
-            str(generatedFile)
+        if len(generatedFiles) == 1:
+            openTranslationFile(
+                self.window,
+                originalFile,
+                # [],
+                str(generatedFiles[0])
+            )
+            return
+        # which one of them to work on now, if any
+        self.window.show_quick_panel(
+            [f.name for f in generatedFiles],
+            lambda index: openTranslationFile(
+                self.window,
+                originalFile,
+                str(generatedFiles[index])
+            ) if index >= 0 else None,
+            placeholder="Open a translation file"
         )
 
     def input(self, args: dict) -> sublime_plugin.TextInputHandler:
@@ -277,7 +250,7 @@ class MarlantCreateTranslationFileCommand(sublime_plugin.WindowCommand):
             return LanguageInputHandler()
 
     def input_description(self) -> str:
-        return "Language suffix"
+        return "Language suffixes"
 
     def is_enabled(self) -> bool:
         # return isItAnSRTfile(self.window.active_view().file_name())
@@ -288,6 +261,191 @@ class MarlantCreateTranslationFileCommand(sublime_plugin.WindowCommand):
         return self.window.active_view().match_selector(0, "text.srt")
 
 
+# translation files for many originals at once (a whole season),
+# generated straight from the files on disk without opening them
+class MarlantCreateTranslationFilesCommand(sublime_plugin.WindowCommand):
+    def run(
+        self,
+        language: typing.Union[str, typing.List[str]],
+        paths: typing.Optional[typing.List[str]] = None
+    ) -> None:
+        languages: typing.List[str] = getLanguages(language)
+        if not paths:
+            sublime.open_dialog(
+                lambda f: sublime.set_timeout(
+                    lambda: self.createFiles(languages, f) if f else None
+                ),
+                [("SubRip / SRT subtitles", ["srt"])],
+                None,
+                True,
+                False
+            )
+            return
+        self.createFiles(languages, paths)
+
+    def createFiles(
+        self,
+        languages: typing.List[str],
+        paths: typing.List[str]
+    ) -> None:
+        originalFiles: typing.List[pathlib.Path] = (
+            translation.findOriginalFiles(paths)
+        )
+        if not originalFiles:
+            sublime.error_message("There are no .srt files to translate.")
+            return
+        generatedFiles: typing.List[typing.List[pathlib.Path]] = [
+            [translation.translationFilePath(f, lang) for lang in languages]
+            for f in originalFiles
+        ]
+        existingFiles: int = sum(
+            1 for files in generatedFiles for f in files if f.is_file()
+        )
+        if existingFiles:
+            userAnswer: bool = sublime.ok_cancel_dialog(
+                " ".join((
+                    f"{existingFiles} of",
+                    f"{len(originalFiles) * len(languages)} translation",
+                    "files already exist.",
+                    "Do you want to overwrite them?"
+                )),
+                "Yes"
+            )
+            if not userAnswer:
+                return
+
+        titlePlaceholder: str = translation.loadTitlePlaceholder(
+            common.marlantSettings
+        )
+        sublime.set_timeout_async(
+            lambda: self.writeFiles(
+                originalFiles,
+                generatedFiles,
+                titlePlaceholder
+            )
+        )
+
+    def writeFiles(
+        self,
+        originalFiles: typing.List[pathlib.Path],
+        generatedFiles: typing.List[typing.List[pathlib.Path]],
+        titlePlaceholder: str
+    ) -> None:
+        failedFiles: int = 0
+        for index, originalFile in enumerate(originalFiles):
+            self.window.status_message(
+                " ".join((
+                    "Creating translation files:",
+                    f"{index+1} of {len(originalFiles)}..."
+                ))
+            )
+            try:
+                # all the languages in one pass over the original
+                translation.writeTranslationSkeletons(
+                    originalFile,
+                    generatedFiles[index],
+                    titlePlaceholder
+                )
+            except (
+                OSError,
+                UnicodeDecodeError,
+                common.SubRipFormatError
+            ) as ex:
+                print(f"[ERROR] {originalFile}: {ex}")
+                failedFiles += 1
+        if failedFiles:
+            sublime.error_message(
+                " ".join((
+                    f"Couldn't create translation files for {failedFiles}",
+                    f"of {len(originalFiles)} files.",
+                    "Check console for details."
+                ))
+            )
+        else:
+            self.window.status_message(
+                " ".join((
+                    f"Created translation files for {len(originalFiles)}",
+                    "files"
+                ))
+            )
+
+    def input(self, args: dict) -> sublime_plugin.TextInputHandler:
+        if "language" not in args:
+            return LanguageInputHandler()
+
+    def input_description(self) -> str:
+        return "Language suffixes"
+
+
+# brings the translation file up to date with the original after titles
+# were inserted/split/joined in it, keeping what is already translated
+class MarlantSyncTranslationFileCommand(sublime_plugin.TextCommand):
+    def run(self, edit: sublime.Edit) -> None:
+        original = common.getOriginalDocument(self.view)
+        if original is None:
+            return
+        originalFile, originalDocument = original
+
+        document: common.SubRipDocument = common.getDocument(self.view)
+        try:
+            document.checkStructure(True)
+        except common.SubRipFormatError as ex:
+            sublime.error_message(str(ex))
+            common.scrollToProblematicLineNumber(self.view, ex.lineIndex)
+            return
+
+        syncResult: translation.TranslationSyncResult = (
+            translation.syncTranslation(
+                originalDocument,
+                document,
+                translation.loadTitlePlaceholder(common.marlantSettings)
+            )
+        )
+        region: sublime.Region = sublime.Region(0, self.view.size())
+        if syncResult.content == self.view.substr(region):
+            self.view.window().status_message(
+                f"The translation is in sync with {originalFile.name}"
+            )
+            return
+        if syncResult.droppedTranslatedTitles:
+            userAnswer: bool = sublime.ok_cancel_dialog(
+                " ".join((
+                    f"{syncResult.droppedTranslatedTitles} translated",
+                    "titles don't match any title of the original",
+                    "by timing anymore and will be removed.",
+                    "Do you want to continue?"
+                )),
+                "Yes"
+            )
+            if not userAnswer:
+                return
+
+        # the whole content changes, so the cursor is kept
+        # on the same line rather than at the same offset
+        caretRow: int = self.view.rowcol(self.view.sel()[0].begin())[0]
+        viewportPosition: typing.Tuple[float, float] = (
+            self.view.viewport_position()
+        )
+        self.view.replace(edit, region, syncResult.content)
+        self.view.sel().clear()
+        self.view.sel().add(sublime.Region(self.view.text_point(caretRow, 0)))
+        self.view.set_viewport_position(viewportPosition, False)
+        self.view.window().status_message(
+            " ".join((
+                f"Synced with {originalFile.name}:",
+                f"{syncResult.matchedTitles} titles kept,",
+                f"{syncResult.newTitles} new,",
+                f"{syncResult.droppedTitles} removed"
+            ))
+        )
+
+    def is_enabled(self) -> bool:
+        return self.view.match_selector(0, "text.srt")
+
+    def is_visible(self) -> bool:
+        return self.view.match_selector(0, "text.srt")
+
+
 class MarlantOpenTranslationFileCommand(sublime_plugin.WindowCommand):
     def run(self) -> None:
         originalFileValue: str = self.window.active_view().file_name()
@@ -325,3 +483,252 @@ class MarlantOpenTranslationFileCommand(sublime_plugin.WindowCommand):
 
     def is_visible(self) -> bool:
         return self.window.active_view().match_selector(0, "text.srt")
+
+
+# translated/total titles of a translation file in the status bar
+class TranslationProgressListener(sublime_plugin.ViewEventListener):
+    @classmethod
+    def is_applicable(cls, settings: sublime.Settings) -> bool:
+        return settings.get("syntax", "").endswith("subrip.sublime-syntax")
+
+    def __init__(self, view: sublime.View) -> None:
+        super().__init__(view)
+        # checked once, as it needs to look at the disk
+        self.isTranslationFile: typing.Optional[bool] = None
+
+    def on_load(self) -> None:
+        self.showProgress()
+
+    def on_activated(self) -> None:
+        self.showProgress()
+
+    def on_post_save(self) -> None:
+        # the file might have been saved under a different name
+        self.isTranslationFile = None
+        self.showProgress()
+
+    def on_modified(self) -> None:
+        changeCount: int = self.view.change_count()
+        sublime.set_timeout(
+            lambda: self.showProgress(changeCount),
+            translationProgressDelay
+        )
+
+    def on_close(self) -> None:
+        translationProgressCache.pop(self.view.buffer_id(), None)
+
+    def checkTranslationFile(self) -> bool:
+        if self.isTranslationFile is None:
+            fileName: typing.Optional[str] = self.view.file_name()
+            originalFile: typing.Optional[pathlib.Path] = (
+                translation.originalFilePath(pathlib.Path(fileName))
+                if fileName else None
+            )
+            self.isTranslationFile = (
+                originalFile is not None and originalFile.is_file()
+            )
+        return self.isTranslationFile
+
+    def showProgress(self, changeCount: typing.Optional[int] = None) -> None:
+        if not self.view.is_valid():
+            return
+        # there were more edits since this was scheduled
+        if (
+            changeCount is not None
+            and changeCount != self.view.change_count()
+        ):
+            return
+        if (
+            not self.checkTranslationFile()
+            or not self.view.match_selector(0, "text.srt")
+        ):
+            self.view.erase_status(translationProgressStatusKey)
+            return
+
+        titlePlaceholder: str = translation.loadTitlePlaceholder(
+            common.marlantSettings
+        )
+        bufferID: int = self.view.buffer_id()
+        cached = translationProgressCache.get(bufferID)
+        if (
+            cached is None
+            or cached.changeCount != self.view.change_count()
+            or cached.titlePlaceholder != titlePlaceholder
+        ):
+            cached = TranslationProgressCacheEntry(
+                self.view.change_count(),
+                titlePlaceholder,
+                translation.getTranslationProgress(
+                    common.getDocument(self.view),
+                    titlePlaceholder
+                )
+            )
+            translationProgressCache[bufferID] = cached
+
+        progress: translation.TranslationProgress = cached.progress
+        percentage: int = (
+            progress.translatedTitles * 100 // progress.titles
+            if progress.titles else 0
+        )
+        self.view.set_status(
+            translationProgressStatusKey,
+            " ".join((
+                "Translated:",
+                f"{progress.translatedTitles}/{progress.titles}",
+                f"({percentage}%)"
+            ))
+        )
+
+
+# the original for a translation view and the translation for an
+# original view, if it is visible next to it (in another group
+# or as one of the selected sheets, see openTranslationFile())
+def getPairedView(view: sublime.View) -> typing.Optional[sublime.View]:
+    window: typing.Optional[sublime.Window] = view.window()
+    fileName: typing.Optional[str] = view.file_name()
+    if window is None or not fileName:
+        return None
+    filePath: pathlib.Path = pathlib.Path(fileName)
+    originalFile: typing.Optional[pathlib.Path] = (
+        translation.originalFilePath(filePath)
+    )
+    visibleViews: typing.List[typing.Optional[sublime.View]] = [
+        s.view() for s in window.selected_sheets()
+    ] + [
+        window.active_view_in_group(g) for g in range(window.num_groups())
+    ]
+    for otherView in visibleViews:
+        if otherView is None or otherView == view:
+            continue
+        otherFileName: typing.Optional[str] = otherView.file_name()
+        if not otherFileName:
+            continue
+        otherFilePath: pathlib.Path = pathlib.Path(otherFileName)
+        if (
+            otherFilePath == originalFile
+            or translation.originalFilePath(otherFilePath) == filePath
+        ):
+            return otherView
+    return None
+
+
+# moving the cursor or scrolling in the original or translation view
+# brings the other one to the same title, found by its ordinal
+class SyncTranslationViewsListener(sublime_plugin.ViewEventListener):
+    @classmethod
+    def is_applicable(cls, settings: sublime.Settings) -> bool:
+        return settings.get("syntax", "").endswith("subrip.sublime-syntax")
+
+    def __init__(self, view: sublime.View) -> None:
+        super().__init__(view)
+        self.isFollowingScrolling: bool = False
+        self.lastViewportPosition: typing.Tuple[float, float] = (0, 0)
+
+    def on_activated(self) -> None:
+        if not self.isFollowingScrolling:
+            self.isFollowingScrolling = True
+            self.lastViewportPosition = self.view.viewport_position()
+            self.followScrolling()
+
+    def on_selection_modified(self) -> None:
+        if not self.isActive():
+            return
+        pairedView: typing.Optional[sublime.View] = getPairedView(self.view)
+        if pairedView is None:
+            return
+        document: common.SubRipDocument = common.getDocument(self.view)
+        caret: int = self.view.sel()[0].b
+        titleIndex: typing.Optional[int] = document.titleIndexAt(caret)
+        if titleIndex is None:
+            return
+        pairedTitle: typing.Optional[common.SubRipTitle] = self.alignTitle(
+            pairedView,
+            document.titles[titleIndex]
+        )
+        if pairedTitle is None:
+            return
+        # the same line of the title, if the other one has as many
+        lineIndex: int = min(
+            self.view.rowcol(caret)[0] - document.titles[titleIndex].lineIndex,
+            len(pairedTitle.lines) - 1
+        )
+        pairedView.sel().clear()
+        pairedView.sel().add(
+            sublime.Region(pairedTitle.lineRegion(lineIndex)[0])
+        )
+
+    def isActive(self) -> bool:
+        window: typing.Optional[sublime.Window] = self.view.window()
+        return (
+            window is not None
+            and window.active_view() == self.view
+            and common.marlantSettings.get(
+                "sync_translation_views",
+                common.syncTranslationViewsFallback
+            )
+        )
+
+    def followScrolling(self) -> None:
+        if not self.view.is_valid() or not self.isActive():
+            self.isFollowingScrolling = False
+            return
+        viewportPosition: typing.Tuple[float, float] = (
+            self.view.viewport_position()
+        )
+        if viewportPosition != self.lastViewportPosition:
+            self.lastViewportPosition = viewportPosition
+            pairedView: typing.Optional[sublime.View] = getPairedView(
+                self.view
+            )
+            if pairedView is not None:
+                document: common.SubRipDocument = common.getDocument(
+                    self.view
+                )
+                visibleRegion: sublime.Region = self.view.visible_region()
+                visibleTitles: range = document.titlesIndexesIn(
+                    visibleRegion.begin(),
+                    visibleRegion.end()
+                )
+                if visibleTitles:
+                    self.alignTitle(
+                        pairedView,
+                        document.titles[visibleTitles[0]]
+                    )
+        sublime.set_timeout(self.followScrolling, syncScrollingInterval)
+
+    # scrolls the paired view so the title with the same ordinal is at the
+    # same height as the given title in this view, returns that title
+    def alignTitle(
+        self,
+        pairedView: sublime.View,
+        title: common.SubRipTitle
+    ) -> typing.Optional[common.SubRipTitle]:
+        if title.ordinal is None:
+            return None
+        pairedDocument: common.SubRipDocument = common.getDocument(
+            pairedView
+        )
+        pairedTitleIndex: typing.Optional[int] = (
+            pairedDocument.titleIndexByOrdinal(title.ordinal)
+        )
+        if pairedTitleIndex is None:
+            return None
+        pairedTitle: common.SubRipTitle = (
+            pairedDocument.titles[pairedTitleIndex]
+        )
+        titleTop: float = (
+            self.view.text_to_layout(title.offset)[1]
+            - self.view.viewport_position()[1]
+        )
+        pairedView.set_viewport_position(
+            (
+                pairedView.viewport_position()[0],
+                max(
+                    pairedView.text_to_layout(pairedTitle.offset)[1]
+                    - titleTop,
+                    0
+                )
+            ),
+            False
+        )
+        return pairedTitle
@@ -5,105 +5,132 @@ import re
 import typing
 
 from . import _common as common
+from . import validation
+from .core import timecodes
+from .core.subrip import (
+    timeCodeToMilliseconds,
+    millisecondsToTimeCode
+)
+from .core.validation import makeTitleIdentity
+from .core.timing import (
+    splitTimingInTwo,
+    joinTimings,
+    shiftTimings,
+    transformTimings,
+    twoPointsTransform,
+    parseTitlesRange,
+    getTitlesRange,
+    framerates
+)
 
 
-def timeCodeToMilliseconds(timeCode: str) -> int:
-    if common.regexSrtTimeCode.fullmatch(timeCode) is None:
-        raise ValueError("Timecode has a wrong format.")
-    tms = timeCode.split(":")
-    hour: int = int(tms[0])
-    minute: int = int(tms[1])
-    seconds: typing.List[str] = tms[2].split(",")
-    second: int = int(seconds[0])
-    millisecond: int = int(seconds[1])
-
-    return (
-        hour * 60 * 60 * 1000 +
-        minute * 60 * 1000 +
-        second * 1000 +
-        millisecond
+# instead of replacing every timing on its own, which makes
+# thousands of edits, the whole span of timings is replaced at once
+def replaceTitlesTimings(
+    view: sublime.View,
+    edit: sublime.Edit,
+    titles: typing.Sequence[common.SubRipTitle],
+    timings: typing.Sequence[str]
+) -> None:
+    regionBegin: int = titles[0].lineRegion(1)[0]
+    regionEnd: int = titles[-1].lineRegion(1)[1]
+    region: sublime.Region = sublime.Region(regionBegin, regionEnd)
+    # the start time is a part of the excluded titles identities
+    validation.remapExcludedTitles(
+        view,
+        common.getDocument(view),
+        (
+            (title, [makeTitleIdentity(timing, title.textLines)])
+            for title, timing in zip(titles, timings)
+        )
+    )
+    selection: typing.List[sublime.Region] = list(view.sel())
+    viewportPosition: typing.Tuple[float, float] = view.viewport_position()
+    view.replace(
+        edit,
+        region,
+        timecodes.replaceTimings(
+            view.substr(region),
+            regionBegin,
+            titles,
+            timings
+        )
     )
+    # the replaced span would otherwise swallow the cursors
+    view.sel().clear()
+    view.sel().add_all(selection)
+    view.set_viewport_position(viewportPosition, False)
 
 
-def millisecondsToTimeCode(milliseconds: int) -> str:
-    timeComponents: typing.Tuple[int, int, int, int] = (
-        milliseconds // (60 * 60 * 1000),
-        (milliseconds % (60 * 60 * 1000)) // (60 * 1000),
-        (milliseconds % (60 * 1000)) // 1000,
-        milliseconds % 1000
-    )
-    return "%02d:%02d:%02d,%03d" % timeComponents
-
-
-def splitTimingInTwo(timingToSplit: str) -> typing.Tuple[str, str]:
-    timingMatches = common.regexSrtTiming.match(timingToSplit)
-    # print(timingMatches.group(0)) # full timing
-    # print(timingMatches.group(1)) # start time
-    # print(timingMatches.group(2)) # separator
-    # print(timingMatches.group(3)) # end time
-    if timingMatches is None:
-        raise ValueError("The title timing has a wrong format.")
-    timingStart: int = timeCodeToMilliseconds(timingMatches.group(1))
-    timingEnd: int = timeCodeToMilliseconds(timingMatches.group(3))
-    timingHalfLength: int = (timingEnd - timingStart) // 2
-    endTimeFirst: str = millisecondsToTimeCode(
-        timingStart + timingHalfLength
-    )
-    startTimeSecond: str = millisecondsToTimeCode(
-        timingEnd - timingHalfLength + 1
-    )
-    return (
-        f"{timingMatches.group(1)} {timingMatches.group(2)} {endTimeFirst}",
-        f"{startTimeSecond} {timingMatches.group(2)} {timingMatches.group(3)}"
-    )
+def transformTitlesTimings(
+    view: sublime.View,
+    edit: sublime.Edit,
+    titles: typing.Sequence[common.SubRipTitle],
+    scale: float,
+    offset: float
+) -> None:
+    timedTitles: typing.List[common.SubRipTitle] = [
+        t for t in titles if t.timing is not None
+    ]
+    if len(timedTitles) < 1:
+        sublime.error_message("Didn't find any timings to transform.")
+        return
+    try:
+        transformedTimings: typing.List[str] = transformTimings(
+            [typing.cast(str, t.timing) for t in timedTitles],
+            scale,
+            offset
+        )
+    except ValueError as ex:
+        sublime.error_message(f"Couldn't transform the timings. {ex}")
+        return
+    replaceTitlesTimings(view, edit, timedTitles, transformedTimings)
 
 
-def joinTimings(timingStartStr: str, timingEndStr: str) -> str:
-    timingStartMatches = common.regexSrtTiming.match(timingStartStr)
-    timingEndMatches = common.regexSrtTiming.match(timingEndStr)
-    # print(timingStartMatches.group(0)) # full timing
-    # print(timingStartMatches.group(1)) # start time
-    # print(timingStartMatches.group(2)) # separator
-    # print(timingStartMatches.group(3)) # end time
-    if timingStartMatches is None or timingEndMatches is None:
-        raise ValueError("One of the title timings has a wrong format.")
-    timingStart: int = timeCodeToMilliseconds(timingStartMatches.group(1))
-    timingEnd: int = timeCodeToMilliseconds(timingEndMatches.group(3))
-    # if timingEnd < timingStart:
-    #     raise ValueError("Second timing cannot be earlier than the first one.")
-    return (
-        " ".join((
-            timingStartMatches.group(1),
-            timingStartMatches.group(2),
-            timingEndMatches.group(3)
-        )) if timingEnd > timingStart
-        else
-        " ".join((
-            timingEndMatches.group(1),
-            timingStartMatches.group(2),
-            timingStartMatches.group(3)
-        ))
-    )
+class TitlesRangeInputHandler(sublime_plugin.TextInputHandler):
+    def __init__(
+        self,
+        nextInput: typing.Optional[sublime_plugin.CommandInputHandler] = None
+    ) -> None:
+        self.nextInput = nextInput
+
+    def name(self) -> str:
+        return "titles_range"
+
+    def placeholder(self) -> str:
+        return "titles range, like 12-40"
+
+    def validate(self, text: str) -> bool:
+        try:
+            parseTitlesRange(text)
+            return True
+        except ValueError:
+            return False
 
+    def preview(self, text: str) -> str:
+        try:
+            firstOrdinal, lastOrdinal = parseTitlesRange(text)
+            return sublime.Html(
+                " ".join((
+                    f"From title <b>#{firstOrdinal}</b> till",
+                    "<b>the last title</b>" if lastOrdinal is None
+                    else f"title <b>#{lastOrdinal}</b>"
+                ))
+            )
+        except ValueError as ex:
+            return sublime.Html(f"<i>{ex}</i>")
 
-def shiftTiming(timingToShift: str, shiftValue: int) -> str:
-    timingMatches = common.regexSrtTiming.match(timingToShift)
-    # print(timingMatches.group(0)) # full timing
-    # print(timingMatches.group(1)) # start time
-    # print(timingMatches.group(2)) # separator
-    # print(timingMatches.group(3)) # end time
-    if timingMatches is None:
-        raise ValueError("The title timing has a wrong format.")
-    timingStart: int = timeCodeToMilliseconds(timingMatches.group(1)) + shiftValue
-    timingEnd: int = timeCodeToMilliseconds(timingMatches.group(3)) + shiftValue
-    return " ".join((
-        millisecondsToTimeCode(timingStart),
-        timingMatches.group(2),
-        millisecondsToTimeCode(timingEnd)
-    ))
+    def next_input(
+        self,
+        args: dict
+    ) -> typing.Optional[sublime_plugin.CommandInputHandler]:
+        return self.nextInput
 
 
 class MillisecondsInputHandler(sublime_plugin.TextInputHandler):
+    def __init__(self, timingsName: str = "all timings") -> None:
+        self.timingsName = timingsName
+
     def name(self) -> str:
         return "milliseconds"
 
@@ -133,7 +160,7 @@ class MillisecondsInputHandler(sublime_plugin.TextInputHandler):
                 shiftDirection = "back"
             return sublime.Html(
                 " ".join((
-                    f"Shift all timings <b>{text}</b>",
+                    f"Shift {self.timingsName} <b>{text}</b>",
                     f"millisecond{shiftCountEnding} <b>{shiftDirection}</b>"
                 ))
             )
@@ -143,8 +170,15 @@ class MillisecondsInputHandler(sublime_plugin.TextInputHandler):
             )
 
 
+# shifts the timings of the titles in titles_range (by ordinals),
+# or of the selected titles, or of all the titles
 class MarlantShiftTimingsCommand(sublime_plugin.TextCommand):
-    def run(self, edit: sublime.Edit, milliseconds: int) -> None:
+    def run(
+        self,
+        edit: sublime.Edit,
+        milliseconds: int,
+        titles_range: typing.Optional[str] = None
+    ) -> None:
         # CHECK: is it redundant to cast in this case?
         milliseconds = int(milliseconds)
         if milliseconds == 0:
@@ -158,48 +192,68 @@ class MarlantShiftTimingsCommand(sublime_plugin.TextCommand):
             )
             return
 
-        timingsRegions: typing.List[sublime.Region] = (
-            self.view.find_all(common.regexSrtTimingString)
-        )
-        if len(timingsRegions) < 1:
-            sublime.error_message("Didn't find any timings in the file.")
+        document: common.SubRipDocument = common.getDocument(self.view)
+        titles: typing.List[common.SubRipTitle] = []
+        if titles_range:
+            try:
+                titles = getTitlesRange(document, titles_range)
+            except ValueError as ex:
+                sublime.error_message(str(ex))
+                return
+        else:
+            titles = common.getSelectedTitles(self.view, document)
+        timedTitles: typing.List[common.SubRipTitle] = [
+            t for t in titles if t.timing is not None
+        ]
+        if len(timedTitles) < 1:
+            sublime.error_message("Didn't find any timings to shift.")
             return
 
         # first title timing cannot go below 0
-        firstTitleTimecodeMatches = common.regexSrtTiming.match(
-            self.view.substr(timingsRegions[0])
-        )
+        firstTitleTimecodeStart = timedTitles[0].timeStart
         # to keep mypy happy
-        if firstTitleTimecodeMatches is None:
+        if firstTitleTimecodeStart is None:
             sublime.error_message("The first title timing has a wrong format.")
             return
-        firstTitleTimecodeStart: str = firstTitleTimecodeMatches.group(1)
         if (
             milliseconds < 0
-            and timeCodeToMilliseconds(
-                firstTitleTimecodeStart) < abs(milliseconds
-            )
+            and firstTitleTimecodeStart < abs(milliseconds)
         ):
             sublime.error_message(
                 "The shift value goes below 00:00:00,000 for the first title."
             )
             return
 
-        # just in case, start from the last region,
-        # to prevent theoretical regions drift
-        for rgn in reversed(timingsRegions):
-            self.view.replace(
-                edit,
-                rgn,
-                shiftTiming(
-                    self.view.substr(rgn),
-                    milliseconds
-                )
+        try:
+            # all timings are parsed and formatted in one go
+            shiftedTimings: typing.List[str] = shiftTimings(
+                [typing.cast(str, t.timing) for t in timedTitles],
+                milliseconds
             )
+        except ValueError as ex:
+            sublime.error_message(f"Couldn't shift the timings. {ex}")
+            return
+
+        # only the span of the affected titles is replaced
+        replaceTitlesTimings(self.view, edit, timedTitles, shiftedTimings)
 
-    def input(self, args: dict) -> sublime_plugin.TextInputHandler:
+    def input(
+        self,
+        args: dict
+    ) -> typing.Optional[sublime_plugin.CommandInputHandler]:
+        # an empty range means that it should be asked for
+        if args.get("titles_range") == "":
+            return TitlesRangeInputHandler(
+                None if "milliseconds" in args
+                else MillisecondsInputHandler("the range timings")
+            )
         if "milliseconds" not in args:
+            if args.get("titles_range"):
+                return MillisecondsInputHandler("the range timings")
+            if any(not r.empty() for r in self.view.sel()):
+                return MillisecondsInputHandler("the selected titles timings")
             return MillisecondsInputHandler()
+        return None
 
     def input_description(self) -> str:
         return "Timings shift"
@@ -209,3 +263,205 @@ class MarlantShiftTimingsCommand(sublime_plugin.TextCommand):
 
     def is_visible(self) -> bool:
         return self.view.window().active_view().match_selector(0, "text.srt")
+
+
+class FramerateInputHandler(sublime_plugin.ListInputHandler):
+    def __init__(
+        self,
+        argumentName: str,
+        placeholderText: str,
+        nextInput: typing.Optional[sublime_plugin.CommandInputHandler] = None
+    ) -> None:
+        self.argumentName = argumentName
+        self.placeholderText = placeholderText
+        self.nextInput = nextInput
+
+    def name(self) -> str:
+        return self.argumentName
+
+    def placeholder(self) -> str:
+        return self.placeholderText
+
+    def list_items(self) -> typing.List[typing.Tuple[str, float]]:
+        return framerates
+
+    def next_input(
+        self,
+        args: dict
+    ) -> typing.Optional[sublime_plugin.CommandInputHandler]:
+        return self.nextInput
+
+
+class MarlantConvertTimingsFramerateCommand(sublime_plugin.TextCommand):
+    def run(
+        self,
+        edit: sublime.Edit,
+        from_framerate: float,
+        to_framerate: float
+    ) -> None:
+        from_framerate = float(from_framerate)
+        to_framerate = float(to_framerate)
+        if from_framerate <= 0 or to_framerate <= 0:
+            sublime.error_message("Framerate should be a positive number.")
+            return
+        if from_framerate == to_framerate:
+            return
+
+        document: common.SubRipDocument = common.getDocument(self.view)
+        # the same frame is shown at a different time
+        # when the video is played at a different framerate
+        transformTitlesTimings(
+            self.view,
+            edit,
+            common.getSelectedTitles(self.view, document),
+            from_framerate / to_framerate,
+            0
+        )
+
+    def input(
+        self,
+        args: dict
+    ) -> typing.Optional[sublime_plugin.CommandInputHandler]:
+        toFramerateInput = FramerateInputHandler(
+            "to_framerate",
+            "target framerate"
+        )
+        if "from_framerate" not in args:
+            return FramerateInputHandler(
+                "from_framerate",
+                "original framerate",
+                None if "to_framerate" in args else toFramerateInput
+            )
+        if "to_framerate" not in args:
+            return toFramerateInput
+        return None
+
+    def input_description(self) -> str:
+        return "Framerate"
+
+    def is_enabled(self) -> bool:
+        return self.view.window().active_view().match_selector(0, "text.srt")
+
+    def is_visible(self) -> bool:
+        return self.view.window().active_view().match_selector(0, "text.srt")
+
+
+class TimeCodeInputHandler(sublime_plugin.TextInputHandler):
+    def __init__(
+        self,
+        argumentName: str,
+        titleName: str,
+        initialTimeCode: str,
+        nextInput: typing.Optional[sublime_plugin.CommandInputHandler] = None
+    ) -> None:
+        self.argumentName = argumentName
+        self.titleName = titleName
+        self.initialTimeCode = initialTimeCode
+        self.nextInput = nextInput
+
+    def name(self) -> str:
+        return self.argumentName
+
+    def placeholder(self) -> str:
+        return "00:00:00,000"
+
+    def initial_text(self) -> str:
+        return self.initialTimeCode
+
+    def validate(self, text: str) -> bool:
+        return common.regexSrtTimeCode.fullmatch(text.strip()) is not None
+
+    def preview(self, text: str) -> str:
+        if not self.validate(text):
+            return sublime.Html(
+                "<i>That needs to be a timecode: 00:00:00,000</i>"
+            )
+        return sublime.Html(
+            f"The {self.titleName} title will start at <b>{text.strip()}</b>"
+        )
+
+    def next_input(
+        self,
+        args: dict
+    ) -> typing.Optional[sublime_plugin.CommandInputHandler]:
+        return self.nextInput
+
+
+# two-point synchronisation: the first and the last titles (of the selection
+# or the whole file) get the given start times, and all the timings
+# in between are stretched proportionally, which also fixes a drift
+class MarlantSyncTimingsCommand(sublime_plugin.TextCommand):
+    def run(
+        self,
+        edit: sublime.Edit,
+        first_timecode: str,
+        last_timecode: str
+    ) -> None:
+        document: common.SubRipDocument = common.getDocument(self.view)
+        timedTitles: typing.List[common.SubRipTitle] = [
+            t for t in common.getSelectedTitles(self.view, document)
+            if t.timing is not None
+        ]
+        if len(timedTitles) < 2:
+            sublime.error_message(
+                "There should be at least two titles with timings to sync."
+            )
+            return
+        try:
+            scale, offset = twoPointsTransform(
+                # to keep mypy happy
+                typing.cast(int, timedTitles[0].timeStart),
+                typing.cast(int, timedTitles[-1].timeStart),
+                timeCodeToMilliseconds(first_timecode.strip()),
+                timeCodeToMilliseconds(last_timecode.strip())
+            )
+        except ValueError as ex:
+            sublime.error_message(str(ex))
+            return
+
+        transformTitlesTimings(
+            self.view,
+            edit,
+            timedTitles,
+            scale,
+            offset
+        )
+
+    def input(
+        self,
+        args: dict
+    ) -> typing.Optional[sublime_plugin.CommandInputHandler]:
+        document: common.SubRipDocument = common.getDocument(self.view)
+        timedTitles: typing.List[common.SubRipTitle] = [
+            t for t in common.getSelectedTitles(self.view, document)
+            if t.timing is not None
+        ]
+        firstTimeCode: str = ""
+        lastTimeCode: str = ""
+        if timedTitles:
+            firstTimeCode = typing.cast(str, timedTitles[0].timing)[:12]
+            lastTimeCode = typing.cast(str, timedTitles[-1].timing)[:12]
+        lastTimeCodeInput = TimeCodeInputHandler(
+            "last_timecode",
+            "last",
+            lastTimeCode
+        )
+        if "first_timecode" not in args:
+            return TimeCodeInputHandler(
+                "first_timecode",
+                "first",
+                firstTimeCode,
+                None if "last_timecode" in args else lastTimeCodeInput
+            )
+        if "last_timecode" not in args:
+            return lastTimeCodeInput
+        return None
+
+    def input_description(self) -> str:
+        return "Sync timings"
+
+    def is_enabled(self) -> bool:
+        return self.view.window().active_view().match_selector(0, "text.srt")
+
+    def is_visible(self) -> bool:
+        return self.view.window().active_view().match_selector(0, "text.srt")
@@ -7,105 +7,112 @@ import typing
 
 from . import _common as common
 from . import timing
+from . import validation
+from .core import subrip
+from .core.validation import makeTitleIdentity
+
+
+# replaces [begin, end) with the text and renumbers the titles after it:
+# the titles from nextTitleIndex on (in the document as it was before
+# the edit) get ordinals going on from nextOrdinal. The titles before
+# are expected to be numbered already, and only the wrong ordinals are
+# replaced, together with the edit itself in a single replacement,
+# so an edit near the end of a big file doesn't touch the whole file.
+# The replaced titles are given with the identities of the titles
+# that replace them, so they stay excluded from validation if they were.
+# This is what inserting/splitting/joining titles use
+def replaceAndRenumberTitles(
+    view: sublime.View,
+    edit: sublime.Edit,
+    document: common.SubRipDocument,
+    begin: int,
+    end: int,
+    text: str,
+    nextTitleIndex: int,
+    nextOrdinal: int,
+    remappedTitles: typing.Sequence[
+        typing.Tuple[common.SubRipTitle, typing.List[str]]
+    ] = ()
+) -> None:
+    # while the document is still as it was before the edit
+    validation.remapExcludedTitles(view, document, remappedTitles)
+
+    misnumberedTitles: typing.List[typing.Tuple[int, int]] = []
+    renumberingError: typing.Optional[str] = None
+    try:
+        misnumberedTitles = subrip.findMisnumberedTitles(
+            document.titles,
+            nextTitleIndex,
+            nextOrdinal
+        )
+    except common.SubRipFormatError as ex:
+        renumberingError = str(ex)
+    if not misnumberedTitles:
+        if begin != end or text:
+            view.replace(edit, sublime.Region(begin, end), text)
+        if renumberingError is not None:
+            sublime.error_message(renumberingError)
+        return
+
+    titles: typing.List[common.SubRipTitle] = [
+        document.titles[index] for index, _ in misnumberedTitles
+    ]
+    regionEnd: int = titles[-1].lineRegion(0)[1]
+    replacement: str = "".join((
+        text,
+        subrip.replaceOrdinals(
+            view.substr(sublime.Region(end, regionEnd)),
+            end,
+            titles,
+            [ordinal for _, ordinal in misnumberedTitles]
+        )
+    ))
+
+    # the replaced span would otherwise swallow the cursors
+    def shiftPoint(point: int) -> int:
+        if point <= begin:
+            return point
+        if point < end:
+            return begin + len(text)
+        if point < regionEnd:
+            return point + len(text) - (end - begin)
+        return point + len(replacement) - (regionEnd - begin)
+
+    selection: typing.List[sublime.Region] = [
+        sublime.Region(shiftPoint(r.a), shiftPoint(r.b))
+        for r in view.sel()
+    ]
+    viewportPosition: typing.Tuple[float, float] = view.viewport_position()
+    view.replace(edit, sublime.Region(begin, regionEnd), replacement)
+    view.sel().clear()
+    view.sel().add_all(selection)
+    view.set_viewport_position(viewportPosition, False)
 
 
 class MarlantRenumberTitlesCommand(sublime_plugin.TextCommand):
     def run(self, edit: sublime.Edit) -> None:
-        # if there is a list of excluded titles, clear it,
-        # as it will likely get incorrect/obsolete after renumbering
-        clearedExcludedTitles: bool = False
-        currentFileName: str = pathlib.Path(
-            self.view.window().active_view().file_name()
-        ).name
-        if self.view.window().project_file_name():
-            projectData = self.view.window().project_data()
-            if projectData:
-                excludedTitles: typing.List[int] = projectData.get(
-                    "settings", {}
-                ).get(
-                    "marlant", {}
-                ).get(
-                    "validation", {}
-                ).get(
-                    "excluded-titles", {}
-                ).get(
-                    currentFileName, []
-                )
-                if any(excludedTitles):
-                    print(
-                        " ".join((
-                            "The list of excluded titles before clearing:",
-                            f"{excludedTitles}"
-                        ))
-                    )
-                    projectData["settings"][
-                        "marlant"
-                    ][
-                        "validation"
-                    ]["excluded-titles"][currentFileName] = []
-                    self.view.window().set_project_data(projectData)
-                    clearedExcludedTitles = True
-
-        bufferLinesRegions: typing.List[sublime.Region] = (
-            self.view.split_by_newlines(
-                sublime.Region(0, self.view.size())
-            )
+        document: common.SubRipDocument = common.getDocument(self.view)
+        try:
+            document.checkStructure(False)
+        except common.SubRipFormatError as ex:
+            sublime.error_message(str(ex))
+            common.scrollToProblematicLineNumber(self.view, ex.lineIndex)
+            return
+        if not document.titles:
+            return
+
+        # only the titles with wrong ordinals are replaced
+        firstOffset: int = document.titles[0].offset
+        replaceAndRenumberTitles(
+            self.view,
+            edit,
+            document,
+            firstOffset,
+            firstOffset,
+            "",
+            0,
+            1
         )
-        hadEmptyLine: bool = False
-        crntTitleStrNumber: int = 0
-        crntTitleCnt: int = 1
-        replacementBufferAdjustment: int = 0
-        for index, region in enumerate(bufferLinesRegions):
-            region = sublime.Region(
-                region.a - replacementBufferAdjustment,
-                region.b - replacementBufferAdjustment
-            )
-            line = self.view.substr(region).strip()
-            if not line:
-                if hadEmptyLine or index == 0:
-                    sublime.error_message(
-                        " ".join((
-                            f"{common.wrongFormatError} the line {index+1}",
-                            "should not be empty."
-                        ))
-                    )
-                    common.scrollToProblematicLine(self.view, region)
-                    return
-                else:
-                    crntTitleStrNumber = 0
-                    hadEmptyLine = True
-                    continue
-
-            hadEmptyLine = False
-            crntTitleStrNumber += 1
-
-            if crntTitleStrNumber == 1:
-                if common.regexSrtNumber.fullmatch(line) is not None:
-                    crntTitleCntStr: str = str(crntTitleCnt)
-                    self.view.replace(edit, region, crntTitleCntStr)
-                    crntTitleCnt += 1
-                    replacementBufferAdjustment += (
-                        len(line) - len(crntTitleCntStr)
-                    )
-                    continue
-                else:
-                    sublime.error_message(
-                        " ".join((
-                            f"{common.wrongFormatError} the line {index+1}",
-                            "should contain a non-zero title number."
-                        ))
-                    )
-                    common.scrollToProblematicLine(self.view, region)
-                    return
-        if clearedExcludedTitles:
-            sublime.message_dialog(
-                " ".join((
-                    "Note that renumbering the titles caused clearing",
-                    "the list of excluded titles.\n\nThis is not an error,",
-                    "just letting you know, so you don't forget about it.",
-                    "You can find the cleared values in the console."
-                ))
-            )
 
     def is_enabled(self) -> bool:
         return self.view.window().active_view().match_selector(0, "text.srt")
@@ -136,78 +143,41 @@ class MarlantInsertNewTitleCommand(sublime_plugin.TextCommand):
         )
 
         currentSelection = self.view.sel()
-        currentTitlePoint: sublime.Selection = currentSelection[0].b
-
-        if len(
-            self.view.substr(
-                self.view.line(currentTitlePoint)
-            ).strip()
-        ) == 0:
-            sublime.error_message(
-                " ".join((
-                    "The cursor is on an empty line,",
-                    "can't guess the current title."
-                ))
-            )
-            return
-
-        emptyLineBefore: int = self.view.find_by_class(
-            currentTitlePoint,
-            False,
-            sublime.CLASS_EMPTY_LINE
-        )
-        emptyLineAfter: int = self.view.find_by_class(
-            currentTitlePoint,
-            True,
-            sublime.CLASS_EMPTY_LINE
-        )
-
-        currentTitleRegion: sublime.Region = sublime.Region(
-            emptyLineBefore if emptyLineBefore == 0 else emptyLineBefore + 1,
-            emptyLineAfter - 1
-        )
-        # currentSelection.clear()
-        # currentSelection.add(currentTitleRegion)
 
-        titleOrdinal: int = 0
-        titleTiming: str = ""
+        document: common.SubRipDocument = common.getDocument(self.view)
+        titleIndex: int = 0
         try:
-            titleOrdinal, titleTiming = common.parseTitleString(
-                self.view,
-                self.view.split_by_newlines(currentTitleRegion)
-            )[:2]
-            # print(f"Title ordinal: {titleOrdinal}, timing: {titleTiming}")
+            titleIndex = common.getCurrentTitle(self.view, document)
         except ValueError as ex:
             sublime.error_message(str(ex))
             return
+        title: common.SubRipTitle = document.titles[titleIndex]
+
+        emptyLineBefore: int = title.offset - 1 if title.offset > 0 else 0
+        emptyLineAfter: int = min(title.endOffset + 1, self.view.size())
 
+        # to keep mypy happy, getCurrentTitle() has already checked that
+        if (
+            title.ordinal is None
+            or title.timeStart is None
+            or title.timeEnd is None
+        ):
+            return
+
+        # the new title takes the place of the current one
+        # when it goes before it
         newTitleOrdinal: int = (
-            titleOrdinal + 1 if after_current_title
-            else titleOrdinal - 1
+            title.ordinal + 1 if after_current_title
+            else title.ordinal
         )
-        if newTitleOrdinal == 0:
-            newTitleOrdinal = 1
 
         newTitleTiming: str = "00:00:00,000 --> 00:00:00,000"
-        timingMatches = common.regexSrtTiming.match(titleTiming)
-        # print(timingMatches.group(0)) # full timing
-        # print(timingMatches.group(1)) # start time
-        # print(timingMatches.group(2)) # separator
-        # print(timingMatches.group(3)) # end time
-        if timingMatches is None:
-            sublime.error_message("The title timing has a wrong format.")
-            return
-        timeCodeMS: int = 0
+        timeCodeMS: int = (
+            title.timeEnd if after_current_title
+            else title.timeStart
+        )
         newTimeCodeMS_start: int = 0
         newTimeCodeMS_end: int = 0
-        try:
-            timeCodeMS = timing.timeCodeToMilliseconds(
-                timingMatches.group(3) if after_current_title
-                else timingMatches.group(1)
-            )
-        except ValueError as ex:
-            sublime.error_message(str(ex))
-            return
 
         if after_current_title:
             newTimeCodeMS_start = timeCodeMS + 1
@@ -238,11 +208,20 @@ class MarlantInsertNewTitleCommand(sublime_plugin.TextCommand):
             f"{titlePlaceholder}\n",
             lineNewTitleLast
         ))
-        insertedCharsCount: int = self.view.insert(
+        insertionPoint: int = (
+            emptyLineAfter if after_current_title else emptyLineBefore
+        )
+        replaceAndRenumberTitles(
+            self.view,
             edit,
-            emptyLineAfter if after_current_title else emptyLineBefore,
-            newTitle
+            document,
+            insertionPoint,
+            insertionPoint,
+            newTitle,
+            titleIndex + 1 if after_current_title else titleIndex,
+            newTitleOrdinal + 1
         )
+        insertedCharsCount: int = len(newTitle)
 
         currentSelection.clear()
         currentSelection.add(
@@ -263,8 +242,6 @@ class MarlantInsertNewTitleCommand(sublime_plugin.TextCommand):
             )
         )
 
-        self.view.run_command("marlant_renumber_titles")
-
     def input(self, args: dict) -> sublime_plugin.TextInputHandler:
         if "after_current_title" not in args:
             return AfterCurrentTitleInputHandler()
@@ -281,60 +258,27 @@ class MarlantInsertNewTitleCommand(sublime_plugin.TextCommand):
 
 class MarlantSplitTitleCommand(sublime_plugin.TextCommand):
     def run(self, edit: sublime.Edit) -> None:
-        currentSelection = self.view.sel()
-        currentTitlePoint: sublime.Selection = currentSelection[0].b
-
-        if len(
-            self.view.substr(
-                self.view.line(currentTitlePoint)
-            ).strip()
-        ) == 0:
-            sublime.error_message(
-                " ".join((
-                    "The cursor is on an empty line,",
-                    "can't guess the current title."
-                ))
-            )
-            return
-
-        emptyLineBefore: int = self.view.find_by_class(
-            currentTitlePoint,
-            False,
-            sublime.CLASS_EMPTY_LINE
-        )
-        emptyLineAfter: int = self.view.find_by_class(
-            currentTitlePoint,
-            True,
-            sublime.CLASS_EMPTY_LINE
-        )
-
-        currentTitleRegion: sublime.Region = sublime.Region(
-            emptyLineBefore if emptyLineBefore == 0 else emptyLineBefore + 1,
-            emptyLineAfter - 1
-        )
-
-        titleOrdinal: int = 0
-        titleTiming: str = ""
-        titleTextRegions: typing.List[sublime.Region] = []
+        document: common.SubRipDocument = common.getDocument(self.view)
+        titleIndex: int = 0
         try:
-            titleOrdinal, titleTiming, titleTextRegions = (
-                common.parseTitleString(
-                    self.view,
-                    self.view.split_by_newlines(currentTitleRegion)
-                )
-            )
+            titleIndex = common.getCurrentTitle(self.view, document)
         except ValueError as ex:
             sublime.error_message(str(ex))
             return
+        title: common.SubRipTitle = document.titles[titleIndex]
+
+        titleOrdinal: int = title.ordinal or 0
+        titleTiming: str = title.timing or ""
+        titleTextLines: typing.List[str] = title.textLines
 
         titleTextFirst: str = ""
         titleTextSecond: str = ""
-        firstString = self.view.substr(titleTextRegions[0]).strip()
-        if len(titleTextRegions) > 1:
+        firstString = titleTextLines[0].strip()
+        if len(titleTextLines) > 1:
             titleTextFirst = firstString
             titleTexts: typing.List[str] = []
-            for rgn in titleTextRegions[1:]:
-                titleTexts.append(self.view.substr(rgn).strip())
+            for ln in titleTextLines[1:]:
+                titleTexts.append(ln.strip())
             titleTextSecond = "\n".join(titleTexts)
             if titleTextSecond.startswith("-"):
                 titleTextSecond = re.sub(
@@ -359,22 +303,35 @@ class MarlantSplitTitleCommand(sublime_plugin.TextCommand):
             sublime.error_message(str(ex))
             return
 
-        self.view.replace(
+        replaceAndRenumberTitles(
+            self.view,
             edit,
-            currentTitleRegion,
+            document,
+            title.offset,
+            title.endOffset,
             "\n".join((
                 str(titleOrdinal),
                 titleTimingFirst,
                 titleTextFirst,
                 "",
-                str(titleOrdinal),
+                str(titleOrdinal + 1),
                 titleTimingSecond,
                 titleTextSecond
-            ))
+            )),
+            titleIndex + 1,
+            titleOrdinal + 2,
+            [(
+                title,
+                [
+                    makeTitleIdentity(titleTimingFirst, [titleTextFirst]),
+                    makeTitleIdentity(
+                        titleTimingSecond,
+                        titleTextSecond.split("\n")
+                    )
+                ]
+            )]
         )
 
-        self.view.run_command("marlant_renumber_titles")
-
     def is_enabled(self) -> bool:
         return self.view.window().active_view().match_selector(0, "text.srt")
 
@@ -384,39 +341,20 @@ class MarlantSplitTitleCommand(sublime_plugin.TextCommand):
 
 class MarlantJoinTitlesCommand(sublime_plugin.TextCommand):
     def run(self, edit: sublime.Edit, after_current_title: bool) -> None:
-        currentSelection = self.view.sel()
-        currentTitlePoint: sublime.Selection = currentSelection[0].b
-
         maxTitleLineLength: int = common.marlantSettings.get(
             "maximum_title_text_line_length",
             common.maxTitleLineLengthFallback
         )
 
-        if len(
-            self.view.substr(
-                self.view.line(currentTitlePoint)
-            ).strip()
-        ) == 0:
-            sublime.error_message(
-                " ".join((
-                    "The cursor is on an empty line,",
-                    "can't guess the current title."
-                ))
-            )
+        document: common.SubRipDocument = common.getDocument(self.view)
+        currentTitleIndex: int = 0
+        try:
+            currentTitleIndex = common.getCurrentTitle(self.view, document)
+        except ValueError as ex:
+            sublime.error_message(str(ex))
             return
 
-        emptyLineBefore: int = self.view.find_by_class(
-            currentTitlePoint,
-            False,
-            sublime.CLASS_EMPTY_LINE
-        )
-        emptyLineAfter: int = self.view.find_by_class(
-            currentTitlePoint,
-            True,
-            sublime.CLASS_EMPTY_LINE
-        )
-
-        if emptyLineBefore == 0 and after_current_title is False:
+        if currentTitleIndex == 0 and after_current_title is False:
             sublime.error_message(
                 " ".join((
                     "This is the first title,",
@@ -425,14 +363,8 @@ class MarlantJoinTitlesCommand(sublime_plugin.TextCommand):
             )
             return
 
-        # there might be several empty lines in the end of the file,
-        # and as timing string is 30 symbols, there has to be at least
-        # that many symbols for a potential title to fit there
-        # ---
-        # it would be easier if self.view.size() was not counting
-        # trailing empty lines in the end of the file
         if (
-            emptyLineAfter >= self.view.size() - 30
+            currentTitleIndex == len(document.titles) - 1
             and after_current_title is True
         ):
             sublime.error_message(
@@ -443,77 +375,27 @@ class MarlantJoinTitlesCommand(sublime_plugin.TextCommand):
             )
             return
 
-        currentTitleRegion: sublime.Region = sublime.Region(
-            emptyLineBefore if emptyLineBefore == 0 else emptyLineBefore + 1,
-            emptyLineAfter - 1
-        )
-
-        firstTitleOrdinal: int = 0
-        firstTitleTiming: str = ""
-        firstTitleTextRegions: typing.List[sublime.Region] = []
-        try:
-            firstTitleOrdinal, firstTitleTiming, firstTitleTextRegions = (
-                common.parseTitleString(
-                    self.view,
-                    self.view.split_by_newlines(currentTitleRegion)
-                )
-            )
-        except ValueError as ex:
-            sublime.error_message(str(ex))
-            return
-
-        secondTitleEmptyLine: int = self.view.find_by_class(
-            (
-                currentTitleRegion.b + 1
-                if after_current_title
-                else currentTitleRegion.a - 1
-            ),
-            after_current_title,
-            sublime.CLASS_EMPTY_LINE
-        )
-
-        secondTitleRegion: sublime.Region = sublime.Region(0, 0)
-        if after_current_title:
-            secondTitleRegion = sublime.Region(
-                currentTitleRegion.b + 2,
-                secondTitleEmptyLine if secondTitleEmptyLine == self.view.size()
-                else secondTitleEmptyLine - 1
-            )
-        else:
-            secondTitleRegion = sublime.Region(
-                secondTitleEmptyLine + 1,
-                currentTitleRegion.a - 2
-            )
-
-        secondTitleOrdinal: int = 0
-        secondTitleTiming: str = ""
-        secondTitleTextRegions: typing.List[sublime.Region] = []
+        firstTitle: common.SubRipTitle = document.titles[currentTitleIndex]
+        secondTitle: common.SubRipTitle = document.titles[
+            currentTitleIndex + 1 if after_current_title
+            else currentTitleIndex - 1
+        ]
         try:
-            secondTitleOrdinal, secondTitleTiming, secondTitleTextRegions = (
-                common.parseTitleString(
-                    self.view,
-                    self.view.split_by_newlines(
-                        sublime.Region(
-                            secondTitleRegion.a - 1, secondTitleRegion.b
-                        )
-                        if secondTitleEmptyLine == 0 else secondTitleRegion
-                    )
-                )
-            )
+            secondTitle.checkFormat()
         except ValueError as ex:
             sublime.error_message(str(ex))
             return
 
-        joinedTitleRegions: typing.List[sublime.Region] = (
-            firstTitleTextRegions + secondTitleTextRegions
+        joinedTitleLines: typing.List[str] = (
+            firstTitle.textLines + secondTitle.textLines
             if after_current_title
-            else secondTitleTextRegions + firstTitleTextRegions
+            else secondTitle.textLines + firstTitle.textLines
         )
         joinedTitleTexts: typing.List[str] = []
         joinedTitleTextLength: int = 0
-        for rgn in joinedTitleRegions:
-            joinedTitleTexts.append(self.view.substr(rgn).strip())
-            joinedTitleTextLength += rgn.size()
+        for ln in joinedTitleLines:
+            joinedTitleTexts.append(ln.strip())
+            joinedTitleTextLength += len(ln)
         # if both titles total text length is less than the allowed maximum,
         # join them into one line
         joinedTitleText: str = (
@@ -522,6 +404,8 @@ class MarlantJoinTitlesCommand(sublime_plugin.TextCommand):
             else " ".join(joinedTitleTexts)
         )
 
+        firstTitleTiming: str = firstTitle.timing or ""
+        secondTitleTiming: str = secondTitle.timing or ""
         joinedTitleTiming: str = (
             firstTitleTiming if after_current_title
             else secondTitleTiming
@@ -532,33 +416,46 @@ class MarlantJoinTitlesCommand(sublime_plugin.TextCommand):
             sublime.error_message(str(ex))
             return
 
-        self.view.erase(
-            edit,
-            (
-                sublime.Region(secondTitleRegion.a, secondTitleRegion.b + 2)
-                if after_current_title
-                else sublime.Region(secondTitleRegion.a, secondTitleRegion.b)
-            )
+        # the joined title takes the place of the earlier one
+        earlierTitle: common.SubRipTitle = (
+            firstTitle if after_current_title
+            else secondTitle
         )
-
-        self.view.replace(
+        laterTitle: common.SubRipTitle = (
+            secondTitle if after_current_title
+            else firstTitle
+        )
+        joinedTitleOrdinal: int = earlierTitle.ordinal or 0
+        replaceAndRenumberTitles(
+            self.view,
             edit,
-            (
-                currentTitleRegion if after_current_title
-                else sublime.Region(
-                    currentTitleRegion.a - secondTitleRegion.size() - 2,
-                    currentTitleRegion.b - secondTitleRegion.size()
-                )
-            ),
+            document,
+            earlierTitle.offset,
+            laterTitle.endOffset,
             "\n".join((
-                str(firstTitleOrdinal),
+                str(joinedTitleOrdinal),
                 joinedTitleTiming,
                 joinedTitleText
-            ))
+            )),
+            (
+                currentTitleIndex + 2 if after_current_title
+                else currentTitleIndex + 1
+            ),
+            joinedTitleOrdinal + 1,
+            [
+                (
+                    t,
+                    [
+                        makeTitleIdentity(
+                            joinedTitleTiming,
+                            joinedTitleText.split("\n")
+                        )
+                    ]
+                )
+                for t in (earlierTitle, laterTitle)
+            ]
         )
 
-        self.view.run_command("marlant_renumber_titles")
-
     def input(self, args: dict) -> sublime_plugin.TextInputHandler:
         if "after_current_title" not in args:
             return AfterCurrentTitleInputHandler()
@@ -1,16 +1,26 @@
 import sublime
 import sublime_plugin
 
-from collections import Counter
+import concurrent.futures
+import html
 import pathlib
 import re
 import typing
 
 from . import _common as common
-from . import timing
+from .core import subrip
+from .core import validation as core
 
 validationStatusKey: str = "marlant_validation_status"
 validationError: typing.Final[str] = "Validation error:"
+backgroundErrorsKey: typing.Final[str] = "marlant_validation_errors"
+backgroundWarningsKey: typing.Final[str] = "marlant_validation_warnings"
+
+# a single worker is enough: validation is CPU-bound anyway, and this way
+# the runs for the same view cannot overtake each other
+backgroundValidationExecutor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=1
+)
 
 
 def failedValidation(
@@ -24,454 +34,209 @@ def failedValidation(
     sublime.error_message(errorMsg)
 
 
-def checkForUnmatchedHtmlTags(
-    openHtmlTags: typing.List[str],
-    closeHtmlTags: typing.List[str]
-) -> typing.Tuple[typing.List[str], typing.List[str]]:
-    unmatchedOpenTags: typing.List[str] = []
-    unmatchedCloseTags: typing.List[str] = []
-    # print(f"Collected open tags: {openHtmlTags}")
-    # print(f"Collected closing tags: {closeHtmlTags}")
-    if len(openHtmlTags) > 0:
-        unmatchedOpenTags = list(
-            Counter(openHtmlTags) - Counter(closeHtmlTags)
+def getExcludedTitles(
+    window: sublime.Window,
+    view: sublime.View
+) -> typing.List[typing.Union[int, str]]:
+    if not view.file_name() or not window.project_file_name():
+        return []
+    return core.loadExcludedTitles(
+        window.project_data(),
+        pathlib.Path(view.file_name()).name
+    )
+
+
+def storeExcludedTitles(
+    window: sublime.Window,
+    projectData: dict,
+    fileName: str,
+    excludedTitles: typing.List[str]
+) -> None:
+    # ensure that settings tree structure is in place
+    if not projectData.get("settings"):
+        projectData["settings"] = {}
+    if not projectData["settings"].get("marlant"):
+        projectData["settings"]["marlant"] = {}
+    if not projectData["settings"]["marlant"].get("validation"):
+        projectData["settings"]["marlant"]["validation"] = {}
+    if not projectData["settings"]["marlant"]["validation"].get(
+        "excluded-titles"
+    ):
+        projectData["settings"]["marlant"]["validation"][
+            "excluded-titles"
+        ] = {}
+    projectData["settings"]["marlant"]["validation"][
+        "excluded-titles"
+    ][fileName] = excludedTitles
+    window.set_project_data(projectData)
+
+
+# keeps the excluded titles excluded after the commands changed them:
+# every title (of the document as it was before the change) is given
+# with the identities of the titles that replaced it. The ordinals
+# from the older versions of the list are turned into identities too,
+# as they won't point to the same titles after the change
+def remapExcludedTitles(
+    view: sublime.View,
+    document: common.SubRipDocument,
+    remappedTitles: typing.Iterable[
+        typing.Tuple[common.SubRipTitle, typing.List[str]]
+    ]
+) -> None:
+    window: typing.Optional[sublime.Window] = view.window()
+    if (
+        window is None
+        or not window.project_file_name()
+        or not view.file_name()
+    ):
+        return
+    projectData: typing.Optional[dict] = window.project_data()
+    currentFileName: str = pathlib.Path(view.file_name()).name
+    excludedTitles: typing.List[typing.Union[int, str]] = (
+        core.loadExcludedTitles(projectData, currentFileName)
+    )
+    if not projectData or not excludedTitles:
+        return
+
+    identities: typing.Set[str] = core.excludedTitlesIdentities(
+        excludedTitles,
+        document
+    )
+    changed: bool = any(not isinstance(t, str) for t in excludedTitles)
+    for title, newIdentities in remappedTitles:
+        identity: typing.Optional[str] = core.titleIdentity(title)
+        if identity is not None and identity in identities:
+            identities.discard(identity)
+            identities.update(newIdentities)
+            changed = True
+    if changed:
+        storeExcludedTitles(
+            window,
+            projectData,
+            currentFileName,
+            sorted(identities)
         )
-        # if len(unmatchedOpenTags.keys()) > 0:
-        #     print(f"Unmatched open tags: {','.join(unmatchedOpenTags.keys())}")
-    if len(closeHtmlTags) > 0:
-        unmatchedCloseTags = list(
-            Counter(closeHtmlTags) - Counter(openHtmlTags)
+
+
+def getValidationSettings() -> core.ValidationSettings:
+    return core.loadValidationSettings(common.marlantSettings)
+
+
+def showProblemsList(
+    view: sublime.View,
+    problems: typing.List[core.ValidationProblem]
+) -> None:
+    errorsCount: int = sum(
+        1 for p in problems if p.severity == core.severityError
+    )
+    view.set_status(
+        validationStatusKey,
+        f"SubRip: FAILING ({errorsCount})"
+    )
+
+    items: typing.List[sublime.QuickPanelItem] = []
+    for problem in problems:
+        items.append(
+            sublime.QuickPanelItem(
+                core.problemDescription(problem),
+                annotation=(
+                    f"line {problem.lineIndex+1}"
+                    if problem.lineIndex is not None
+                    else ""
+                ),
+                details=(
+                    f"title #{problem.titleOrdinal}"
+                    if problem.titleOrdinal is not None
+                    else ""
+                ),
+                kind=(
+                    (sublime.KIND_ID_COLOR_REDISH, "E", "Error")
+                    if problem.severity == core.severityError
+                    else (sublime.KIND_ID_COLOR_YELLOWISH, "W", "Warning")
+                )
+            )
         )
-        # if len(unmatchedCloseTags.keys()) > 0:
-        #     print(f"Unmatched close tags: {','.join(unmatchedCloseTags.keys())}")
-    return (unmatchedOpenTags, unmatchedCloseTags)
+
+    def goToProblem(index: int) -> None:
+        if index < 0:
+            return
+        lineIndex = problems[index].lineIndex
+        if lineIndex is not None:
+            common.scrollToProblematicLineNumber(view, lineIndex)
+
+    view.window().show_quick_panel(
+        items,
+        goToProblem,
+        sublime.KEEP_OPEN_ON_FOCUS_LOST,
+        0,
+        goToProblem,
+        f"{errorsCount} validation errors found"
+    )
 
 
 # some more about SubRip validation: https://ale5000.altervista.org/subtitles.htm
 class MarlantValidateAllTitlesCommand(sublime_plugin.WindowCommand):
-    def run(self) -> None:
+    def run(self, collect_all: bool = False) -> None:
         activeView = self.window.active_view()
         activeView.erase_status(validationStatusKey)
 
-        # try to get project settings
-        projectSettings: sublime.Value = None
-        currentFileName: str = pathlib.Path(activeView.file_name()).name
-        excludedTitles: typing.List[int] = []
-        if self.window.project_file_name():
-            projectSettings = self.window.project_data().get("settings")
-        if projectSettings:
-            excludedTitles = projectSettings.get(
-                "marlant", {}
-            ).get(
-                "validation", {}
-            ).get(
-                "excluded-titles", {}
-            ).get(
-                currentFileName, []
-            )
-
-        maxTitleLineLength: int = common.marlantSettings.get(
-            "maximum_title_text_line_length",
-            common.maxTitleLineLengthFallback
-        )
-        maxTitleLines: int = common.marlantSettings.get(
-            "maximum_title_text_lines",
-            common.maxTitleLinesFallback
-        )
-        minTitleDuration: int = common.marlantSettings.get(
-            "minimum_title_duration",
-            common.minTitleDurationFallback
-        )
-        maxTitleDuration: int = common.marlantSettings.get(
-            "maximum_title_duration",
-            common.maxTitleDurationFallback
-        )
-        htmlTagsToWatchFor: typing.List[str] = common.marlantSettings.get(
-            "html_tags_to_watch_for",
-            common.htmlTagsToWatchForFallback
+        document: common.SubRipDocument = common.getDocument(activeView)
+        excludedTitles: typing.Set[str] = core.excludedTitlesIdentities(
+            getExcludedTitles(self.window, activeView),
+            document
         )
+        validationSettings: core.ValidationSettings = getValidationSettings()
         try:
-            if not isinstance(htmlTagsToWatchFor, list):
-                raise TypeError("Tags need to be a list of strings")
-            htmlTagsToWatchForJoined = "|".join(htmlTagsToWatchFor)
-        except TypeError as ex:
-            print(f"MarLant | ERROR | Wrong tags format: {ex}")
+            core.compileValidationRules(validationSettings)
+        except (TypeError, ValueError, re.error) as ex:
+            print(f"MarLant | ERROR | Wrong validation settings: {ex}")
             sublime.error_message(
                 " ".join((
-                    "Looks like you've set the list of tags incorrectly,",
-                    "check your plugin settings. If you have just installed",
-                    "the plugin, then restarting Sublime Text might help."
+                    "Looks like you've set the list of tags or validation",
+                    "rules incorrectly, check your plugin settings. If you",
+                    "have just installed the plugin, then restarting",
+                    "Sublime Text might help."
                 ))
             )
             return
 
-        # this regular expression is very naive, as it will also find
-        # <underestimated>, <incredibly>, <beautiful>, <fontange> tags,
-        # not just <u>, <i>, <b>, <font>
-        regexHTMLtagOpen: typing.Final[typing.Pattern] = re.compile(
-            f"(<({htmlTagsToWatchForJoined})[^>]*>)"
-        )
-        # this one is quite okay though
-        regexHTMLtagClose: typing.Final[typing.Pattern] = re.compile(
-            f"(<\\/({htmlTagsToWatchForJoined})>)"
-        )
-
-        bufferLinesRegions: typing.List[sublime.Region] = (
-            activeView.split_by_newlines(
-                sublime.Region(0, activeView.size())
+        problems: typing.Iterator[core.ValidationProblem] = (
+            core.validateDocument(
+                document,
+                validationSettings,
+                excludedTitles
             )
         )
-        # there must be at least 3 lines: ordinal, timing and a line of text
-        if len(bufferLinesRegions) < 3:
-            failedValidation(
-                activeView,
-                None,
-                " ".join((
-                    f"{validationError} there are no SubRip titles. At least",
-                    "there should be an ordinal, timing and a line of text."
-                ))
-            )
-            return
-        if activeView.substr(activeView.size()-1) != "\n":
-            failedValidation(
-                activeView,
-                None,
-                " ".join((
-                    f"{validationError} there should",
-                    "be an empty line in the end of file."
-                ))
-            )
-            return
-        if len(activeView.substr(bufferLinesRegions[-1])) == 0:
-            failedValidation(
-                activeView,
-                len(bufferLinesRegions),
-                " ".join((
-                    f"{validationError} there is a redundant",
-                    "empty line in the end of file."
-                ))
-            )
-            return
 
-        hadEmptyLine: bool = False
-        crntTitleStrNumber: int = 0
-        crntTitleCnt: int = 0
-        previousTitleTimeEnd: int = 0
-        openHtmlTags: typing.List[str] = []
-        closeHtmlTags: typing.List[str] = []
-        for index, region in enumerate(bufferLinesRegions):
-            line = activeView.substr(region)
-            if not line:
-                if hadEmptyLine or index == 0:
-                    failedValidation(
-                        activeView,
-                        index,
-                        " ".join((
-                            f"{validationError} the line {index+1}",
-                            "should not be empty."
-                        ))
-                    )
-                    return
-                else:
-                    if crntTitleStrNumber == 2:
-                        failedValidation(
-                            activeView,
-                            index,
-                            " ".join((
-                                f"{validationError} the line {index+1}",
-                                "should not be empty."
-                            ))
-                        )
-                        return
-                    else:  # new title starts
-                        # check if there are problems with HTML tags collected
-                        # in the previous title
-                        uot, uct = checkForUnmatchedHtmlTags(openHtmlTags, closeHtmlTags)
-                        if len(uot) > 0:
-                            failedValidation(
-                                activeView,
-                                index - 1,
-                                " ".join((
-                                    f"{validationError} this title has",
-                                    "unmatched open HTML tags:",
-                                    f"{', '.join(uot)}."
-                                ))
-                            )
-                            return
-                        if len(uct) > 0:
-                            failedValidation(
-                                activeView,
-                                index - 1,
-                                " ".join((
-                                    f"{validationError} this title has",
-                                    "unmatched closing HTML tags:",
-                                    f"{', '.join(uct)}."
-                                ))
-                            )
-                            return
-
-                        # reset everything
-                        openHtmlTags = []
-                        closeHtmlTags = []
-                        crntTitleStrNumber = 0
-                        hadEmptyLine = True
-                        continue
-
-            hadEmptyLine = False
-            crntTitleStrNumber += 1
-
-            if line.endswith(" "):
-                failedValidation(
-                    activeView,
-                    index,
-                    " ".join((
-                        f"{validationError} there is a trailing whitespace",
-                        f"on the line {index+1}."
-                    ))
-                )
-                return
-            if line.startswith(" "):
-                failedValidation(
-                    activeView,
-                    index,
-                    " ".join((
-                        f"{validationError} the line {index+1}",
-                        "starts with a whitespace."
-                    ))
-                )
+        if collect_all:
+            collectedProblems: typing.List[core.ValidationProblem] = list(
+                problems
+            )
+            if any(
+                p.severity == core.severityError for p in collectedProblems
+            ):
+                showProblemsList(activeView, collectedProblems)
                 return
-
-            # --- ordinal line
-
-            if crntTitleStrNumber == 1:
-                if common.regexSrtNumber.fullmatch(line) is not None:
-                    crntTitleCntCandidate = int(line)
-                    if crntTitleCntCandidate - crntTitleCnt != 1:
-                        failedValidation(
-                            activeView,
-                            index,
-                            " ".join((
-                                f"{validationError} the title number",
-                                f"on the line {index+1}",
-                                f"({crntTitleCntCandidate}) is not",
-                                "a +1 increment of the previous",
-                                f"title number ({crntTitleCnt})."
-                            ))
-                        )
-                        return
-                    else:
-                        crntTitleCnt = crntTitleCntCandidate
-                        continue
-                else:
-                    failedValidation(
-                        activeView,
-                        index,
-                        " ".join((
-                            f"{validationError} the line {index+1}",
-                            "should contain a title number."
-                        ))
-                    )
-                    return
-
-            # --- checking for excluded titles
-
-            # validation checks after this point are ignorable (more or less),
-            # so they can be skipped, if translator/editor wants to exclude them
-            if crntTitleCnt in excludedTitles:
-                if crntTitleStrNumber == 2:  # don't repeat the warning
-                    print(
-                        " ".join((
-                            f"[WARNING] Title #{crntTitleCnt}",
-                            "is in the ignore list, so it will not",
-                            "go through all the checks"
-                        ))
-                    )
-                continue
-
-            # --- timing line
-
-            if crntTitleStrNumber == 2:
-                if common.regexSrtTiming.fullmatch(line) is not None:
-                    timingMatches = common.regexSrtTiming.match(line)
-                    # print(timingMatches.group(0)) # full timing
-                    # print(timingMatches.group(1)) # start time
-                    # print(timingMatches.group(2)) # separator
-                    # print(timingMatches.group(3)) # end time
-                    if timingMatches is None:
-                        failedValidation(
-                            activeView,
-                            index,
-                            " ".join((
-                                f"{validationError} the title timing",
-                                f"on the line {index+1} has a wrong format."
-                            ))
-                        )
-                        return
-                    timeStart: int = timing.timeCodeToMilliseconds(
-                        timingMatches.group(1)
-                    )
-                    timeEnd: int = timing.timeCodeToMilliseconds(
-                        timingMatches.group(3)
-                    )
-                    # start timecode should not be "later" than end timecode
-                    if timeStart > timeEnd:
-                        failedValidation(
-                            activeView,
-                            index,
-                            " ".join((
-                                f"{validationError} the start time",
-                                f"of the title on the line {index+1}",
-                                "is bigger than its end time."
-                            ))
-                        )
-                        return
-                    # title time duration should not be too short
-                    if timeEnd - timeStart < minTitleDuration:
-                        failedValidation(
-                            activeView,
-                            index,
-                            " ".join((
-                                f"{validationError} duration of the title",
-                                f"on the line {index+1} is too short",
-                                f"(less than {minTitleDuration} milliseconds)."
-                            ))
-                        )
-                        return
-                    # title time duration should not be too long
-                    if timeEnd - timeStart > maxTitleDuration:
-                        failedValidation(
-                            activeView,
-                            index,
-                            " ".join((
-                                f"{validationError} duration of the title",
-                                f"on the line {index+1} is too long",
-                                f"(more than {maxTitleDuration} milliseconds)."
-                            ))
-                        )
-                        return
-                    # timing should not overlap with the previous one
-                    if crntTitleCnt > 1 and timeStart <= previousTitleTimeEnd:
-                        failedValidation(
-                            activeView,
-                            index,
-                            " ".join((
-                                f"{validationError} the title",
-                                f"on the line {index+1} starts before",
-                                f"the previous one ends."
-                            ))
-                        )
-                        return
-                    # timing is good
-                    previousTitleTimeEnd = timeEnd
+            for problem in collectedProblems:
+                print(f"[WARNING] {core.problemDescription(problem)}")
+        else:
+            for problem in problems:
+                if problem.severity == core.severityWarning:
+                    print(f"[WARNING] {core.problemDescription(problem)}")
                     continue
-                else:
-                    failedValidation(
-                        activeView,
-                        index,
-                        " ".join((
-                            f"{validationError} there",
-                            "should be a correct timing string",
-                            f"on the line {index+1}."
-                        ))
-                    )
-                    return
-
-            # --- title text lines
-
-            # possible HTML tags
-            thisLineTagsLength = 0
-            openTagsMatches = regexHTMLtagOpen.findall(line)
-            closeTagsMatches = regexHTMLtagClose.findall(line)
-            if len(openTagsMatches) > 0:
-                for m in openTagsMatches:
-                    thisLineTagsLength += len(m[0])
-                    openHtmlTags.append(f"<{m[1]}>")
-                    # print(f"Found open tag: {m[1]}, full length: {len(m[0])}")
-            if len(closeTagsMatches) > 0:
-                for m in closeTagsMatches:
-                    thisLineTagsLength += len(m[0])
-                    closeHtmlTags.append(f"<{m[1]}>")
-                    # print(f"Found closing tag: {m[1]}, full length: {len(m[0])}")
-
-            if crntTitleStrNumber > 2 + maxTitleLines:
-                failedValidation(
-                    activeView,
-                    index,
-                    " ".join((
-                        f"{validationError} this title has too many",
-                        f"text lines (more than {maxTitleLines}).",
-                        "It may be obstructing the view."
-                    ))
-                )
-                return
-            if (len(line) - thisLineTagsLength > maxTitleLineLength):
                 failedValidation(
                     activeView,
-                    index,
-                    " ".join((
-                        f"{validationError} the line {index+1}",
-                        f"is longer than {maxTitleLineLength} characters.",
-                        f"Longer lines are harder to read."
-                    ))
+                    problem.lineIndex,
+                    f"{validationError} {problem.message}"
                 )
                 return
-            if common.regexSrtTiming.fullmatch(line) is not None:
-                failedValidation(
-                    activeView,
-                    index,
-                    " ".join((
-                        f"{validationError} there is a timing string",
-                        f"on the line {index+1}. Most likely there is",
-                        f"a missing empty line on one of the previous lines."
-                    ))
-                )
-                return
-
-        # --- done iterating through the title text lines
-
-        if crntTitleStrNumber < 3:
-            failedValidation(
-                activeView,
-                len(bufferLinesRegions),
-                " ".join((
-                    f"{validationError} the last title",
-                    f"doesn't have any text lines."
-                ))
-            )
-            return
-
-        # check if there are problems with HTML tags collected
-        # in the last title. Sadly, this needs to be done here too,
-        # as doing that only at the new title beginning will miss
-        # the last title
-        uot, uct = checkForUnmatchedHtmlTags(openHtmlTags, closeHtmlTags)
-        if len(uot) > 0:
-            failedValidation(
-                activeView,
-                len(bufferLinesRegions) - 1,
-                " ".join((
-                    f"{validationError} last title has",
-                    f"unmatched open HTML tags: {', '.join(uot)}."
-                ))
-            )
-            return
-        if len(uct) > 0:
-            failedValidation(
-                activeView,
-                len(bufferLinesRegions) - 1,
-                " ".join((
-                    f"{validationError} last title has",
-                    f"unmatched closing HTML tags: {', '.join(uct)}."
-                ))
-            )
-            return
 
         activeView.set_status(validationStatusKey, "SubRip: OK")
         validationSuccess = "".join((
             "All good! No problems found."  # ...found, ",
             # "checked {crntTitleCnt} titles."
         ))
-        if any(excludedTitles):
+        if excludedTitles:
             validationSuccess += " ".join((
                 f"\n\nBut do remember that you have {len(excludedTitles)}",
                 "excluded titles in project preferences."
@@ -499,31 +264,8 @@ class MarlantExcludeTitleFromValidationsCommand(sublime_plugin.WindowCommand):
         activeView = self.window.active_view()
         currentFileName: str = pathlib.Path(activeView.file_name()).name
 
-        # TODO: move this to a generalized common functions
-        # ensure that settings tree structure is in place
         projectData = self.window.project_data()
-        if projectData:
-            if not projectData.get("settings"):
-                projectData["settings"] = {}
-            if not projectData["settings"].get("marlant"):
-                projectData["settings"]["marlant"] = {}
-            if not projectData["settings"]["marlant"].get("validation"):
-                projectData["settings"]["marlant"]["validation"] = {}
-            if not projectData["settings"]["marlant"]["validation"].get(
-                "excluded-titles"
-            ):
-                projectData["settings"]["marlant"]["validation"][
-                    "excluded-titles"
-                ] = {}
-            if not projectData["settings"]["marlant"]["validation"][
-                "excluded-titles"
-            ].get(
-                currentFileName
-            ):
-                projectData["settings"]["marlant"]["validation"][
-                    "excluded-titles"
-                ][currentFileName] = []
-        else:
+        if not projectData:
             sublime.error_message(
                 " ".join((
                     "Couldn't get project data, check if you have",
@@ -532,75 +274,34 @@ class MarlantExcludeTitleFromValidationsCommand(sublime_plugin.WindowCommand):
             )
             return
 
-        currentSelection = activeView.sel()
-        currentTitlePoint: sublime.Selection = currentSelection[0].b
-
-        if len(
-            activeView.substr(
-                activeView.line(currentTitlePoint)
-            ).strip()
-        ) == 0:
-            sublime.error_message(
-                " ".join((
-                    "The cursor is on an empty line,",
-                    "can't guess the current title."
-                ))
-            )
-            return
-
-        emptyLineBefore: int = activeView.find_by_class(
-            currentTitlePoint,
-            False,
-            sublime.CLASS_EMPTY_LINE
-        )
-        emptyLineAfter: int = activeView.find_by_class(
-            currentTitlePoint,
-            True,
-            sublime.CLASS_EMPTY_LINE
-        )
-
-        currentTitleRegion: sublime.Region = sublime.Region(
-            emptyLineBefore if emptyLineBefore == 0 else emptyLineBefore + 1,
-            emptyLineAfter - 1
-        )
-
-        titleOrdinal: int = 0
-        titleTiming: str = ""
-        titleTextRegions: typing.List[sublime.Region] = []
+        document: common.SubRipDocument = common.getDocument(activeView)
+        title: common.SubRipTitle
         try:
-            titleOrdinal, titleTiming, titleTextRegions = (
-                common.parseTitleString(
-                    activeView,
-                    activeView.split_by_newlines(currentTitleRegion)
-                )
-            )
+            title = document.titles[
+                common.getCurrentTitle(activeView, document)
+            ]
         except ValueError as ex:
             sublime.error_message(str(ex))
             return
+        # getCurrentTitle() has checked that the title has a timing
+        identity: str = typing.cast(str, core.titleIdentity(title))
 
-        excludedTitles: typing.List[int] = projectData.get(
-            "settings", {}
-        ).get(
-            "marlant", {}
-        ).get(
-            "validation", {}
-        ).get(
-            "excluded-titles", {}
-        ).get(
-            currentFileName, []
+        excludedTitles: typing.Set[str] = core.excludedTitlesIdentities(
+            core.loadExcludedTitles(projectData, currentFileName),
+            document
         )
-        if titleOrdinal not in excludedTitles:
-            excludedTitles.append(titleOrdinal)
-            projectData["settings"][
-                "marlant"
-            ][
-                "validation"
-            ]["excluded-titles"][currentFileName] = excludedTitles
-            self.window.set_project_data(projectData)
+        if identity not in excludedTitles:
+            excludedTitles.add(identity)
+            storeExcludedTitles(
+                self.window,
+                projectData,
+                currentFileName,
+                sorted(excludedTitles)
+            )
         else:
             print(
                 " ".join((
-                    f"The title #{titleOrdinal} has been",
+                    f"The title #{title.ordinal} has been",
                     "already excluded earlier"
                 ))
             )
@@ -638,16 +339,8 @@ class MarlantClearExcludedTitlesList(sublime_plugin.WindowCommand):
 
         msg: str = ""
 
-        excludedTitles: typing.List[int] = projectData.get(
-            "settings", {}
-        ).get(
-            "marlant", {}
-        ).get(
-            "validation", {}
-        ).get(
-            "excluded-titles", {}
-        ).get(
-            currentFileName, []
+        excludedTitles: typing.List[typing.Union[int, str]] = (
+            core.loadExcludedTitles(projectData, currentFileName)
         )
         if any(excludedTitles):
             print(
@@ -676,3 +369,186 @@ class MarlantClearExcludedTitlesList(sublime_plugin.WindowCommand):
 
     def is_visible(self) -> bool:
         return self.window.active_view().match_selector(0, "text.srt")
+
+
+def validateContent(
+    content: str,
+    settings: core.ValidationSettings,
+    excludedTitles: typing.List[typing.Union[int, str]]
+) -> typing.List[core.ValidationProblem]:
+    # parses its own document, because the cached one
+    # belongs to the main thread and might be changed meanwhile
+    document: subrip.SubRipDocument = subrip.parseSubRip(content)
+    return list(
+        core.validateDocument(
+            document,
+            settings,
+            core.excludedTitlesIdentities(excludedTitles, document)
+        )
+    )
+
+
+class BackgroundValidationListener(sublime_plugin.ViewEventListener):
+    @classmethod
+    def is_applicable(cls, settings: sublime.Settings) -> bool:
+        return settings.get("syntax", "").endswith("subrip.sublime-syntax")
+
+    def __init__(self, view: sublime.View) -> None:
+        super().__init__(view)
+        self.phantoms = sublime.PhantomSet(view, "marlant_validation")
+
+    def on_load_async(self) -> None:
+        self.validate()
+
+    def on_post_save_async(self) -> None:
+        self.validate()
+
+    def on_modified_async(self) -> None:
+        if not self.isEnabled():
+            return
+        changeCount: int = self.view.change_count()
+        delay: int = common.marlantSettings.get(
+            "background_validation_delay",
+            common.backgroundValidationDelayFallback
+        )
+        sublime.set_timeout_async(
+            lambda: self.validate(changeCount),
+            delay
+        )
+
+    def isEnabled(self) -> bool:
+        return (
+            common.marlantSettings.get(
+                "background_validation",
+                common.backgroundValidationFallback
+            )
+            and self.view.match_selector(0, "text.srt")
+        )
+
+    def validate(self, changeCount: typing.Optional[int] = None) -> None:
+        if not self.isEnabled():
+            self.clearProblems()
+            return
+        # there were more edits since this run was scheduled,
+        # so there will be another run after them
+        if (
+            changeCount is not None
+            and changeCount != self.view.change_count()
+        ):
+            return
+        window: typing.Optional[sublime.Window] = self.view.window()
+        if window is None:
+            return
+
+        settings: core.ValidationSettings = getValidationSettings()
+        try:
+            core.compileValidationRules(settings)
+        except (TypeError, ValueError, re.error) as ex:
+            print(f"MarLant | ERROR | Wrong validation settings: {ex}")
+            return
+
+        snapshotChangeCount: int = self.view.change_count()
+        content: str = self.view.substr(sublime.Region(0, self.view.size()))
+        excludedTitles: typing.List[typing.Union[int, str]] = (
+            getExcludedTitles(window, self.view)
+        )
+        future: concurrent.futures.Future = (
+            backgroundValidationExecutor.submit(
+                validateContent,
+                content,
+                settings,
+                excludedTitles
+            )
+        )
+        future.add_done_callback(
+            lambda f: sublime.set_timeout(
+                lambda: self.showProblems(f, snapshotChangeCount)
+            )
+        )
+
+    def clearProblems(self) -> None:
+        self.view.erase_regions(backgroundErrorsKey)
+        self.view.erase_regions(backgroundWarningsKey)
+        self.phantoms.update([])
+
+    def showProblems(
+        self,
+        future: concurrent.futures.Future,
+        snapshotChangeCount: int
+    ) -> None:
+        if not self.view.is_valid():
+            return
+        # the content has changed since the snapshot, so the problems
+        # would be pointing to wrong lines
+        if self.view.change_count() != snapshotChangeCount:
+            return
+        try:
+            problems: typing.List[core.ValidationProblem] = future.result()
+        except Exception as ex:
+            print(f"MarLant | ERROR | Background validation failed: {ex}")
+            return
+
+        errorRegions: typing.List[sublime.Region] = []
+        warningRegions: typing.List[sublime.Region] = []
+        problemsPerLine: typing.Dict[int, typing.List[str]] = {}
+        lastPoint: int = self.view.size()
+        for problem in problems:
+            point: int = lastPoint
+            if problem.lineIndex is not None:
+                point = min(
+                    self.view.text_point(problem.lineIndex, 0),
+                    lastPoint
+                )
+            line: sublime.Region = self.view.line(point)
+            # empty lines have nothing to underline
+            region: sublime.Region = (
+                line if not line.empty()
+                else sublime.Region(point, point + 1)
+            )
+            if problem.severity == core.severityError:
+                errorRegions.append(region)
+            else:
+                warningRegions.append(region)
+            problemsPerLine.setdefault(line.a, []).append(
+                html.escape(core.problemDescription(problem))
+            )
+
+        underlineFlags: int = (
+            sublime.DRAW_SQUIGGLY_UNDERLINE
+            | sublime.DRAW_NO_FILL
+            | sublime.DRAW_NO_OUTLINE
+        )
+        self.view.add_regions(
+            backgroundErrorsKey,
+            errorRegions,
+            "invalid",
+            "",
+            underlineFlags
+        )
+        self.view.add_regions(
+            backgroundWarningsKey,
+            warningRegions,
+            "warning",
+            "",
+            underlineFlags
+        )
+        self.phantoms.update([
+            sublime.Phantom(
+                sublime.Region(point, point),
+                "".join((
+                    "<body id=\"marlant-validation\">",
+                    "<br>".join(messages),
+                    "</body>"
+                )),
+                sublime.LAYOUT_BELOW
+            )
+            for point, messages in problemsPerLine.items()
+        ])
+
+        if len(errorRegions) > 0:
+            self.view.set_status(
+                validationStatusKey,
+                f"SubRip: FAILING ({len(errorRegions)})"
+            )
+        else:
+            self.view.set_status(validationStatusKey, "SubRip: OK")
@@ -0,0 +1,79 @@
+# custom validation rules should match the same way as their patterns
+# do on their own, even though they are searched for together
+#
+# Usage: python -m unittest discover ./tests
+
+import pathlib
+import sys
+import typing
+import unittest
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / "plugins"))
+
+from core import subrip, validation  # noqa: E402
+
+
+def matchedRules(rules: typing.List[dict], line: str) -> typing.List[str]:
+    return [
+        p.message for p in validation.validateDocument(
+            subrip.parseSubRip(f"1\n00:00:01,000 --> 00:00:03,000\n{line}\n"),
+            validation.loadValidationSettings(
+                {"custom_validation_rules": rules}
+            ),
+            set()
+        )
+    ]
+
+
+class CustomValidationRulesTest(unittest.TestCase):
+    def test_backreference(self) -> None:
+        self.assertEqual(
+            matchedRules(
+                [
+                    {"pattern": "!!"},
+                    {"name": "repeated word", "pattern": r"\b(\w+) \1\b"}
+                ],
+                "the the cat"
+            ),
+            ['there is a match of the "repeated word" rule on the line 3.']
+        )
+
+    def test_flags(self) -> None:
+        self.assertEqual(
+            matchedRules(
+                [
+                    {"pattern": "!!"},
+                    {"name": "greeting", "pattern": "(?i)hello"}
+                ],
+                "HELLO there"
+            ),
+            ['there is a match of the "greeting" rule on the line 3.']
+        )
+
+    def test_matchesAtTheSamePlace(self) -> None:
+        self.assertEqual(
+            matchedRules(
+                [
+                    {"name": "two dots", "pattern": r"\.\."},
+                    {"name": "four dots", "pattern": r"\.\.\.\."}
+                ],
+                "wait...."
+            ),
+            [
+                'there is a match of the "two dots" rule on the line 3.',
+                'there is a match of the "four dots" rule on the line 3.'
+            ]
+        )
+
+    def test_noMatches(self) -> None:
+        self.assertEqual(
+            matchedRules(
+                [{"pattern": "x"}, {"pattern": r"(\w)\1{3}"}],
+                "plain line"
+            ),
+            []
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+# validation results cached per title should survive edits elsewhere
+# in the file, including the ones that add or remove lines
+#
+# Usage: python -m unittest discover ./tests
+
+import pathlib
+import sys
+import typing
+import unittest
+from unittest import mock
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / "plugins"))
+
+from core import subrip, validation  # noqa: E402
+
+
+# the lines of a SubRip file, ending with an empty one
+def generateSubRip(titlesCount: int) -> typing.List[str]:
+    lines: typing.List[str] = []
+    for index in range(titlesCount):
+        lines.extend((
+            str(index + 1),
+            " --> ".join((
+                subrip.millisecondsToTimeCode(index * 3000),
+                subrip.millisecondsToTimeCode(index * 3000 + 2000)
+            )),
+            # a problem in every tenth title, to see its line number
+            "a line that is too long for a title " * 2 if index % 10 == 9
+            else f"title {index + 1}",
+            ""
+        ))
+    return lines
+
+
+def validate(lines: typing.List[str]) -> typing.List[tuple]:
+    return [
+        tuple(p) for p in validation.validateDocument(
+            subrip.parseSubRip("\n".join(lines)),
+            validation.loadValidationSettings({}),
+            set()
+        )
+    ]
+
+
+class TitlesProblemsCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        validation.clearValidationCache()
+        self.lines: typing.List[str] = generateSubRip(100)
+        validate(self.lines)
+
+    def revalidate(self) -> typing.Tuple[typing.List[tuple], int]:
+        with mock.patch.object(
+            validation,
+            "validateTitle",
+            wraps=validation.validateTitle
+        ) as validateTitle:
+            problems: typing.List[tuple] = validate(self.lines)
+        return (problems, validateTitle.call_count)
+
+    def coldValidate(self) -> typing.List[tuple]:
+        validation.clearValidationCache()
+        return validate(self.lines)
+
+    def test_editWithinLine(self) -> None:
+        self.lines[4 * 4 + 2] += " edited"
+        problems, checkedTitles = self.revalidate()
+        self.assertEqual(checkedTitles, 1)
+        self.assertEqual(problems, self.coldValidate())
+
+    def test_insertLine(self) -> None:
+        # a new text line in the third title moves all the titles after it
+        self.lines.insert(2 * 4 + 3, "a new line")
+        problems, checkedTitles = self.revalidate()
+        self.assertEqual(checkedTitles, 1)
+        self.assertEqual(problems, self.coldValidate())
+        self.assertIn("on the line 40.", problems[0][2])
+
+    def test_removeLine(self) -> None:
+        # joins the second title with the third one
+        del self.lines[1 * 4 + 3]
+        problems, checkedTitles = self.revalidate()
+        # the joined title and the one after it, as the ordinals
+        # don't go up by one there anymore
+        self.assertEqual(checkedTitles, 2)
+        self.assertEqual(problems, self.coldValidate())
+
+
+if __name__ == "__main__":
+    unittest.main()